@@ -0,0 +1 @@
+"""Benchmark suite; see `python -m benchmarks.run --help`."""
@@ -0,0 +1,161 @@
+"""Deterministic synthetic corpora for benchmarks.
+
+Every generator takes a seeded `random.Random`, so the same seed and sizes
+always produce byte-identical inputs (modulo library version differences in
+PDF/DOCX writers).
+"""
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from email.message import EmailMessage
+from io import BytesIO
+from pathlib import Path
+from zipfile import ZIP_DEFLATED, ZipFile
+
+WORDS = (
+    "artifact content storage extract deterministic hash stream page document "
+    "message attachment archive table header footer index ledger record value "
+    "alpha beta gamma delta epsilon zeta theta lambda sigma omega"
+).split()
+
+
+@dataclass(frozen=True)
+class CorpusItem:
+    path: Path
+    filename: str
+    media_type: str | None = None
+
+
+def sentence(rng: random.Random, words: int = 12) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def paragraph(rng: random.Random, sentences: int = 5) -> str:
+    return " ".join(sentence(rng) for _ in range(sentences))
+
+
+def text_bytes(rng: random.Random, size: int) -> bytes:
+    out: list[str] = []
+    total = 0
+    while total < size:
+        line = paragraph(rng) + "\n"
+        out.append(line)
+        total += len(line)
+    return "".join(out).encode("utf-8")[:size]
+
+
+def markdown_bytes(rng: random.Random, sections: int) -> bytes:
+    out = []
+    for number in range(sections):
+        out.append(f"# Section {number}\n\n{paragraph(rng)}\n\n- {sentence(rng)}\n- {sentence(rng)}\n\n")
+    return "".join(out).encode("utf-8")
+
+
+def pdf_bytes(rng: random.Random, pages: int) -> bytes:
+    import fitz  # type: ignore
+
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        y = 72
+        for _ in range(30):
+            page.insert_text((72, y), sentence(rng, 10))
+            y += 20
+    data = doc.tobytes(garbage=0, deflate=True)
+    doc.close()
+    return data
+
+
+def docx_bytes(rng: random.Random, paragraphs: int, tables: int = 0) -> bytes:
+    from docx import Document  # type: ignore
+
+    document = Document()
+    for number in range(paragraphs):
+        document.add_paragraph(paragraph(rng, 3))
+        if tables and number % max(1, paragraphs // tables) == 0:
+            table = document.add_table(rows=3, cols=3)
+            for cell in table._cells:
+                cell.text = sentence(rng, 3)
+    buffer = BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def html_bytes(rng: random.Random, sections: int, table_rows: int = 0) -> bytes:
+    parts = [
+        "<html><head><title>Synthetic page</title><style>p{margin:0}</style>",
+        "<script>var x = 1;</script></head><body><nav><a href='/'>Home</a></nav>",
+    ]
+    for number in range(sections):
+        parts.append(f"<h2>Heading {number}</h2><p>{paragraph(rng)}</p>")
+    if table_rows:
+        parts.append("<table>")
+        for row in range(table_rows):
+            parts.append(f"<tr><td>{row}</td><td>{sentence(rng, 4)}</td></tr>")
+        parts.append("</table>")
+    parts.append("</body></html>")
+    return "".join(parts).encode("utf-8")
+
+
+def eml_bytes(rng: random.Random, attachments: int, nested: bool = True) -> bytes:
+    msg = EmailMessage()
+    msg["Subject"] = sentence(rng, 5)
+    msg["From"] = "alice@example.com"
+    msg["To"] = "bob@example.com"
+    msg["Date"] = "Mon, 01 Jan 2024 00:00:00 +0000"
+    msg.set_content(paragraph(rng, 20))
+    msg.add_alternative(f"<html><body><p>{paragraph(rng, 20)}</p></body></html>", subtype="html")
+    for number in range(attachments):
+        msg.add_attachment(
+            text_bytes(rng, 4096), maintype="text", subtype="plain", filename=f"attachment-{number}.txt"
+        )
+    if nested:
+        inner = EmailMessage()
+        inner["Subject"] = "Forwarded"
+        inner.set_content(paragraph(rng, 10))
+        inner.add_attachment(text_bytes(rng, 2048), maintype="text", subtype="plain", filename="inner.txt")
+        msg.add_attachment(inner)
+    return msg.as_bytes()
+
+
+def zip_bytes(rng: random.Random, members: int) -> bytes:
+    buffer = BytesIO()
+    with ZipFile(buffer, "w", ZIP_DEFLATED) as archive:
+        for number in range(members):
+            archive.writestr(f"docs/note-{number}.txt", text_bytes(rng, 16 * 1024))
+            if number % 10 == 0:
+                archive.writestr(f"docs/page-{number}.html", html_bytes(rng, 10))
+    return buffer.getvalue()
+
+
+def build_corpus(root: Path, seed: int = 0, scale: int = 1) -> dict[str, list[CorpusItem]]:
+    """Write one corpus per format under `root`; `scale` multiplies sizes."""
+    rng = random.Random(seed)
+    root.mkdir(parents=True, exist_ok=True)
+    corpus: dict[str, list[CorpusItem]] = {}
+
+    def add(group: str, filename: str, data: bytes) -> None:
+        path = root / group / filename
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        corpus.setdefault(group, []).append(CorpusItem(path, filename))
+
+    for number in range(20 * scale):
+        add("text", f"note-{number}.txt", text_bytes(rng, 8 * 1024))
+    add("text-large", "large.txt", text_bytes(rng, 8 * 1024 * 1024 * scale))
+    for number in range(10 * scale):
+        add("markdown", f"doc-{number}.md", markdown_bytes(rng, 20))
+    for pages in (1, 10, 100 * scale):
+        add("pdf", f"pages-{pages}.pdf", pdf_bytes(rng, pages))
+    for number in range(5 * scale):
+        add("docx", f"doc-{number}.docx", docx_bytes(rng, 200))
+    add("docx-large", "large.docx", docx_bytes(rng, 5000 * scale, tables=50))
+    for number in range(10 * scale):
+        add("html", f"page-{number}.html", html_bytes(rng, 30))
+    add("html-large", "table.html", html_bytes(rng, 10, table_rows=20000 * scale))
+    for number in range(10 * scale):
+        add("eml", f"message-{number}.eml", eml_bytes(rng, attachments=3))
+    for number in range(3 * scale):
+        add("zip", f"bundle-{number}.zip", zip_bytes(rng, 50))
+    return corpus
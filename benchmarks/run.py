@@ -0,0 +1,239 @@
+"""Benchmark runner: `python -m benchmarks.run [--out results.json] [--baseline old.json]`.
+
+Each case runs in a fresh spawned process so its peak RSS is its own.
+Results are written as JSON; with a baseline, cases whose throughput drops
+or whose p99 latency / peak RSS grows by more than the threshold are flagged
+and the exit status is 1.
+"""
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import json
+import multiprocessing
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+from benchmarks.corpus import build_corpus
+
+# name -> (operation, corpus group, variant). A variant such as "docx:fast"
+# extracts with only that DOCX engine or HTML strategy instead of the default
+# registry, so the paths can be compared on the same corpus.
+CASES: dict[str, tuple[str, str, str | None]] = {}
+for _group in ("text", "text-large", "markdown", "pdf", "docx", "docx-large", "html", "html-large", "eml", "zip"):
+    CASES[f"import/{_group}"] = ("import", _group, None)
+    CASES[f"extract/{_group}"] = ("extract", _group, None)
+for _group in ("docx", "docx-large"):
+    for _engine in ("fast", "python-docx"):
+        CASES[f"extract/{_group}@{_engine}"] = ("extract", _group, f"docx:{_engine}")
+for _group in ("html", "html-large"):
+    for _strategy in ("fast", "readability"):
+        CASES[f"extract/{_group}@{_strategy}"] = ("extract", _group, f"html:{_strategy}")
+for _group in ("text", "pdf", "docx", "html", "eml", "zip"):
+    CASES[f"select/{_group}"] = ("select", _group, None)
+CASES["storage/write"] = ("store_write", "text", None)
+CASES["storage/read"] = ("store_read", "text", None)
+CASES["storage/write-large"] = ("store_write", "text-large", None)
+CASES["storage/read-large"] = ("store_read", "text-large", None)
+
+SELECT_ROUNDS = 1000
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _measure(ops: list[tuple[int, Callable[[], object]]], repeat: int) -> dict:
+    latencies: list[float] = []
+    total_bytes = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for size, op in ops:
+            t0 = time.perf_counter()
+            op()
+            latencies.append(time.perf_counter() - t0)
+            total_bytes += size
+    elapsed = time.perf_counter() - started
+    return {
+        "ops": len(latencies),
+        "bytes": total_bytes,
+        "seconds": elapsed,
+        "docs_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "mb_per_s": total_bytes / 1e6 / elapsed if elapsed else 0.0,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+    }
+
+
+def _registry(variant: str | None):
+    from dbl_artifacts import ExtractorRegistry, default_registry
+    from dbl_artifacts.extractors import DocxExtractor, HtmlExtractor
+
+    if variant is None:
+        return default_registry()
+    fmt, _, value = variant.partition(":")
+    extractor = DocxExtractor(engine=value) if fmt == "docx" else HtmlExtractor(strategy=value)
+    return ExtractorRegistry([extractor])
+
+
+def _case_ops(
+    kind: str, paths: list[Path], workdir: Path, variant: str | None = None
+) -> list[tuple[int, Callable[[], object]]]:
+    from dbl_artifacts import LocalStorage, default_registry, extract_text, import_artifact
+
+    storage = LocalStorage(workdir / "store")
+    if kind == "import":
+        return [(path.stat().st_size, lambda p=path: import_artifact(p, p.name, storage=storage)) for path in paths]
+    if kind == "extract":
+        registry = _registry(variant)
+        ops = []
+        for path in paths:
+            artifact = import_artifact(path, path.name, storage=storage)
+            ops.append((artifact.byte_size, lambda a=artifact: extract_text(a, storage=storage, registry=registry)))
+        if variant is not None and paths:
+            # A variant whose dependency is missing would fail fast and look like a speedup.
+            failure = extract_text(artifact, storage=storage, registry=registry).failure
+            if failure is not None:
+                raise RuntimeError(f"{variant}: {failure.reason_code.value}: {failure.detail}")
+        return ops
+    if kind == "select":
+        registry = default_registry()
+        ops = []
+        for path in paths:
+            artifact = import_artifact(path, path.name, storage=storage)
+            head = storage.read_head(Path(artifact.storage_uri))
+            extension = path.suffix.lower()
+
+            def select_many(media=artifact.media_type, ext=extension, magic=head) -> None:
+                for _ in range(SELECT_ROUNDS):
+                    registry.select(media, ext, magic)
+
+            ops.append((0, select_many))
+        return ops
+    if kind == "store_write":
+        blobs = [path.read_bytes() for path in paths]
+        # A fresh root per pass keeps every write a real write, not a dedup hit.
+        roots = iter(range(1 << 30))
+        return [
+            (len(data), lambda d=data: LocalStorage(workdir / f"store-{next(roots)}").store_bytes(d)) for data in blobs
+        ]
+    if kind == "store_read":
+        stored = [storage.store_bytes(path.read_bytes()) for path in paths]
+        return [(path.stat().st_size, lambda p=path: storage.read_bytes(p)) for path in stored]
+    raise ValueError(f"unknown benchmark kind: {kind}")
+
+
+def _run_case(kind: str, paths: list[str], repeat: int, variant: str | None = None) -> dict:
+    with tempfile.TemporaryDirectory(prefix="dbl-bench-") as tmp:
+        ops = _case_ops(kind, [Path(path) for path in paths], Path(tmp), variant)
+        result = _measure(ops, repeat)
+    if kind == "select":
+        result["docs_per_s"] *= SELECT_ROUNDS
+        result["p50_ms"] /= SELECT_ROUNDS
+        result["p99_ms"] /= SELECT_ROUNDS
+        result["ops"] *= SELECT_ROUNDS
+    result["peak_rss_kb"] = _peak_rss_kb()
+    return result
+
+
+def _peak_rss_kb() -> int:
+    # ru_maxrss survives fork+exec on Linux, so it would include the parent's
+    # peak; VmHWM belongs to this process image only.
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1])
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def run(cases: list[str], corpus_root: Path, seed: int, scale: int, repeat: int) -> dict:
+    corpus = build_corpus(corpus_root, seed=seed, scale=scale)
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for name in cases:
+        kind, group, variant = CASES[name]
+        paths = [str(item.path) for item in corpus[group]]
+        with context.Pool(1) as pool:
+            results[name] = pool.apply(_run_case, (kind, paths, repeat, variant))
+        print(f"{name:32} {results[name]['mb_per_s']:10.2f} MB/s {results[name]['docs_per_s']:12.1f} docs/s "
+              f"p99 {results[name]['p99_ms']:9.3f} ms  rss {results[name]['peak_rss_kb']} KiB", file=sys.stderr)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": seed,
+            "scale": scale,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.10, rss_threshold: float = 0.20) -> list[str]:
+    """Return one message per regression of `current` against `baseline`."""
+    regressions = []
+    for name, now in sorted(current["results"].items()):
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            continue
+        rate = "mb_per_s" if before.get("bytes") else "docs_per_s"
+        if before[rate] and now[rate] < before[rate] * (1 - threshold):
+            regressions.append(f"{name}: {rate} {before[rate]:.2f} -> {now[rate]:.2f}")
+        if before["p99_ms"] and now["p99_ms"] > before["p99_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p99_ms {before['p99_ms']:.3f} -> {now['p99_ms']:.3f}")
+        if before["peak_rss_kb"] and now["peak_rss_kb"] > before["peak_rss_kb"] * (1 + rss_threshold):
+            regressions.append(f"{name}: peak_rss_kb {before['peak_rss_kb']} -> {now['peak_rss_kb']}")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__.splitlines()[0])
+    parser.add_argument("--out", type=Path, help="write JSON results here (default: stdout)")
+    parser.add_argument("--baseline", type=Path, help="flag regressions against this results file")
+    parser.add_argument("--current", type=Path, help="compare this results file instead of running")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed throughput/p99 change (0.10 = 10%%)")
+    parser.add_argument("--rss-threshold", type=float, default=0.20, help="allowed peak RSS growth")
+    parser.add_argument("--case", action="append", default=[], help="glob of case names to run (repeatable)")
+    parser.add_argument("--list", action="store_true", help="list case names and exit")
+    parser.add_argument("--corpus", type=Path, help="corpus directory (default: a temp dir)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scale", type=int, default=1, help="corpus size multiplier")
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the corpus per case")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print("\n".join(CASES))
+        return 0
+    if args.current is not None:
+        current = json.loads(args.current.read_text())
+    else:
+        patterns = args.case or ["*"]
+        cases = [name for name in CASES if any(fnmatch.fnmatch(name, pattern) for pattern in patterns)]
+        with tempfile.TemporaryDirectory(prefix="dbl-corpus-") as tmp:
+            current = run(cases, args.corpus or Path(tmp), args.seed, args.scale, args.repeat)
+        payload = json.dumps(current, indent=2, sort_keys=True)
+        if args.out is not None:
+            args.out.write_text(payload + "\n")
+        else:
+            print(payload)
+    if args.baseline is None:
+        return 0
+    regressions = compare(json.loads(args.baseline.read_text()), current, args.threshold, args.rss_threshold)
+    for message in regressions:
+        print(f"REGRESSION {message}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
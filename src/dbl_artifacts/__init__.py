@@ -1,11 +1,63 @@
-"""Deterministic artifact import and extraction."""
+"""Deterministic artifact import and extraction.
 
-from .errors import ReasonCode, FailureRecord, ArtifactError
-from .models import ArtifactRecord, DerivationResult, JOB_IMPORT, JOB_EXTRACT_TEXT
-from .storage import LocalStorage
-from .importer import import_artifact
-from .extract import extract_text
-from .registry import ExtractorRegistry, default_registry
+Submodules are imported on first attribute access, so `import dbl_artifacts`
+stays cheap for short-lived processes.
+"""
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .errors import ReasonCode, FailureRecord, ArtifactError
+    from .models import ArtifactRecord, DerivationResult, JOB_IMPORT, JOB_EXTRACT_TEXT
+    from .storage import LocalStorage
+    from .trace import SpanEvent, StageTimings, tracing
+    from .cache import DerivationCache
+    from .import_index import ImportIndex
+    from .catalog import ArtifactCatalog
+    from .importer import import_artifact
+    from .extract import extract_text
+    from .registry import ExtractorRegistry, default_registry, warmup
+    from .extractors.base import ExtractBudget, ExtractorSpec
+    from .batch import import_many, extract_many
+    from .mailboxes import import_mbox, import_maildir
+    from .aio import AsyncPipeline
+    from .sandbox import ExtractorSandbox
+    from ._scrub import ScrubReport, ScrubState, scrub
+
+_EXPORTS = {
+    "ReasonCode": ".errors",
+    "FailureRecord": ".errors",
+    "ArtifactError": ".errors",
+    "ArtifactRecord": ".models",
+    "DerivationResult": ".models",
+    "JOB_IMPORT": ".models",
+    "JOB_EXTRACT_TEXT": ".models",
+    "LocalStorage": ".storage",
+    "SpanEvent": ".trace",
+    "StageTimings": ".trace",
+    "tracing": ".trace",
+    "DerivationCache": ".cache",
+    "ImportIndex": ".import_index",
+    "ArtifactCatalog": ".catalog",
+    "import_artifact": ".importer",
+    "extract_text": ".extract",
+    "ExtractorRegistry": ".registry",
+    "default_registry": ".registry",
+    "warmup": ".registry",
+    "ExtractorSpec": ".extractors.base",
+    "ExtractBudget": ".extractors.base",
+    "import_many": ".batch",
+    "extract_many": ".batch",
+    "import_mbox": ".mailboxes",
+    "import_maildir": ".mailboxes",
+    "AsyncPipeline": ".aio",
+    "ExtractorSandbox": ".sandbox",
+    "scrub": "._scrub",
+    "ScrubReport": "._scrub",
+    "ScrubState": "._scrub",
+}
 
 __all__ = [
     "ArtifactRecord",
@@ -16,8 +68,39 @@ __all__ = [
     "FailureRecord",
     "ArtifactError",
     "LocalStorage",
+    "DerivationCache",
+    "ImportIndex",
+    "ArtifactCatalog",
     "ExtractorRegistry",
+    "ExtractorSpec",
+    "ExtractBudget",
     "default_registry",
+    "warmup",
     "import_artifact",
     "extract_text",
+    "import_many",
+    "extract_many",
+    "import_mbox",
+    "import_maildir",
+    "AsyncPipeline",
+    "ExtractorSandbox",
+    "SpanEvent",
+    "StageTimings",
+    "tracing",
+    "scrub",
+    "ScrubReport",
+    "ScrubState",
 ]
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
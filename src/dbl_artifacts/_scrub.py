@@ -0,0 +1,321 @@
+"""Parallel integrity verification of a LocalStorage tree."""
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO
+
+from .compression import open_decompressed
+from .db import Database, connect
+from .packfile import PACK_DIRNAME, PackStore
+from .pool import bounded_map, default_workers
+from .storage import CHUNK_SIZE, TEMP_DIRNAME, TEMP_PREFIX, LocalStorage
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS verified (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    verified_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+_FANOUT = re.compile(r"[0-9a-f]{2}")
+_BLOB = re.compile(r"([0-9a-f]{64})(\.dblz)?")
+_HASH_BUFFER = 4 * CHUNK_SIZE
+
+
+@dataclass(frozen=True)
+class ScrubReport:
+    """Outcome of a scrub; paths are relative to the storage root.
+
+    Packed objects are reported as `packs/<segment>#<sha256>`.
+    """
+
+    checked: int = 0
+    skipped: int = 0
+    bytes_hashed: int = 0
+    corrupt: tuple[str, ...] = ()
+    truncated: tuple[str, ...] = ()
+    orphaned: tuple[str, ...] = ()
+    duration: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not (self.corrupt or self.truncated or self.orphaned)
+
+    def to_dict(self) -> dict:
+        return {
+            "checked": self.checked,
+            "skipped": self.skipped,
+            "bytes_hashed": self.bytes_hashed,
+            "corrupt": list(self.corrupt),
+            "truncated": list(self.truncated),
+            "orphaned": list(self.orphaned),
+            "duration": self.duration,
+        }
+
+
+@dataclass(frozen=True)
+class ScrubState:
+    """SQLite record of blobs that verified clean, keyed by relative path.
+
+    A blob is skipped by later scrubs while its size and mtime are unchanged
+    and it was verified less than `max_age` seconds ago (forever if None).
+    """
+
+    path: Path
+    max_age: float | None = None
+
+    def _db(self) -> Database:
+        return connect(self.path, _SCHEMA)
+
+    def load(self, prefix: str) -> dict[str, tuple[int, int]]:
+        """Return {path: (size, mtime_ns)} of still-fresh entries starting with `prefix`."""
+        cutoff = time.time() - self.max_age if self.max_age is not None else float("-inf")
+        end = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        rows = self._db().execute(
+            "SELECT path, size, mtime_ns FROM verified WHERE path >= ? AND path < ? AND verified_at >= ?",
+            (prefix, end, cutoff),
+        )
+        return {path: (size, mtime_ns) for path, size, mtime_ns in rows}
+
+    def update(self, verified: list[tuple[str, int, int]], failed: list[str]) -> None:
+        now = time.time()
+        with self._db().transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO verified (path, size, mtime_ns, verified_at) VALUES (?, ?, ?, ?)",
+                [(path, size, mtime_ns, now) for path, size, mtime_ns in verified],
+            )
+            conn.executemany("DELETE FROM verified WHERE path = ?", [(path,) for path in failed])
+
+
+@dataclass
+class _Result:
+    checked: int = 0
+    skipped: int = 0
+    bytes_hashed: int = 0
+    corrupt: list[str] = field(default_factory=list)
+    truncated: list[str] = field(default_factory=list)
+    orphaned: list[str] = field(default_factory=list)
+    verified: list[tuple[str, int, int]] = field(default_factory=list)
+
+
+class _Throttle:
+    """Sleep as needed to keep reads under `rate` bytes per second."""
+
+    def __init__(self, rate: float | None) -> None:
+        self.rate = rate
+        self.started = time.monotonic()
+        self.consumed = 0
+
+    def consume(self, size: int) -> None:
+        if not self.rate:
+            return
+        self.consumed += size
+        ahead = self.consumed / self.rate - (time.monotonic() - self.started)
+        if ahead > 0:
+            time.sleep(ahead)
+
+
+def scrub(
+    storage: LocalStorage,
+    *,
+    state: ScrubState | None = None,
+    workers: int | None = None,
+    max_mb_per_sec: float | None = None,
+) -> ScrubReport:
+    """Re-hash every blob under `storage.root` and report problems.
+
+    Loose blobs are verified one fan-out directory per task and packed
+    objects one segment per task, on `workers` processes (inline when
+    `workers == 1`). Corrupt blobs hash to the wrong address; truncated blobs
+    are shorter than last time they verified, or are compressed streams that
+    end early; orphans are stray files in the fan-out tree, pack segments the
+    index does not know, and stale temp files. With `state`, blobs that
+    verified before and have not changed are skipped. `max_mb_per_sec` caps
+    the combined read rate. Nothing is modified or removed.
+    """
+    started = time.monotonic()
+    count = workers or default_workers()
+    rate = max_mb_per_sec * 1024 * 1024 / count if max_mb_per_sec else None
+    units = [("loose", entry.name) for entry in _scandir(storage.root) if entry.is_dir() and _FANOUT.fullmatch(entry.name)]
+    packs = PackStore(storage.root / PACK_DIRNAME)
+    if (packs.root / "index.sqlite").exists():
+        units.extend(("pack", segment.name) for segment, _ in packs.segments())
+    # Lazy, so each unit's state is loaded only as the unit is submitted.
+    jobs = ((str(storage.root), kind, name, state.load(_unit_prefix(kind, name)) if state else {}, rate) for kind, name in units)
+
+    total = _Result()
+    if count == 1:
+        results = (_scrub_unit(job) for job in jobs)
+        _merge_all(results, total, state)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=count) as executor:
+            results = (future.result() for _, future in bounded_map(executor, _scrub_unit, jobs, 2 * count))
+            _merge_all(results, total, state)
+    total.orphaned.extend(_orphans_outside_fanout(storage, packs))
+    return ScrubReport(
+        checked=total.checked,
+        skipped=total.skipped,
+        bytes_hashed=total.bytes_hashed,
+        corrupt=tuple(sorted(total.corrupt)),
+        truncated=tuple(sorted(total.truncated)),
+        orphaned=tuple(sorted(total.orphaned)),
+        duration=time.monotonic() - started,
+    )
+
+
+def _merge_all(results, total: _Result, state: ScrubState | None) -> None:
+    for result in results:
+        total.checked += result.checked
+        total.skipped += result.skipped
+        total.bytes_hashed += result.bytes_hashed
+        total.corrupt.extend(result.corrupt)
+        total.truncated.extend(result.truncated)
+        total.orphaned.extend(result.orphaned)
+        if state is not None:
+            # A bad packed object invalidates its whole segment's entry.
+            failed = {path.partition("#")[0] for path in result.corrupt + result.truncated}
+            state.update(result.verified, sorted(failed))
+
+
+def _unit_prefix(kind: str, name: str) -> str:
+    return f"{name}/" if kind == "loose" else f"{PACK_DIRNAME}/{name}"
+
+
+def _scrub_unit(job: tuple[str, str, str, dict[str, tuple[int, int]], float | None]) -> _Result:
+    root, kind, name, known, rate = job
+    result = _Result()
+    throttle = _Throttle(rate)
+    if kind == "loose":
+        _scrub_fanout(Path(root), name, known, throttle, result)
+    else:
+        _scrub_segment(Path(root), name, known, throttle, result)
+    return result
+
+
+def _scrub_fanout(root: Path, prefix: str, known: dict[str, tuple[int, int]], throttle: _Throttle, result: _Result) -> None:
+    for sub in _scandir(root / prefix):
+        if not (sub.is_dir(follow_symlinks=False) and _FANOUT.fullmatch(sub.name)):
+            result.orphaned.append(f"{prefix}/{sub.name}")
+            continue
+        for entry in _scandir(Path(sub.path)):
+            relative = f"{prefix}/{sub.name}/{entry.name}"
+            match = _BLOB.fullmatch(entry.name)
+            if match is None or not entry.is_file(follow_symlinks=False) or match.group(1)[:4] != prefix + sub.name:
+                result.orphaned.append(relative)
+                continue
+            stat = entry.stat(follow_symlinks=False)
+            previous = known.get(relative)
+            if previous == (stat.st_size, stat.st_mtime_ns):
+                result.skipped += 1
+                continue
+            result.checked += 1
+            try:
+                with open(entry.path, "rb", buffering=0) as raw:
+                    handle = open_decompressed(raw) if match.group(2) else raw
+                    digest, size = _hash_stream(handle, throttle)
+                result.bytes_hashed += size
+            except EOFError:
+                result.truncated.append(relative)
+                continue
+            except Exception:
+                result.corrupt.append(relative)
+                continue
+            if digest == match.group(1):
+                result.verified.append((relative, stat.st_size, stat.st_mtime_ns))
+            elif (previous is not None and stat.st_size < previous[0]) or _empty_but_addressed(stat.st_size, match):
+                result.truncated.append(relative)
+            else:
+                result.corrupt.append(relative)
+
+
+def _scrub_segment(root: Path, name: str, known: dict[str, tuple[int, int]], throttle: _Throttle, result: _Result) -> None:
+    packs = PackStore(root / PACK_DIRNAME)
+    segment = packs.root / name
+    relative = f"{PACK_DIRNAME}/{name}"
+    try:
+        stat = segment.stat()
+    except FileNotFoundError:
+        result.truncated.append(relative)
+        return
+    entries = list(packs.entries(segment))
+    if known.get(relative) == (stat.st_size, stat.st_mtime_ns):
+        result.skipped += len(entries)
+        return
+    clean = True
+    with segment.open("rb") as handle:
+        for digest, entry in entries:
+            result.checked += 1
+            label = f"{relative}#{digest}"
+            if entry.offset + entry.length > stat.st_size:
+                result.truncated.append(label)
+                clean = False
+                continue
+            handle.seek(entry.offset)
+            payload = handle.read(entry.length)
+            throttle.consume(len(payload))
+            result.bytes_hashed += len(payload)
+            try:
+                stream = open_decompressed(io.BytesIO(payload)) if entry.encoded else io.BytesIO(payload)
+                actual, _ = _hash_stream(stream, _Throttle(None))
+            except EOFError:
+                result.truncated.append(label)
+                clean = False
+                continue
+            except Exception:
+                actual = None
+            if actual != digest:
+                result.corrupt.append(label)
+                clean = False
+    if clean:
+        result.verified.append((relative, stat.st_size, stat.st_mtime_ns))
+
+
+def _hash_stream(handle: BinaryIO, throttle: _Throttle) -> tuple[str, int]:
+    digest = hashlib.sha256()
+    buffer = bytearray(_HASH_BUFFER)
+    view = memoryview(buffer)
+    size = 0
+    while True:
+        read = handle.readinto(view)
+        if not read:
+            break
+        digest.update(view[:read])
+        size += read
+        throttle.consume(read)
+    return digest.hexdigest(), size
+
+
+def _empty_but_addressed(size: int, match: re.Match) -> bool:
+    return size == 0 and match.group(1) != hashlib.sha256(b"").hexdigest()
+
+
+def _orphans_outside_fanout(storage: LocalStorage, packs: PackStore) -> list[str]:
+    orphans = []
+    cutoff = time.time() - storage.temp_max_age
+    for entry in _scandir(storage.root / TEMP_DIRNAME):
+        if entry.name.startswith(TEMP_PREFIX) and entry.stat().st_mtime < cutoff:
+            orphans.append(f"{TEMP_DIRNAME}/{entry.name}")
+    if packs.root.exists():
+        indexed = {segment.name for segment, _ in packs.segments()} if (packs.root / "index.sqlite").exists() else set()
+        for entry in _scandir(packs.root):
+            if entry.name.endswith(".seg") and entry.name not in indexed:
+                orphans.append(f"{PACK_DIRNAME}/{entry.name}")
+    return orphans
+
+
+def _scandir(path: Path) -> list[os.DirEntry]:
+    try:
+        with os.scandir(path) as entries:
+            return sorted(entries, key=lambda entry: entry.name)
+    except (FileNotFoundError, NotADirectoryError):
+        return []
@@ -0,0 +1,119 @@
+"""asyncio front-end for import and extraction."""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+
+from .batch import _extract_one
+from .cache import DerivationCache
+from .detect import extension_from_filename
+from .errors import FailureRecord, ReasonCode
+from .importer import Source, _import_bytes, _import_stream
+from .models import ArtifactRecord, DerivationResult
+from .pool import default_workers
+from .registry import ExtractorRegistry, _shared_registry
+from .storage import LocalStorage
+
+
+class AsyncPipeline:
+    """Async import and extraction that never blocks the event loop.
+
+    File I/O and hashing run on a thread pool; parsing runs on a process
+    pool. Extraction is limited per extractor name (`limits`, falling back to
+    `default_limit`) so a burst of one format cannot starve the others.
+    """
+
+    def __init__(
+        self,
+        storage: LocalStorage | None = None,
+        registry: ExtractorRegistry | None = None,
+        cache: DerivationCache | None = None,
+        *,
+        limits: dict[str, int] | None = None,
+        default_limit: int | None = None,
+        io_executor: Executor | None = None,
+        parse_executor: Executor | None = None,
+    ) -> None:
+        self.storage = storage or LocalStorage(Path.cwd() / "data")
+        self.registry = registry
+        self.cache = cache
+        self.limits = dict(limits or {})
+        self.default_limit = default_limit or default_workers()
+        self._owned: list[Executor] = []
+        self._io = io_executor or self._own(ThreadPoolExecutor())
+        self._parse = parse_executor or self._own(ProcessPoolExecutor(max_workers=default_workers()))
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+
+    def _own(self, executor: Executor) -> Executor:
+        self._owned.append(executor)
+        return executor
+
+    def _semaphore(self, name: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(name)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.limits.get(name, self.default_limit))
+            self._semaphores[name] = semaphore
+        return semaphore
+
+    async def import_artifact(self, source: Source, filename: str, media_type: str | None = None) -> ArtifactRecord:
+        """Async `import_artifact`.
+
+        On cancellation the copy is stopped and its temp file removed before
+        `CancelledError` propagates.
+        """
+        loop = asyncio.get_running_loop()
+        if isinstance(source, bytes):
+            return await loop.run_in_executor(
+                self._io, contextvars.copy_context().run, _import_bytes, source, filename, media_type, self.storage
+            )
+        cancel = threading.Event()
+        future = loop.run_in_executor(
+            self._io,
+            contextvars.copy_context().run,
+            partial(_import_stream, source, filename, media_type, self.storage, cancel=cancel),
+        )
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            cancel.set()
+            await asyncio.wait([future])
+            raise
+
+    async def extract_text(self, artifact: ArtifactRecord) -> DerivationResult:
+        """Async `extract_text`, bounded per selected extractor."""
+        loop = asyncio.get_running_loop()
+        try:
+            magic = await loop.run_in_executor(self._io, self.storage.read_head, Path(artifact.storage_uri), 512)
+        except Exception as exc:
+            return DerivationResult.failed(FailureRecord(ReasonCode.EXTRACT_PARSE_ERROR, str(exc)))
+        # Building the registry and a first selection can import parser modules, so neither runs on the loop.
+        extractor = await loop.run_in_executor(self._io, self._select, artifact, magic)
+        if extractor is None:
+            extension = extension_from_filename(artifact.original_filename)
+            return DerivationResult.failed(
+                FailureRecord(ReasonCode.EXTRACT_UNSUPPORTED_TYPE, f"unsupported file type: {extension}")
+            )
+        async with self._semaphore(extractor.name):
+            return await loop.run_in_executor(
+                self._parse,
+                partial(_extract_one, artifact, storage=self.storage, registry=self.registry, cache=self.cache),
+            )
+
+    def _select(self, artifact: ArtifactRecord, magic: bytes):
+        reg = self.registry or _shared_registry()
+        return reg.select(artifact.media_type, extension_from_filename(artifact.original_filename), magic)
+
+    async def aclose(self) -> None:
+        for executor in self._owned:
+            executor.shutdown(wait=False, cancel_futures=True)
+        self._owned.clear()
+
+    async def __aenter__(self) -> AsyncPipeline:
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
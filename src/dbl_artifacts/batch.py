@@ -0,0 +1,127 @@
+"""Parallel batch import and extraction."""
+from __future__ import annotations
+
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import ExitStack
+from functools import partial
+from pathlib import Path
+from typing import Iterable, Iterator, TypeVar
+
+from .cache import DerivationCache
+from .catalog import ArtifactCatalog
+from .errors import ArtifactError, FailureRecord, ReasonCode
+from .extract import extract_text
+from .importer import import_artifact
+from .models import ArtifactRecord, DerivationResult
+from .pool import bounded_map, default_workers
+from .registry import ExtractorRegistry
+from .storage import LocalStorage
+
+# A path (filename taken from its name), or (source, filename[, media_type]).
+BatchSource = str | Path | tuple[bytes | str | Path, str] | tuple[bytes | str | Path, str, str | None]
+
+T = TypeVar("T")
+
+
+def _default_storage() -> LocalStorage:
+    return LocalStorage(Path.cwd() / "data")
+
+
+def import_many(
+    sources: Iterable[BatchSource],
+    storage: LocalStorage | None = None,
+    catalog: ArtifactCatalog | None = None,
+    *,
+    max_workers: int | None = None,
+    max_in_flight: int | None = None,
+    ordered: bool = True,
+    executor: Executor | None = None,
+) -> Iterator[tuple[int, ArtifactRecord | FailureRecord]]:
+    """Import many sources on a process pool.
+
+    Yields `(index, record_or_failure)`; failures never raise. Sources must be
+    picklable, so file-like objects are not accepted here.
+    """
+    store = storage or _default_storage()
+    jobs = (_import_job(source) for source in sources)
+    fn = partial(_import_one, storage=store, catalog=catalog)
+    yield from _run(jobs, fn, max_workers, max_in_flight, ordered, executor, _import_crash)
+
+
+def extract_many(
+    artifacts: Iterable[ArtifactRecord],
+    storage: LocalStorage | None = None,
+    registry: ExtractorRegistry | None = None,
+    cache: DerivationCache | None = None,
+    catalog: ArtifactCatalog | None = None,
+    *,
+    max_workers: int | None = None,
+    max_in_flight: int | None = None,
+    ordered: bool = True,
+    executor: Executor | None = None,
+) -> Iterator[tuple[int, DerivationResult]]:
+    """Extract text from many artifacts on a process pool.
+
+    Yields `(index, DerivationResult)`; failures are reported in the result.
+    """
+    store = storage or _default_storage()
+    fn = partial(_extract_one, storage=store, registry=registry, cache=cache, catalog=catalog)
+    yield from _run(artifacts, fn, max_workers, max_in_flight, ordered, executor, _extract_crash)
+
+
+def _run(items, fn, max_workers, max_in_flight, ordered, executor, on_crash) -> Iterator[tuple[int, T]]:
+    workers = max_workers or default_workers()
+    with ExitStack() as stack:
+        if executor is None:
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+        limit = max_in_flight or 2 * workers
+        for index, future in bounded_map(executor, fn, items, limit, ordered=ordered):
+            try:
+                yield index, future.result()
+            except Exception as exc:
+                yield index, on_crash(exc)
+
+
+def _import_job(source: BatchSource) -> tuple[bytes | str | Path, str, str | None]:
+    if isinstance(source, (str, Path)):
+        return source, Path(source).name, None
+    if len(source) == 2:
+        return source[0], source[1], None
+    return source[0], source[1], source[2]
+
+
+def _import_one(
+    job: tuple[bytes | str | Path, str, str | None],
+    storage: LocalStorage,
+    catalog: ArtifactCatalog | None = None,
+) -> ArtifactRecord | FailureRecord:
+    source, filename, media_type = job
+    try:
+        return import_artifact(source, filename, media_type=media_type, storage=storage, catalog=catalog)
+    except ArtifactError as exc:
+        return FailureRecord(exc.reason_code, exc.detail)
+    except Exception as exc:
+        return FailureRecord(ReasonCode.IMPORT_READ_ERROR, str(exc))
+
+
+def _extract_one(
+    artifact: ArtifactRecord,
+    storage: LocalStorage,
+    registry: ExtractorRegistry | None,
+    cache: DerivationCache | None,
+    catalog: ArtifactCatalog | None = None,
+) -> DerivationResult:
+    try:
+        return extract_text(artifact, storage=storage, registry=registry, cache=cache, catalog=catalog)
+    except ArtifactError as exc:
+        return DerivationResult.failed(FailureRecord(exc.reason_code, exc.detail))
+    except Exception as exc:
+        return DerivationResult.failed(FailureRecord(ReasonCode.EXTRACT_PARSE_ERROR, str(exc)))
+
+
+def _import_crash(exc: Exception) -> FailureRecord:
+    return FailureRecord(ReasonCode.IMPORT_READ_ERROR, f"worker failed: {exc}")
+
+
+def _extract_crash(exc: Exception) -> DerivationResult:
+    return DerivationResult.failed(FailureRecord(ReasonCode.EXTRACT_PARSE_ERROR, f"worker failed: {exc}"))
@@ -0,0 +1,122 @@
+"""Persistent derivation cache."""
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+from .db import Database, connect
+from .errors import ReasonCode
+from .models import DerivationResult
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS heads (
+    sha256 TEXT PRIMARY KEY,
+    head BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS derivations (
+    sha256 TEXT NOT NULL,
+    extractor TEXT NOT NULL,
+    options TEXT NOT NULL,
+    version TEXT NOT NULL,
+    result TEXT NOT NULL,
+    PRIMARY KEY (sha256, extractor, options)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS reroutes (
+    sha256 TEXT NOT NULL,
+    extractor TEXT NOT NULL,
+    options TEXT NOT NULL,
+    version TEXT NOT NULL,
+    media_type TEXT NOT NULL,
+    PRIMARY KEY (sha256, extractor, options)
+) WITHOUT ROWID;
+"""
+
+# Failures that depend on the environment rather than the content. Resource
+# limits include sandbox caps, which are not part of the options key.
+UNCACHEABLE_REASONS = frozenset(
+    {ReasonCode.EXTRACT_DEPENDENCY_MISSING, ReasonCode.EXTRACT_TIMEOUT, ReasonCode.EXTRACT_RESOURCE_LIMIT}
+)
+
+
+def options_key(options: dict[str, str] | None) -> str:
+    return json.dumps(options or {}, sort_keys=True, separators=(",", ":"))
+
+
+@dataclass(frozen=True)
+class DerivationCache:
+    """SQLite index of extraction results.
+
+    Results are keyed by (source sha256, extractor name, extractor version,
+    options). A stored entry whose extractor version differs from the
+    requested one is treated as a miss and overwritten on the next store.
+
+    When an extractor hands a blob on to another media type, the handoff is
+    recorded under the first extractor's key and the result under the key of
+    the extractor that produced it, so each one's version covers its part.
+    """
+
+    path: Path
+
+    def _db(self) -> Database:
+        return connect(self.path, _SCHEMA)
+
+    def head(self, sha256: str) -> bytes | None:
+        rows = self._db().execute("SELECT head FROM heads WHERE sha256 = ?", (sha256,))
+        return bytes(rows[0][0]) if rows else None
+
+    def put_head(self, sha256: str, head: bytes) -> None:
+        self._db().execute("INSERT OR IGNORE INTO heads (sha256, head) VALUES (?, ?)", (sha256, head))
+
+    def get(
+        self,
+        sha256: str,
+        extractor: str,
+        version: str,
+        options: dict[str, str] | None = None,
+    ) -> DerivationResult | None:
+        rows = self._db().execute(
+            "SELECT version, result FROM derivations WHERE sha256 = ? AND extractor = ? AND options = ?",
+            (sha256, extractor, options_key(options)),
+        )
+        if not rows or rows[0][0] != version:
+            return None
+        return DerivationResult.from_dict(json.loads(rows[0][1]))
+
+    def put(
+        self,
+        sha256: str,
+        extractor: str,
+        version: str,
+        options: dict[str, str] | None,
+        result: DerivationResult,
+    ) -> None:
+        if result.failure is not None and result.failure.reason_code in UNCACHEABLE_REASONS:
+            return
+        self._db().execute(
+            "INSERT OR REPLACE INTO derivations (sha256, extractor, options, version, result) VALUES (?, ?, ?, ?, ?)",
+            (sha256, extractor, options_key(options), version, json.dumps(result.to_dict(), sort_keys=True)),
+        )
+
+    def reroute(self, sha256: str, extractor: str, version: str, options: dict[str, str] | None = None) -> str | None:
+        """The media type `extractor` handed this content on to, if recorded."""
+        rows = self._db().execute(
+            "SELECT version, media_type FROM reroutes WHERE sha256 = ? AND extractor = ? AND options = ?",
+            (sha256, extractor, options_key(options)),
+        )
+        if not rows or rows[0][0] != version:
+            return None
+        return rows[0][1]
+
+    def put_reroute(
+        self,
+        sha256: str,
+        extractor: str,
+        version: str,
+        options: dict[str, str] | None,
+        media_type: str,
+    ) -> None:
+        self._db().execute(
+            "INSERT OR REPLACE INTO reroutes (sha256, extractor, options, version, media_type) VALUES (?, ?, ?, ?, ?)",
+            (sha256, extractor, options_key(options), version, media_type),
+        )
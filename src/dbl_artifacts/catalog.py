@@ -0,0 +1,201 @@
+"""SQLite artifact catalog and lineage index."""
+from __future__ import annotations
+
+import json
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from .db import Database, connect
+from .errors import FailureRecord, ReasonCode
+from .models import JOB_EXTRACT_TEXT, JOB_IMPORT, ArtifactRecord, DerivationResult
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    artifact_id TEXT NOT NULL,
+    original_filename TEXT NOT NULL,
+    media_type TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    byte_size INTEGER NOT NULL,
+    storage_uri TEXT NOT NULL,
+    metadata TEXT,
+    PRIMARY KEY (artifact_id, original_filename, media_type)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS artifacts_sha256 ON artifacts (sha256);
+CREATE INDEX IF NOT EXISTS artifacts_filename ON artifacts (original_filename);
+CREATE INDEX IF NOT EXISTS artifacts_media_type ON artifacts (media_type);
+CREATE TABLE IF NOT EXISTS lineage (
+    parent_id TEXT NOT NULL,
+    child_id TEXT NOT NULL,
+    job TEXT NOT NULL,
+    PRIMARY KEY (parent_id, child_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS lineage_child ON lineage (child_id);
+CREATE TABLE IF NOT EXISTS failures (
+    subject TEXT NOT NULL,
+    job TEXT NOT NULL,
+    reason_code TEXT NOT NULL,
+    detail TEXT NOT NULL,
+    dependency TEXT,
+    status_code INTEGER,
+    PRIMARY KEY (subject, job)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS failures_reason ON failures (reason_code)
+"""
+
+_ARTIFACT_COLUMNS = "artifact_id, original_filename, media_type, sha256, byte_size, storage_uri, metadata"
+
+
+class ArtifactCatalog:
+    """Catalog of artifact records, lineage and failures.
+
+    Each recorded import or derivation is written in one transaction. Inside
+    `batch()`, writes are buffered and flushed every `batch_size` statements
+    and when the block exits. Queries flush pending writes first.
+    """
+
+    def __init__(self, path: Path, batch_size: int = 1000) -> None:
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self._lock = threading.RLock()
+        self._pending: list[tuple[str, tuple]] = []
+        self._depth = 0
+
+    def __getstate__(self) -> dict:
+        return {"path": self.path, "batch_size": self.batch_size}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["path"], state["batch_size"])
+
+    def _db(self) -> Database:
+        return connect(self.path, _SCHEMA)
+
+    @contextmanager
+    def batch(self) -> Iterator[ArtifactCatalog]:
+        with self._lock:
+            self._depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if pending:
+                with self._db().transaction() as conn:
+                    for sql, params in pending:
+                        conn.execute(sql, params)
+
+    def _write(self, statements: list[tuple[str, tuple]]) -> None:
+        with self._lock:
+            self._pending.extend(statements)
+            if self._depth == 0 or len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def record_import(self, artifact: ArtifactRecord) -> None:
+        self._write(
+            [
+                _insert_artifact(artifact),
+                ("DELETE FROM failures WHERE subject = ? AND job = ?", (artifact.original_filename, JOB_IMPORT)),
+            ]
+        )
+
+    def record_derivation(self, parent: ArtifactRecord, result: DerivationResult) -> None:
+        if result.failure is not None:
+            self.record_failure(parent.artifact_id, JOB_EXTRACT_TEXT, result.failure)
+            return
+        statements = []
+        for child in result.derived_artifacts or []:
+            parent_id = (child.metadata or {}).get("parent_artifact_id", parent.artifact_id)
+            statements.append(_insert_artifact(child))
+            statements.append(
+                (
+                    "INSERT OR REPLACE INTO lineage (parent_id, child_id, job) VALUES (?, ?, ?)",
+                    (parent_id, child.artifact_id, JOB_EXTRACT_TEXT),
+                )
+            )
+        statements.append(("DELETE FROM failures WHERE subject = ? AND job = ?", (parent.artifact_id, JOB_EXTRACT_TEXT)))
+        self._write(statements)
+
+    def record_failure(self, subject: str, job: str, failure: FailureRecord) -> None:
+        """Record the latest failure of `job` for an artifact id or, for imports, the filename."""
+        self._write(
+            [
+                (
+                    "INSERT OR REPLACE INTO failures (subject, job, reason_code, detail, dependency, status_code) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (subject, job, failure.reason_code.value, failure.detail, failure.dependency, failure.status_code),
+                )
+            ]
+        )
+
+    def _query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        self.flush()
+        return self._db().execute(sql, params)
+
+    def _artifacts(self, where: str, params: tuple, limit: int | None = None) -> list[ArtifactRecord]:
+        sql = f"SELECT {_ARTIFACT_COLUMNS} FROM artifacts WHERE {where}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return [_row_to_artifact(row) for row in self._query(sql, params)]
+
+    def get(self, artifact_id: str) -> list[ArtifactRecord]:
+        return self._artifacts("artifact_id = ?", (artifact_id,))
+
+    def has_sha256(self, sha256: str) -> bool:
+        return bool(self._query("SELECT 1 FROM artifacts WHERE sha256 = ? LIMIT 1", (sha256,)))
+
+    def find_by_sha256(self, sha256: str) -> list[ArtifactRecord]:
+        return self._artifacts("sha256 = ?", (sha256,))
+
+    def find_by_filename(self, filename: str) -> list[ArtifactRecord]:
+        return self._artifacts("original_filename = ?", (filename,))
+
+    def find_by_media_type(self, media_type: str, limit: int | None = None) -> list[ArtifactRecord]:
+        return self._artifacts("media_type = ?", (media_type,), limit)
+
+    def children(self, parent_id: str) -> list[ArtifactRecord]:
+        return self._artifacts("artifact_id IN (SELECT child_id FROM lineage WHERE parent_id = ?)", (parent_id,))
+
+    def parents(self, child_id: str) -> list[str]:
+        return [row[0] for row in self._query("SELECT parent_id FROM lineage WHERE child_id = ?", (child_id,))]
+
+    def failures(self, subject: str) -> dict[str, FailureRecord]:
+        rows = self._query(
+            "SELECT job, reason_code, detail, dependency, status_code FROM failures WHERE subject = ?", (subject,)
+        )
+        return {job: FailureRecord(ReasonCode(code), detail, dependency, status) for job, code, detail, dependency, status in rows}
+
+
+def _insert_artifact(artifact: ArtifactRecord) -> tuple[str, tuple]:
+    metadata = json.dumps(artifact.metadata, sort_keys=True) if artifact.metadata is not None else None
+    return (
+        f"INSERT OR REPLACE INTO artifacts ({_ARTIFACT_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (
+            artifact.artifact_id,
+            artifact.original_filename,
+            artifact.media_type,
+            artifact.sha256_bytes,
+            artifact.byte_size,
+            artifact.storage_uri,
+            metadata,
+        ),
+    )
+
+
+def _row_to_artifact(row: tuple) -> ArtifactRecord:
+    artifact_id, filename, media_type, sha256, byte_size, storage_uri, metadata = row
+    return ArtifactRecord(
+        artifact_id=artifact_id,
+        original_filename=filename,
+        media_type=media_type,
+        byte_size=byte_size,
+        sha256_bytes=sha256,
+        storage_uri=storage_uri,
+        metadata=json.loads(metadata) if metadata is not None else None,
+    )
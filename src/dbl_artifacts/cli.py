@@ -0,0 +1,139 @@
+"""Command-line interface: `dbl-artifacts <command>`."""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from functools import partial
+from pathlib import Path
+
+from .cache import DerivationCache
+from .ingest import IngestReport, IngestState, ingest
+from ._scrub import ScrubState, scrub
+from .storage import LocalStorage
+
+SCRUB_STATE_NAME = ".scrub.sqlite"
+INGEST_STATE_NAME = ".ingest.sqlite"
+MANIFEST_NAME = "manifest.jsonl"
+# Seconds between progress lines.
+PROGRESS_INTERVAL = 1.0
+
+
+def _scrub(args: argparse.Namespace) -> int:
+    storage = LocalStorage(args.root)
+    state = None
+    if not args.no_state:
+        state = ScrubState(args.state or args.root / SCRUB_STATE_NAME, max_age=0 if args.full else args.max_age)
+    report = scrub(storage, state=state, workers=args.workers, max_mb_per_sec=args.max_mb_per_sec)
+    if args.json:
+        print(json.dumps(report.to_dict(), indent=2))
+    else:
+        rate = report.bytes_hashed / 1024 / 1024 / report.duration if report.duration else 0.0
+        print(
+            f"checked {report.checked}, skipped {report.skipped}, "
+            f"{report.bytes_hashed / 1024 / 1024:.1f} MiB in {report.duration:.1f}s ({rate:.1f} MB/s)"
+        )
+        for kind in ("corrupt", "truncated", "orphaned"):
+            for path in getattr(report, kind):
+                print(f"{kind.upper()} {path}")
+    return 0 if report.ok else 1
+
+
+def _ingest(args: argparse.Namespace) -> int:
+    storage = LocalStorage(args.store)
+    state = None if args.no_state else IngestState(args.state or args.store / INGEST_STATE_NAME)
+    manifest = args.manifest or args.store / MANIFEST_NAME
+    cache = DerivationCache(args.cache) if args.cache else None
+    run = partial(
+        ingest,
+        args.dir,
+        storage,
+        state=state,
+        manifest=manifest,
+        cache=cache,
+        workers=args.workers,
+    )
+    report = run(progress=None if args.quiet else _Progress())
+    _print_report(report, args.json)
+    if not args.watch:
+        return 0 if report.ok else 1
+    try:
+        while True:
+            time.sleep(args.interval)
+            # The state's table stays in memory across polls. Files still being
+            # written are picked up once they have not changed for one interval.
+            report = run(settle=args.interval, progress=None if args.quiet else _Progress())
+            if report.ingested or report.removed:
+                _print_report(report, args.json)
+    except KeyboardInterrupt:
+        return 0
+
+
+class _Progress:
+    """Prints running totals to stderr at most once per `PROGRESS_INTERVAL`."""
+
+    def __init__(self) -> None:
+        self.last = time.monotonic()
+
+    def __call__(self, report: IngestReport) -> None:
+        now = time.monotonic()
+        if now - self.last >= PROGRESS_INTERVAL:
+            self.last = now
+            print(f"... {_summary(report)}", file=sys.stderr, flush=True)
+
+
+def _summary(report: IngestReport) -> str:
+    rate = report.bytes_read / 1024 / 1024 / report.duration if report.duration else 0.0
+    files = report.ingested / report.duration if report.duration else 0.0
+    return (
+        f"ingested {report.ingested} ({report.failed} failed, {report.unsupported} unsupported), unchanged {report.unchanged}, "
+        f"deferred {report.deferred}, removed {report.removed}, "
+        f"{report.bytes_read / 1024 / 1024:.1f} MiB in {report.duration:.1f}s ({rate:.1f} MB/s, {files:.1f} files/s)"
+    )
+
+
+def _print_report(report: IngestReport, as_json: bool) -> None:
+    print(json.dumps(report.to_dict()) if as_json else _summary(report), flush=True)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="dbl-artifacts", description="Deterministic artifact import and extraction.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scrub_parser = commands.add_parser("scrub", help="verify that stored blobs match their content address")
+    scrub_parser.add_argument("root", type=Path, help="LocalStorage root")
+    scrub_parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    scrub_parser.add_argument("--max-mb-per-sec", type=float, help="cap the combined read rate")
+    scrub_parser.add_argument("--state", type=Path, help=f"state file (default: <root>/{SCRUB_STATE_NAME})")
+    scrub_parser.add_argument("--no-state", action="store_true", help="verify everything and keep no state")
+    scrub_parser.add_argument("--max-age", type=float, help="re-verify blobs last verified this many seconds ago")
+    scrub_parser.add_argument("--full", action="store_true", help="re-verify every blob, then refresh the state")
+    scrub_parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    scrub_parser.set_defaults(handler=_scrub)
+
+    ingest_parser = commands.add_parser("ingest", help="import and extract new or changed files under a directory")
+    ingest_parser.add_argument("dir", type=Path, help="directory to walk")
+    ingest_parser.add_argument("--store", type=Path, default=Path("data"), help="LocalStorage root (default: ./data)")
+    ingest_parser.add_argument("--state", type=Path, help=f"state file (default: <store>/{INGEST_STATE_NAME})")
+    ingest_parser.add_argument("--no-state", action="store_true", help="ingest everything and keep no state")
+    ingest_parser.add_argument("--manifest", type=Path, help=f"JSONL manifest to append to (default: <store>/{MANIFEST_NAME})")
+    ingest_parser.add_argument("--cache", type=Path, help="derivation cache file")
+    ingest_parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    ingest_parser.add_argument("--watch", action="store_true", help="keep polling for changes until interrupted")
+    ingest_parser.add_argument(
+        "--interval",
+        type=float,
+        default=2.0,
+        help="seconds between polls in --watch mode; files are ingested once unchanged for this long",
+    )
+    ingest_parser.add_argument("--quiet", action="store_true", help="no progress lines")
+    ingest_parser.add_argument("--json", action="store_true", help="print reports as JSON")
+    ingest_parser.set_defaults(handler=_ingest)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
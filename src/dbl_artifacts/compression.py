@@ -0,0 +1,205 @@
+"""Blob compression codecs."""
+from __future__ import annotations
+
+import io
+import lzma
+import zlib
+from typing import BinaryIO, Protocol
+
+HEADER_MAGIC = b"DBLZ"
+MIN_COMPRESS_SIZE = 256
+
+# Magic prefixes of formats that are already compressed.
+PRECOMPRESSED_MAGIC = (
+    b"%PDF",
+    b"PK\x03\x04",
+    b"\x1f\x8b",
+    b"BZh",
+    b"\xfd7zXZ\x00",
+    b"7z\xbc\xaf\x27\x1c",
+    b"\x28\xb5\x2f\xfd",
+    b"\x89PNG",
+    b"\xff\xd8\xff",
+    b"GIF8",
+    HEADER_MAGIC,
+)
+SNIFF_SIZE = max(len(magic) for magic in PRECOMPRESSED_MAGIC)
+
+
+class Compressor(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+
+    def flush(self) -> bytes: ...
+
+
+class Decompressor(Protocol):
+    """Returns at most `max_length` bytes per call (-1: no cap), keeping the rest
+    of the input; `needs_input` is False while that input can still produce output."""
+
+    eof: bool
+    needs_input: bool
+
+    def decompress(self, data: bytes, max_length: int = -1) -> bytes: ...
+
+    def flush(self) -> bytes: ...
+
+
+class Codec(Protocol):
+    name: str
+
+    def compressor(self) -> Compressor: ...
+
+    def decompressor(self) -> Decompressor: ...
+
+
+class ZlibCodec:
+    name = "zlib"
+
+    def __init__(self, level: int = 6) -> None:
+        self.level = level
+
+    def compressor(self) -> Compressor:
+        return zlib.compressobj(self.level)
+
+    def decompressor(self) -> Decompressor:
+        return _ZlibDecompressor()
+
+
+class _ZlibDecompressor:
+    def __init__(self) -> None:
+        self._inner = zlib.decompressobj()
+
+    @property
+    def eof(self) -> bool:
+        return self._inner.eof
+
+    @property
+    def needs_input(self) -> bool:
+        return not self._inner.unconsumed_tail
+
+    def decompress(self, data: bytes, max_length: int = -1) -> bytes:
+        # zlib hands back input beyond `max_length` as `unconsumed_tail`; feed it first.
+        return self._inner.decompress(self._inner.unconsumed_tail + data, max(max_length, 0))
+
+    def flush(self) -> bytes:
+        return self._inner.flush()
+
+
+class _LzmaDecompressor:
+    def __init__(self) -> None:
+        self._inner = lzma.LZMADecompressor()
+
+    @property
+    def eof(self) -> bool:
+        return self._inner.eof
+
+    @property
+    def needs_input(self) -> bool:
+        return self._inner.needs_input or self._inner.eof
+
+    def decompress(self, data: bytes, max_length: int = -1) -> bytes:
+        return self._inner.decompress(data, max_length)
+
+    def flush(self) -> bytes:
+        return b""
+
+
+class LzmaCodec:
+    name = "lzma"
+
+    def __init__(self, preset: int = 6) -> None:
+        self.preset = preset
+
+    def compressor(self) -> Compressor:
+        return lzma.LZMACompressor(preset=self.preset)
+
+    def decompressor(self) -> Decompressor:
+        return _LzmaDecompressor()
+
+
+CODECS: dict[str, Codec] = {"zlib": ZlibCodec(), "lzma": LzmaCodec()}
+
+
+def register_codec(codec: Codec) -> None:
+    CODECS[codec.name] = codec
+
+
+def get_codec(name: str) -> Codec:
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(f"unknown compression codec: {name}") from None
+
+
+def is_precompressed(head: bytes) -> bool:
+    return head.startswith(PRECOMPRESSED_MAGIC)
+
+
+def encode_header(codec: Codec) -> bytes:
+    name = codec.name.encode("ascii")
+    return HEADER_MAGIC + bytes([len(name)]) + name
+
+
+def read_header(stream: BinaryIO) -> Codec:
+    magic = stream.read(len(HEADER_MAGIC))
+    if magic != HEADER_MAGIC:
+        raise ValueError("missing compression header")
+    size = stream.read(1)
+    if not size:
+        raise ValueError("truncated compression header")
+    return get_codec(stream.read(size[0]).decode("ascii"))
+
+
+def compress_blob(codec: Codec, content: bytes) -> bytes | None:
+    """Return header + compressed content, or None if it is not worth it."""
+    if len(content) < MIN_COMPRESS_SIZE or is_precompressed(content[:SNIFF_SIZE]):
+        return None
+    compressor = codec.compressor()
+    payload = encode_header(codec) + compressor.compress(content) + compressor.flush()
+    return payload if len(payload) < len(content) else None
+
+
+def decompress_blob(payload: bytes) -> bytes:
+    with open_decompressed(io.BytesIO(payload)) as stream:
+        return stream.read()
+
+
+def open_decompressed(raw: BinaryIO) -> BinaryIO:
+    """Wrap a stream holding header + payload in a streaming decompressor."""
+    codec = read_header(raw)
+    return io.BufferedReader(_DecompressingReader(raw, codec.decompressor()))
+
+
+class _DecompressingReader(io.RawIOBase):
+    def __init__(self, raw: BinaryIO, decompressor: Decompressor, chunk_size: int = 64 * 1024) -> None:
+        self._raw = raw
+        self._decompressor = decompressor
+        self._chunk_size = chunk_size
+        self._buffer = b""
+        self._offset = 0
+        self._eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        while self._offset >= len(self._buffer) and not self._eof:
+            data = self._raw.read(self._chunk_size) if self._decompressor.needs_input else b""
+            if data or not self._decompressor.needs_input:
+                # Capped at the caller's buffer, so a small read never inflates a whole chunk.
+                self._buffer = self._decompressor.decompress(data, len(target))
+            else:
+                self._buffer = self._decompressor.flush()
+                self._eof = True
+                if not self._decompressor.eof:
+                    raise EOFError("compressed stream is truncated")
+            self._offset = 0
+        size = min(len(target), len(self._buffer) - self._offset)
+        target[:size] = self._buffer[self._offset : self._offset + size]
+        self._offset += size
+        return size
+
+    def close(self) -> None:
+        if not self.closed:
+            self._raw.close()
+        super().close()
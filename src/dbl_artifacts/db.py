@@ -0,0 +1,61 @@
+"""SQLite helpers shared by the persistent indexes."""
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+
+class Database:
+    """A process-local SQLite connection in WAL mode guarded by a lock."""
+
+    def __init__(self, path: Path, schema: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(str(path), timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.transaction() as conn:
+            for statement in _statements(schema):
+                conn.execute(statement)
+
+    def execute(self, sql: str, params: tuple = ()) -> list[tuple]:
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+
+_DATABASES: dict[tuple[str, int], Database] = {}
+_DATABASES_LOCK = threading.Lock()
+
+
+def connect(path: Path, schema: str) -> Database:
+    """Return the shared connection for `path` in the current process.
+
+    Connections are never inherited across fork, so each worker process
+    opens its own.
+    """
+    key = (str(path), os.getpid())
+    with _DATABASES_LOCK:
+        db = _DATABASES.get(key)
+        if db is None:
+            db = Database(path, schema)
+            _DATABASES[key] = db
+        return db
+
+
+def _statements(schema: str) -> list[str]:
+    return [stmt.strip() for stmt in schema.split(";") if stmt.strip()]
@@ -1,7 +1,16 @@
-"""Deterministic type detection utilities."""
+"""Deterministic type detection utilities.
+
+`FORMATS` is the single table of known formats: media type, extensions and
+magic signatures, in detection priority order. Import-time detection
+compiles it into a `FormatTable`, and extractors declare their
+`Capabilities` against the same entries.
+"""
 from __future__ import annotations
 
+import struct
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Callable, Generic, Iterator, TypeVar
 
 PDF_MAGIC = b"%PDF"
 ZIP_MAGIC = b"PK\x03\x04"
@@ -11,44 +20,209 @@ PDF_MIME = "application/pdf"
 TEXT_MIME = "text/plain"
 HTML_MIME = "text/html"
 EML_MIME = "message/rfc822"
+ZIP_MIME = "application/zip"
+UNKNOWN_MIME = "application/octet-stream"
 
 TEXT_EXTENSIONS = {".txt", ".md"}
 PDF_EXTENSIONS = {".pdf"}
 DOCX_EXTENSIONS = {".docx"}
 HTML_EXTENSIONS = {".html", ".htm"}
 EML_EXTENSIONS = {".eml"}
+ZIP_EXTENSIONS = {".zip"}
+
+# Parts any OOXML package may have; a member outside these and `word/` means
+# a spreadsheet, a presentation or a plain ZIP.
+OOXML_SHARED_PARTS = ("[Content_Types].xml", "_rels/", "docProps/", "customXml/")
+
+V = TypeVar("V")
+
+
+def zip_member_names(head: bytes) -> list[str]:
+    """Names of the ZIP local file headers that `head` holds, in order.
+
+    The walk stops at a member whose size is only given after its data
+    (or in a ZIP64 record), since the next header cannot be found from it.
+    """
+    names = []
+    offset = 0
+    while head.startswith(ZIP_MAGIC, offset) and offset + 30 <= len(head):
+        flags, = struct.unpack_from("<H", head, offset + 6)
+        size, = struct.unpack_from("<I", head, offset + 18)
+        name_length, extra_length = struct.unpack_from("<HH", head, offset + 26)
+        name_end = offset + 30 + name_length
+        if name_end > len(head):
+            break
+        names.append(head[offset + 30 : name_end].decode("utf-8", "replace"))
+        if flags & 0x08 or size == 0xFFFFFFFF:
+            break
+        offset = name_end + extra_length + size
+    return names
+
+
+def _docx_hint(head: bytes) -> bool:
+    """Whether the first members seen are those of a word-processing package."""
+    names = zip_member_names(head)
+    if not any(name == "[Content_Types].xml" or name.startswith("word/") for name in names):
+        return False
+    return all(name.startswith(("word/", *OOXML_SHARED_PARTS)) for name in names)
+
+
+@dataclass(frozen=True)
+class Magic:
+    """A magic prefix, optionally confirmed by a `hint` check on the head.
+
+    A hinted magic is a guess: it never overrides a known extension.
+    """
+
+    prefix: bytes
+    hint: Callable[[bytes], bool] | None = None
+
+    def matches(self, head: bytes) -> bool:
+        return head.startswith(self.prefix) and self.hinted(head)
+
+    def hinted(self, head: bytes) -> bool:
+        return self.hint is None or self.hint(head)
+
+
+@dataclass(frozen=True)
+class Format:
+    """A known format.
+
+    `importable_by_media` says whether a caller-provided media type alone
+    makes a source importable; otherwise the extension or magic must match.
+    """
+
+    media_type: str
+    extensions: frozenset[str]
+    magic: tuple[Magic, ...] = ()
+    importable_by_media: bool = True
+
+
+TEXT_FORMAT = Format(TEXT_MIME, frozenset(TEXT_EXTENSIONS), importable_by_media=False)
+PDF_FORMAT = Format(PDF_MIME, frozenset(PDF_EXTENSIONS), (Magic(PDF_MAGIC),))
+DOCX_FORMAT = Format(DOCX_MIME, frozenset(DOCX_EXTENSIONS), (Magic(ZIP_MAGIC, _docx_hint),))
+ZIP_FORMAT = Format(ZIP_MIME, frozenset(ZIP_EXTENSIONS), (Magic(ZIP_MAGIC),))
+HTML_FORMAT = Format(HTML_MIME, frozenset(HTML_EXTENSIONS))
+EML_FORMAT = Format(EML_MIME, frozenset(EML_EXTENSIONS))
+
+# Detection priority: the first format whose extension or magic matches wins;
+# hinted magics only count for unknown extensions.
+FORMATS = (TEXT_FORMAT, PDF_FORMAT, DOCX_FORMAT, ZIP_FORMAT, HTML_FORMAT, EML_FORMAT)
+
+
+class TrieNode(Generic[V]):
+    __slots__ = ("children", "matches", "key")
+
+    def __init__(self, key: int) -> None:
+        self.children: dict[int, TrieNode[V]] = {}
+        # (magic, value) for every magic whose prefix ends here or above.
+        self.matches: tuple[tuple[Magic, V], ...] = ()
+        self.key = key
+
+
+class MagicTrie(Generic[V]):
+    """Byte trie over magic prefixes.
+
+    `deepest` walks at most the longest prefix length; the node it returns
+    lists every magic whose prefix the head starts with, and its `key`
+    identifies that set.
+    """
+
+    def __init__(self) -> None:
+        self._root: TrieNode[V] = TrieNode(0)
+        self._size = 1
+        self.depth = 0
+
+    def add(self, magic: Magic, value: V) -> None:
+        node = self._root
+        for byte in magic.prefix:
+            child = node.children.get(byte)
+            if child is None:
+                child = node.children[byte] = TrieNode(self._size)
+                child.matches = node.matches
+                self._size += 1
+            node = child
+        pending = [node]
+        while pending:
+            current = pending.pop()
+            current.matches += ((magic, value),)
+            pending.extend(current.children.values())
+        self.depth = max(self.depth, len(magic.prefix))
+
+    def deepest(self, head: bytes) -> TrieNode[V]:
+        node = self._root
+        for byte in head[: self.depth]:
+            child = node.children.get(byte)
+            if child is None:
+                break
+            node = child
+        return node
+
+    def match(self, head: bytes, guesses: bool = True) -> Iterator[V]:
+        """Yield the values of every magic that matches `head`, shortest prefix first.
+
+        Without `guesses`, magics that need a hint are skipped.
+        """
+        for magic, value in self.deepest(head).matches:
+            if magic.hint is None or (guesses and magic.hint(head)):
+                yield value
+
+
+@dataclass(frozen=True)
+class FormatTable:
+    """`FORMATS` compiled into hash lookups and a magic trie."""
+
+    formats: tuple[Format, ...]
+    _by_extension: dict[str, int] = field(init=False, repr=False, compare=False)
+    _by_media: dict[str, Format] = field(init=False, repr=False, compare=False)
+    _magic: MagicTrie[int] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        by_extension: dict[str, int] = {}
+        by_media: dict[str, Format] = {}
+        magic: MagicTrie[int] = MagicTrie()
+        for index, fmt in enumerate(self.formats):
+            for extension in fmt.extensions:
+                by_extension.setdefault(extension, index)
+            by_media.setdefault(fmt.media_type, fmt)
+            for rule in fmt.magic:
+                magic.add(rule, index)
+        object.__setattr__(self, "_by_extension", by_extension)
+        object.__setattr__(self, "_by_media", by_media)
+        object.__setattr__(self, "_magic", magic)
+
+    def detect(self, extension: str, head: bytes) -> str:
+        known = self._by_extension.get(extension)
+        index = min(self._magic.match(head, guesses=known is None), default=len(self.formats))
+        index = min(index, known if known is not None else index)
+        return self.formats[index].media_type if index < len(self.formats) else UNKNOWN_MIME
+
+    def supported(self, media_type: str, extension: str, head: bytes) -> bool:
+        if extension in self._by_extension:
+            return True
+        fmt = self._by_media.get(media_type)
+        if fmt is not None and fmt.importable_by_media:
+            return True
+        return next(iter(self._magic.match(head)), None) is not None
+
+
+DEFAULT_FORMATS = FormatTable(FORMATS)
 
 
 def extension_from_filename(filename: str) -> str:
     return Path(filename).suffix.lower()
 
 
+def looks_like_docx(head: bytes) -> bool:
+    """Guess from the first local file headers whether a ZIP is a DOCX package."""
+    return any(magic.matches(head) for magic in DOCX_FORMAT.magic)
+
+
 def detect_media_type(filename: str, provided: str | None, head: bytes) -> str:
     if provided:
         return provided
-    ext = extension_from_filename(filename)
-    if ext in TEXT_EXTENSIONS:
-        return TEXT_MIME
-    if ext in PDF_EXTENSIONS or head.startswith(PDF_MAGIC):
-        return PDF_MIME
-    if ext in DOCX_EXTENSIONS or head.startswith(ZIP_MAGIC):
-        return DOCX_MIME
-    if ext in HTML_EXTENSIONS:
-        return HTML_MIME
-    if ext in EML_EXTENSIONS:
-        return EML_MIME
-    return "application/octet-stream"
+    return DEFAULT_FORMATS.detect(extension_from_filename(filename), head)
 
 
 def is_supported_import(media_type: str, extension: str, head: bytes) -> bool:
-    if extension in TEXT_EXTENSIONS:
-        return True
-    if extension in PDF_EXTENSIONS or media_type == PDF_MIME or head.startswith(PDF_MAGIC):
-        return True
-    if extension in DOCX_EXTENSIONS or media_type == DOCX_MIME or head.startswith(ZIP_MAGIC):
-        return True
-    if extension in HTML_EXTENSIONS or media_type == HTML_MIME:
-        return True
-    if extension in EML_EXTENSIONS or media_type == EML_MIME:
-        return True
-    return False
+    return DEFAULT_FORMATS.supported(media_type, extension, head)
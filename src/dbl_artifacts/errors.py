@@ -1,7 +1,7 @@
 """Error taxonomy for dbl-artifacts."""
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from enum import Enum
 
 
@@ -17,6 +17,8 @@ class ReasonCode(str, Enum):
     EXTRACT_OCR_REQUIRED = "EXTRACT_OCR_REQUIRED"
     EXTRACT_TRANSCRIBE_FAILED = "EXTRACT_TRANSCRIBE_FAILED"
     EXTRACT_DEPENDENCY_MISSING = "EXTRACT_DEPENDENCY_MISSING"
+    EXTRACT_RESOURCE_LIMIT = "EXTRACT_RESOURCE_LIMIT"
+    EXTRACT_TIMEOUT = "EXTRACT_TIMEOUT"
 
 
 @dataclass(frozen=True)
@@ -26,6 +28,20 @@ class FailureRecord:
     dependency: str | None = None
     status_code: int | None = None
 
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["reason_code"] = self.reason_code.value
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FailureRecord":
+        return cls(
+            reason_code=ReasonCode(data["reason_code"]),
+            detail=data["detail"],
+            dependency=data.get("dependency"),
+            status_code=data.get("status_code"),
+        )
+
 
 @dataclass(frozen=True)
 class ArtifactError(Exception):
@@ -36,3 +52,11 @@ class ArtifactError(Exception):
 
     def __str__(self) -> str:
         return f"{self.reason_code}: {self.detail}"
+
+
+class ExtractionFailed(Exception):
+    """Raised while a streamed body is read, to fail the extraction with `failure`."""
+
+    def __init__(self, failure: FailureRecord) -> None:
+        super().__init__(failure.detail)
+        self.failure = failure
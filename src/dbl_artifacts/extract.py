@@ -1,14 +1,30 @@
 """Extraction router."""
 from __future__ import annotations
 
+import time
+from dataclasses import replace
+from functools import partial
 from pathlib import Path
+from typing import Iterable, Iterator
 
+from .cache import DerivationCache
+from .catalog import ArtifactCatalog
 from .detect import extension_from_filename
-from .errors import FailureRecord, ReasonCode
+from .errors import ArtifactError, ExtractionFailed, FailureRecord, ReasonCode
 from .models import ArtifactRecord, DerivationResult
-from .registry import ExtractorRegistry, default_registry
+from .pool import bounded_map
+from .registry import ExtractorRegistry, _shared_registry
 from .storage import LocalStorage, sha256_bytes
-from .extractors.base import ExtractedContent
+from .trace import STAGE_PARSE, STAGE_READ, STAGE_SELECT, STAGE_STORE, get_tracer, span
+from .extractors.base import (
+    ExtractBudget,
+    ExtractedContent,
+    Extractor,
+    Reroute,
+    extractor_options,
+    extractor_version,
+    run_extractor,
+)
 
 
 def _default_storage() -> LocalStorage:
@@ -19,32 +35,247 @@ def extract_text(
     artifact: ArtifactRecord,
     storage: LocalStorage | None = None,
     registry: ExtractorRegistry | None = None,
+    cache: DerivationCache | None = None,
+    catalog: ArtifactCatalog | None = None,
+    budget: ExtractBudget | None = None,
 ) -> DerivationResult:
-    """Extract text from an artifact using the registered extractors."""
-    store = storage or _default_storage()
-    reg = registry or default_registry()
+    """Extract text from an artifact using the registered extractors.
 
+    With a `cache`, results already derived for the same content, extractor
+    version and options are returned without opening the source. With a
+    `catalog`, derived records, their lineage and failures are written to it.
+    With a `budget`, extraction stops early and only the main text output is
+    kept (see `ExtractBudget`); the budget is part of the derivation key.
+    """
+    result = _extract(artifact, storage or _default_storage(), registry or _shared_registry(), cache, budget=budget)
+    if catalog is not None:
+        catalog.record_derivation(artifact, result)
+    return result
+
+
+def _extract(
+    artifact: ArtifactRecord,
+    store: LocalStorage,
+    reg: ExtractorRegistry,
+    cache: DerivationCache | None,
+    seen: set[str] | None = None,
+    budget: ExtractBudget | None = None,
+) -> DerivationResult:
     extension = extension_from_filename(artifact.original_filename)
-    try:
-        magic = store.read_head(Path(artifact.storage_uri), 512)
-    except Exception as exc:
-        return DerivationResult.failed(FailureRecord(ReasonCode.EXTRACT_PARSE_ERROR, str(exc)))
+    magic = cache.head(artifact.sha256_bytes) if cache is not None else None
+    if magic is None:
+        try:
+            with span(STAGE_READ, media_type=artifact.media_type, byte_size=artifact.byte_size):
+                magic = store.read_head(Path(artifact.storage_uri), 512)
+        except Exception as exc:
+            return DerivationResult.failed(FailureRecord(ReasonCode.EXTRACT_PARSE_ERROR, str(exc)))
+        if cache is not None:
+            cache.put_head(artifact.sha256_bytes, magic)
 
-    extractor = reg.select(artifact.media_type, extension, magic)
+    with span(STAGE_SELECT, media_type=artifact.media_type) as current:
+        extractor = reg.select(artifact.media_type, extension, magic)
+        current.tag(extractor=extractor.name if extractor is not None else None)
     if extractor is None:
         return DerivationResult.failed(
             FailureRecord(ReasonCode.EXTRACT_UNSUPPORTED_TYPE, f"unsupported file type: {extension}")
         )
 
-    result = extractor.extract_text(artifact, store, magic)
-    if isinstance(result, FailureRecord):
-        return DerivationResult.failed(result)
+    if cache is not None:
+        version, options = _cache_key(extractor, budget)
+        cached = cache.get(artifact.sha256_bytes, extractor.name, version, options)
+        if cached is not None and _derived_present(cached, store):
+            return cached
+        rerouted = cache.reroute(artifact.sha256_bytes, extractor.name, version, options)
+        other = reg.select(rerouted, extension, magic) if rerouted is not None else None
+        if other is not None and other.name != extractor.name:
+            cached = cache.get(artifact.sha256_bytes, other.name, *_cache_key(other, budget))
+            if cached is not None and _derived_present(cached, store):
+                return cached
+
+    tags = {"extractor": extractor.name, "media_type": artifact.media_type}
+    with span(STAGE_PARSE, byte_size=artifact.byte_size, **tags) as parsing:
+        producer, rerouted, result = _run(extractor, reg, artifact, store, magic, extension, budget)
+        if isinstance(result, FailureRecord):
+            derivation = DerivationResult.failed(result)
+        else:
+            # Streamed bodies are parsed while they are stored: pulling their
+            # chunks is parse time, and everything else from here on is not.
+            storing = span(STAGE_STORE, **tags)
+            pulls = _Pulls(storing)
+            started = time.perf_counter()
+            try:
+                with storing as current:
+                    derived = [_store_derived(pulls.wrap(item), store) for item in result]
+                    current.tag(byte_size=sum(item.byte_size for item in derived))
+                expand = [record for item, record in zip(result, derived) if item.expand]
+                if expand:
+                    seen = seen if seen is not None else {artifact.sha256_bytes}
+                    workers = int(getattr(producer, "expand_workers", 1))
+                    derived.extend(_expand(expand, store, reg, cache, seen, workers))
+                derivation = DerivationResult.success(derived)
+            except ArtifactError:
+                raise
+            except ExtractionFailed as exc:
+                derivation = DerivationResult.failed(exc.failure)
+            except Exception as exc:
+                derivation = DerivationResult.failed(FailureRecord(ReasonCode.EXTRACT_PARSE_ERROR, str(exc)))
+            finally:
+                parsing.exclude(time.perf_counter() - started - pulls.seconds)
+
+    if cache is not None:
+        if producer is extractor:
+            cache.put(artifact.sha256_bytes, extractor.name, version, options, derivation)
+        else:
+            # Keyed by the producer, so its own version and options invalidate the text.
+            cache.put_reroute(artifact.sha256_bytes, extractor.name, version, options, rerouted)
+            cache.put(artifact.sha256_bytes, producer.name, *_cache_key(producer, budget), derivation)
+    return derivation
+
+
+def _cache_key(extractor: Extractor, budget: ExtractBudget | None) -> tuple[str, dict[str, str]]:
+    options = extractor_options(extractor)
+    if budget is not None:
+        options.update(budget.options())
+    return extractor_version(extractor), options
+
+
+def _run(
+    extractor: Extractor,
+    reg: ExtractorRegistry,
+    artifact: ArtifactRecord,
+    store: LocalStorage,
+    magic: bytes,
+    extension: str,
+    budget: ExtractBudget | None,
+) -> tuple[Extractor, str | None, list[ExtractedContent] | FailureRecord]:
+    """Run `extractor`, following one `Reroute`.
+
+    Returns the extractor that produced the result, the media type it was
+    rerouted to (None if `extractor` produced it), and the result.
+    """
+    result = run_extractor(extractor, artifact, store, magic, budget)
+    if not isinstance(result, Reroute):
+        return extractor, None, result
+    other = reg.select(result.media_type, extension, magic)
+    if other is not None and other.name != extractor.name:
+        rerouted = run_extractor(other, artifact, store, magic, budget)
+        if not isinstance(rerouted, Reroute):
+            return other, result.media_type, rerouted
+    return extractor, None, FailureRecord(ReasonCode.EXTRACT_UNSUPPORTED_TYPE, result.detail)
+
+
+class _Pulls:
+    """Times `next()` on streamed bodies and moves that time out of the store span."""
+
+    def __init__(self, storing) -> None:
+        self.storing = storing
+        self.seconds = 0.0
+        self.active = get_tracer() is not None
 
-    derived = [_store_derived(item, store) for item in result]
-    return DerivationResult.success(derived)
+    def wrap(self, item: ExtractedContent) -> ExtractedContent:
+        if item.chunks is None or not self.active:
+            return item
+        return replace(item, chunks=self._timed(item.chunks))
+
+    def _timed(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        source = iter(chunks)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    chunk = next(source)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed = time.perf_counter() - start
+                    self.seconds += elapsed
+                    self.storing.exclude(elapsed)
+                yield chunk
+        finally:
+            close = getattr(source, "close", None)
+            if close is not None:
+                close()
+
+
+def _expand(
+    children: list[ArtifactRecord],
+    store: LocalStorage,
+    reg: ExtractorRegistry,
+    cache: DerivationCache | None,
+    seen: set[str],
+    workers: int = 1,
+) -> list[ArtifactRecord]:
+    """Extract derived outputs again, once per distinct content hash.
+
+    With `workers > 1` the children are extracted on a process pool; each
+    worker then deduplicates only within its own child. Failures of nested
+    extractions (e.g. an attachment of an unsupported type) are dropped;
+    they do not fail the parent.
+    """
+    pending = []
+    for child in children:
+        if child.sha256_bytes not in seen:
+            seen.add(child.sha256_bytes)
+            pending.append(child)
+    if workers > 1 and len(pending) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            fn = partial(_extract_child, store=store, reg=reg, cache=cache, seen=frozenset(seen))
+            futures = bounded_map(executor, fn, pending, max_in_flight=2 * workers)
+            results = [_child_result(future) for _, future in futures]
+    else:
+        results = [_extract(child, store, reg, cache, seen) for child in pending]
+
+    derived: list[ArtifactRecord] = []
+    for child, nested in zip(pending, results):
+        for record in nested.derived_artifacts or []:
+            metadata = dict(record.metadata or {})
+            if "parent_artifact_id" not in metadata:
+                metadata["parent_artifact_id"] = child.artifact_id
+                metadata["depth"] = (child.metadata or {}).get("depth", "1")
+                record = replace(record, metadata=metadata)
+            derived.append(record)
+    return derived
+
+
+def _extract_child(
+    child: ArtifactRecord,
+    store: LocalStorage,
+    reg: ExtractorRegistry,
+    cache: DerivationCache | None,
+    seen: frozenset[str],
+) -> DerivationResult:
+    try:
+        return _extract(child, store, reg, cache, set(seen))
+    except ArtifactError as exc:
+        return DerivationResult.failed(FailureRecord(exc.reason_code, exc.detail))
+
+
+def _child_result(future) -> DerivationResult:
+    try:
+        return future.result()
+    except Exception as exc:
+        return DerivationResult.failed(FailureRecord(ReasonCode.EXTRACT_PARSE_ERROR, f"worker failed: {exc}"))
+
+
+def _derived_present(result: DerivationResult, store: LocalStorage) -> bool:
+    return all(store.exists(Path(item.storage_uri)) for item in result.derived_artifacts or [])
 
 
 def _store_derived(content: ExtractedContent, store: LocalStorage) -> ArtifactRecord:
+    if content.chunks is not None:
+        blob = store.store_chunks(content.chunks)
+        return ArtifactRecord(
+            artifact_id=f"art-{blob.sha256_bytes}",
+            original_filename=content.output_filename,
+            media_type=content.media_type,
+            byte_size=blob.byte_size,
+            sha256_bytes=blob.sha256_bytes,
+            storage_uri=str(blob.path),
+            # Empty when a budget was applied but nothing was cut.
+            metadata=content.metadata or None,
+        )
     digest = sha256_bytes(content.content)
     path = store.store_bytes(content.content)
     return ArtifactRecord(
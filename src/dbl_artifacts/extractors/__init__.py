@@ -1,10 +1,27 @@
-"""Extractor drivers."""
+"""Extractor drivers.
 
-from .docx import DocxExtractor
-from .eml import EmlExtractor
-from .html import HtmlExtractor
-from .pdf import PdfExtractor
-from .text import TextExtractor
+Driver modules are imported on first attribute access, so importing the
+package (or `extractors.base`) does not load them or their dependencies.
+"""
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .docx import DocxExtractor
+    from .eml import EmlExtractor
+    from .html import HtmlExtractor
+    from .pdf import PdfExtractor
+    from .text import TextExtractor
+
+_EXPORTS = {
+    "DocxExtractor": ".docx",
+    "EmlExtractor": ".eml",
+    "HtmlExtractor": ".html",
+    "PdfExtractor": ".pdf",
+    "TextExtractor": ".text",
+}
 
 __all__ = [
     "DocxExtractor",
@@ -13,3 +30,16 @@ __all__ = [
     "PdfExtractor",
     "TextExtractor",
 ]
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,220 @@
+"""ZIP archive expansion using Python stdlib zipfile."""
+from __future__ import annotations
+
+import threading
+import weakref
+import zipfile
+from pathlib import Path
+
+from ..detect import DOCX_MIME, detect_media_type
+from ..errors import FailureRecord, ReasonCode
+from ..models import ArtifactRecord
+from ..storage import CHUNK_SIZE, LocalStorage
+from .base import ExtractBudget, ExtractedContent, Reroute, encode_text, open_seekable
+from .builtin import ARCHIVE
+
+DOCX_DOCUMENT_PART = "word/document.xml"
+# Small members may compress extremely well without being a threat.
+RATIO_MIN_SIZE = 1024 * 1024
+
+
+class ArchiveExtractor:
+    """ZIP extractor.
+
+    Every file member is streamed out of the archive in chunks into storage
+    as a child artifact, and each child is extracted again through the
+    registry (on `workers` processes when `workers > 1`). The derived
+    `<archive>.extracted.txt` lists the member names.
+
+    Zip-bomb guards are checked against the central directory before
+    anything is decompressed: at most `max_members` file members, at most
+    `max_total_bytes` uncompressed in total, and neither a member nor the
+    members together expanding more than `max_ratio` times (up to 1 MiB of
+    output is exempt from the ratio check, so many small members are judged
+    by their total). `zipfile` never reads past a member's declared
+    size, so the declared sizes bound the output. Nested archives are
+    expanded down to `max_depth` levels. An archive that is really a DOCX
+    package is rerouted to the registry's DOCX extractor. Under a budget
+    only the listing is produced and no member is opened.
+    """
+
+    name = "archive"
+    version = "1"
+    capabilities = ARCHIVE.capabilities
+
+    def __init__(
+        self,
+        max_members: int = 10_000,
+        max_total_bytes: int = 1024 * 1024 * 1024,
+        max_ratio: int = 100,
+        max_depth: int = 3,
+        workers: int = 1,
+    ) -> None:
+        self.max_members = max_members
+        self.max_total_bytes = max_total_bytes
+        self.max_ratio = max_ratio
+        self.max_depth = max_depth
+        self.workers = workers
+
+    @property
+    def options(self) -> dict[str, str]:
+        return {
+            "max_members": str(self.max_members),
+            "max_total_bytes": str(self.max_total_bytes),
+            "max_ratio": str(self.max_ratio),
+            "max_depth": str(self.max_depth),
+        }
+
+    @property
+    def expand_workers(self) -> int:
+        return self.workers
+
+    def supports(self, media_type: str, extension: str, magic_bytes: bytes) -> int:
+        return self.capabilities.score(media_type, extension, magic_bytes)
+
+    def extract_text(
+        self, artifact: ArtifactRecord, storage: LocalStorage, magic_bytes: bytes, budget: ExtractBudget | None = None
+    ) -> list[ExtractedContent] | FailureRecord | Reroute:
+        try:
+            handle = open_seekable(storage, Path(artifact.storage_uri))
+        except Exception as exc:
+            return FailureRecord(ReasonCode.EXTRACT_PARSE_ERROR, str(exc))
+        try:
+            archive = zipfile.ZipFile(handle)
+        except Exception as exc:
+            handle.close()
+            return FailureRecord(ReasonCode.EXTRACT_PARSE_ERROR, str(exc))
+
+        infos = archive.infolist()
+        names = {info.filename for info in infos}
+        shared = _SharedArchive(archive)
+        if DOCX_DOCUMENT_PART in names and "[Content_Types].xml" in names:
+            shared.close()
+            return Reroute(DOCX_MIME, "archive is a DOCX package")
+
+        members = [info for info in infos if not info.is_dir()]
+        failure = self._check_limits(members)
+        if failure is not None:
+            shared.close()
+            return failure
+
+        listing = ExtractedContent(
+            content=encode_text("".join(f"{info.filename}\n" for info in members)),
+            output_filename=f"{artifact.original_filename}.extracted.txt",
+            media_type="text/plain",
+        )
+        if budget is not None and budget.limited:
+            shared.close()
+            return [listing]
+
+        depth = int((artifact.metadata or {}).get("depth", "0")) + 1
+        shared.pending = len(members)
+        outputs = [listing]
+        for info in members:
+            try:
+                with archive.open(info) as member:
+                    head = member.read(512)
+            except Exception:
+                # Encrypted or unsupported compression: list it, but skip the body.
+                shared.release()
+                continue
+            outputs.append(
+                ExtractedContent(
+                    content=b"",
+                    output_filename=info.filename,
+                    media_type=detect_media_type(info.filename, None, head),
+                    metadata={
+                        "source": "archive_member",
+                        "member_name": info.filename,
+                        "parent_artifact_id": artifact.artifact_id,
+                        "depth": str(depth),
+                    },
+                    chunks=_MemberChunks(shared, info),
+                    expand=depth <= self.max_depth,
+                )
+            )
+        if not members:
+            shared.close()
+        return outputs
+
+    def _check_limits(self, members: list[zipfile.ZipInfo]) -> FailureRecord | None:
+        if len(members) > self.max_members:
+            return FailureRecord(
+                ReasonCode.EXTRACT_RESOURCE_LIMIT, f"archive has {len(members)} members (limit {self.max_members})"
+            )
+        total = sum(info.file_size for info in members)
+        if total > self.max_total_bytes:
+            return FailureRecord(
+                ReasonCode.EXTRACT_RESOURCE_LIMIT, f"archive expands to {total} bytes (limit {self.max_total_bytes})"
+            )
+        compressed = sum(info.compress_size for info in members)
+        if total > RATIO_MIN_SIZE and total > self.max_ratio * max(compressed, 1):
+            return FailureRecord(
+                ReasonCode.EXTRACT_RESOURCE_LIMIT,
+                f"archive members expand {total // max(compressed, 1)}x together (limit {self.max_ratio}x)",
+            )
+        for info in members:
+            if info.file_size > RATIO_MIN_SIZE and info.file_size > self.max_ratio * max(info.compress_size, 1):
+                return FailureRecord(
+                    ReasonCode.EXTRACT_RESOURCE_LIMIT,
+                    f"member {info.filename} expands {info.file_size // max(info.compress_size, 1)}x (limit {self.max_ratio}x)",
+                )
+        return None
+
+
+class _SharedArchive:
+    """An open archive shared by the member streams; closed after the last one."""
+
+    def __init__(self, archive: zipfile.ZipFile) -> None:
+        self.archive = archive
+        self.pending = 0
+        self._lock = threading.Lock()
+
+    def release(self) -> None:
+        with self._lock:
+            self.pending -= 1
+            if self.pending == 0:
+                self.close()
+
+    def close(self) -> None:
+        fp = self.archive.fp
+        self.archive.close()
+        if fp is not None:
+            fp.close()
+
+
+class _MemberChunks:
+    """A member's body, read in chunks on demand.
+
+    The shared archive is released once the body is read, fails, or is
+    dropped, whether or not reading ever started.
+    """
+
+    def __init__(self, shared: _SharedArchive, info: zipfile.ZipInfo) -> None:
+        self._shared = shared
+        self._info = info
+        self._member = None
+        self._release = weakref.finalize(self, shared.release)
+
+    def __iter__(self) -> _MemberChunks:
+        return self
+
+    def __next__(self) -> bytes:
+        if not self._release.alive:
+            raise StopIteration
+        try:
+            if self._member is None:
+                self._member = self._shared.archive.open(self._info)
+            chunk = self._member.read(CHUNK_SIZE)
+        except BaseException:
+            self._finish()
+            raise
+        if not chunk:
+            self._finish()
+            raise StopIteration
+        return chunk
+
+    def _finish(self) -> None:
+        if self._member is not None:
+            self._member.close()
+        self._release()
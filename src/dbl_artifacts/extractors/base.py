@@ -1,27 +1,358 @@
 """Extractor interfaces."""
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Protocol
+import codecs
+import functools
+import importlib
+import inspect
+import time
+from dataclasses import dataclass, replace
+from io import BytesIO, IncrementalNewlineDecoder
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, Protocol
 
-from ..errors import FailureRecord
+from ..detect import Format
+from ..errors import FailureRecord, ReasonCode
 from ..models import ArtifactRecord
-from ..storage import LocalStorage
+from ..storage import CHUNK_SIZE, LocalStorage
+from ..trace import STAGE_ENCODE, get_tracer, record, span
 
 
 @dataclass(frozen=True)
 class ExtractedContent:
+    """One derived output.
+
+    When `chunks` is set the body is streamed from it into storage and
+    `content` is ignored. Chunks are produced lazily, so metadata may be
+    filled in while they are consumed. With `expand`, the stored output is
+    itself extracted again through the registry (e.g. email attachments).
+    """
+
     content: bytes
     output_filename: str
     media_type: str
     metadata: dict[str, str] | None = None
+    chunks: Iterable[bytes] | None = None
+    expand: bool = False
+
+
+@dataclass(frozen=True)
+class Reroute:
+    """Result saying the blob is really of `media_type` (e.g. a DOCX named .zip).
+
+    The pipeline hands it once to the extractor its registry selects for
+    that type, and fails with `EXTRACT_UNSUPPORTED_TYPE` and `detail` if
+    there is none.
+    """
+
+    media_type: str
+    detail: str
+
+
+@dataclass(frozen=True)
+class ExtractBudget:
+    """Limits for preview extraction.
+
+    `max_chars` caps the characters of the text output, `max_pages` the
+    pages read from paged formats (PDF) and `max_bytes_read` the bytes read
+    from sources parsed front to back (text, HTML, EML). Extractors stop as
+    soon as a limit is met, and an output cut short carries a `truncated`
+    metadata entry naming the limit. Under a budget only the main text
+    output is kept; attachments and archive members are not extracted.
+    """
+
+    max_chars: int | None = None
+    max_pages: int | None = None
+    max_bytes_read: int | None = None
+
+    def __post_init__(self) -> None:
+        for name, value in self._limits():
+            if value is not None and value < 0:
+                raise ValueError(f"{name} must be >= 0")
+
+    def _limits(self) -> tuple[tuple[str, int | None], ...]:
+        return (("max_chars", self.max_chars), ("max_pages", self.max_pages), ("max_bytes_read", self.max_bytes_read))
+
+    @property
+    def limited(self) -> bool:
+        return any(value is not None for _, value in self._limits())
+
+    def options(self) -> dict[str, str]:
+        """Derivation key entries, so budgeted results never stand in for full ones."""
+        return {f"budget_{name}": str(value) for name, value in self._limits() if value is not None}
+
+
+@dataclass(frozen=True)
+class Rule:
+    """One capability: a score for a media type, media type prefix, extension or magic."""
+
+    kind: str
+    values: tuple
+    score: int
+
+    @classmethod
+    def media_type(cls, fmt: Format | str, score: int) -> Rule:
+        return cls("media_type", (fmt.media_type if isinstance(fmt, Format) else fmt,), score)
+
+    @classmethod
+    def media_prefix(cls, prefix: str, score: int) -> Rule:
+        return cls("media_prefix", (prefix,), score)
+
+    @classmethod
+    def extension(cls, fmt: Format, score: int) -> Rule:
+        return cls("extension", tuple(sorted(fmt.extensions)), score)
+
+    @classmethod
+    def magic(cls, fmt: Format, score: int) -> Rule:
+        return cls("magic", fmt.magic, score)
+
+    def matches(self, media_type: str, extension: str, magic_bytes: bytes) -> bool:
+        if self.kind == "media_type":
+            return media_type in self.values
+        if self.kind == "media_prefix":
+            return media_type.startswith(self.values)
+        if self.kind == "extension":
+            return extension in self.values
+        return any(magic.matches(magic_bytes) for magic in self.values)
+
+
+@dataclass(frozen=True)
+class Capabilities:
+    """What an extractor handles, as data.
+
+    The score for an artifact is that of the first matching rule, 0 if none
+    matches. The registry compiles capabilities into a dispatch table
+    instead of calling `supports`.
+    """
+
+    rules: tuple[Rule, ...]
+
+    def score(self, media_type: str, extension: str, magic_bytes: bytes) -> int:
+        for rule in self.rules:
+            if rule.matches(media_type, extension, magic_bytes):
+                return rule.score
+        return 0
 
 
 class Extractor(Protocol):
     name: str
+    version: str
+
+    def supports(self, media_type: str, extension: str, magic_bytes: bytes) -> int:
+        """Return a score > 0 if supported.
+
+        Extractors may also expose a `capabilities: Capabilities` attribute
+        that gives the same scores as data.
+        """
+
+    def extract_text(
+        self, artifact: ArtifactRecord, storage: LocalStorage, magic_bytes: bytes, budget: ExtractBudget | None = None
+    ) -> list[ExtractedContent] | FailureRecord | Reroute:
+        """Return extracted content items, a failure record, or a `Reroute`.
+
+        `budget` is optional: extractors that do not take it run in full and
+        their output is cut afterwards.
+        """
+
+
+@dataclass(frozen=True)
+class ExtractorSpec:
+    """An extractor declared without importing it.
+
+    The registry dispatches on `capabilities` and imports `target`
+    ("module:attribute", naming an extractor class or instance) the first
+    time the extractor is selected. `dependencies` are the modules it needs
+    at extraction time, imported ahead of time by `warmup`.
+    """
+
+    name: str
+    target: str
+    capabilities: Capabilities
+    dependencies: tuple[str, ...] = ()
+
+    def supports(self, media_type: str, extension: str, magic_bytes: bytes) -> int:
+        return self.capabilities.score(media_type, extension, magic_bytes)
+
+    def load(self) -> Extractor:
+        """Import the target; the instance is shared process-wide."""
+        return _load_spec(self)
+
+
+@functools.cache
+def _load_spec(spec: ExtractorSpec) -> Extractor:
+    module_name, _, attribute = spec.target.partition(":")
+    try:
+        target = getattr(importlib.import_module(module_name), attribute)
+    except (ImportError, AttributeError) as exc:
+        return _Unavailable(spec.name, str(exc), module_name)
+    return target() if isinstance(target, type) else target
+
+
+class _Unavailable:
+    """Stands in for an extractor whose module cannot be imported."""
+
+    version = "0"
+
+    def __init__(self, name: str, detail: str, dependency: str) -> None:
+        self.name = name
+        self.detail = detail
+        self.dependency = dependency
 
     def supports(self, media_type: str, extension: str, magic_bytes: bytes) -> int:
-        """Return a score > 0 if supported."""
+        return 0
+
+    def extract_text(
+        self, artifact: ArtifactRecord, storage: LocalStorage, magic_bytes: bytes, budget: ExtractBudget | None = None
+    ) -> FailureRecord:
+        return FailureRecord(ReasonCode.EXTRACT_DEPENDENCY_MISSING, self.detail, dependency=self.dependency)
+
+
+def run_extractor(
+    extractor: Extractor,
+    artifact: ArtifactRecord,
+    storage: LocalStorage,
+    magic_bytes: bytes,
+    budget: ExtractBudget | None = None,
+) -> list[ExtractedContent] | FailureRecord | Reroute:
+    """Call `extractor.extract_text`, enforcing `budget` on its output."""
+    if budget is None or not budget.limited:
+        return extractor.extract_text(artifact, storage, magic_bytes)
+    if _takes_budget(type(extractor)):
+        result = extractor.extract_text(artifact, storage, magic_bytes, budget=budget)
+    else:
+        result = extractor.extract_text(artifact, storage, magic_bytes)
+    if isinstance(result, (FailureRecord, Reroute)) or not result:
+        return result
+    return [limit_output(result[0], budget.max_chars)]
+
+
+@functools.cache
+def _takes_budget(cls: type) -> bool:
+    try:
+        return "budget" in inspect.signature(cls.extract_text).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def limit_output(item: ExtractedContent, max_chars: int | None) -> ExtractedContent:
+    """Cut a text output to `max_chars` characters, marking it `truncated` if cut.
+
+    Streamed bodies are cut while they are read, and the source stream is
+    closed as soon as the limit is reached.
+    """
+    if max_chars is None or not item.media_type.startswith("text/"):
+        return item
+    metadata = item.metadata if item.metadata is not None else {}
+    if item.chunks is not None:
+        return replace(item, chunks=_limit_chunks(item.chunks, max_chars, metadata), metadata=metadata)
+    text = str(item.content, "utf-8")
+    if len(text) <= max_chars:
+        return item
+    metadata.setdefault("truncated", "max_chars")
+    return replace(item, content=text[:max_chars].encode("utf-8"), metadata=metadata)
+
+
+def _limit_chunks(chunks: Iterable[bytes], max_chars: int, metadata: dict[str, str]) -> Iterator[bytes]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    remaining = max_chars
+    source = iter(chunks)
+    try:
+        for chunk in source:
+            text = decoder.decode(chunk)
+            if len(text) > remaining:
+                metadata.setdefault("truncated", "max_chars")
+                if remaining:
+                    yield text[:remaining].encode("utf-8")
+                return
+            remaining -= len(text)
+            if text:
+                yield text.encode("utf-8")
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail.encode("utf-8")
+    finally:
+        close = getattr(source, "close", None)
+        if close is not None:
+            close()
+
+
+def decode_text(data: bytes | memoryview) -> str:
+    """Decode as UTF-8, falling back to Latin-1, with universal newlines."""
+    try:
+        text = str(data, "utf-8")
+    except UnicodeDecodeError:
+        text = str(data, "latin-1")
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def detect_encoding(storage: LocalStorage, path: Path) -> str:
+    """Return the encoding `decode_text` would pick for a blob, reading it in chunks.
+
+    Invalid UTF-8 usually shows up in the first chunk; otherwise the whole
+    blob is validated without keeping the decoded text.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        with storage.open_stream(path) as handle:
+            while chunk := handle.read(CHUNK_SIZE):
+                decoder.decode(chunk)
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return "latin-1"
+    return "utf-8"
+
+
+def transcode_chunks(storage: LocalStorage, path: Path, encoding: str) -> Iterator[bytes]:
+    """Yield a blob re-encoded as UTF-8 with universal newlines, chunk by chunk.
+
+    The concatenated output equals `encode_text(decode_text(data))` when
+    `encoding` comes from `detect_encoding`.
+    """
+    decoder = IncrementalNewlineDecoder(codecs.getincrementaldecoder(encoding)(), translate=True)
+    timed = get_tracer() is not None
+    elapsed = 0.0
+    size = 0
+    with storage.open_stream(path) as handle:
+        while True:
+            chunk = handle.read(CHUNK_SIZE)
+            started = time.perf_counter() if timed else 0.0
+            data = decoder.decode(chunk, final=not chunk).encode("utf-8")
+            if timed:
+                elapsed += time.perf_counter() - started
+            size += len(data)
+            if data:
+                yield data
+            if not chunk:
+                break
+    record(STAGE_ENCODE, elapsed, byte_size=size)
+
+
+def open_seekable(storage: LocalStorage, path: Path) -> BinaryIO:
+    """Open a blob for random access, reading it into memory if it is stored compressed."""
+    handle = storage.open_stream(path)
+    if handle.seekable():
+        return handle
+    with handle:
+        return BytesIO(handle.read())
+
+
+def encode_text(text: str) -> bytes:
+    """Encode extracted text as UTF-8, timed as the encode stage."""
+    with span(STAGE_ENCODE) as current:
+        data = text.encode("utf-8")
+        current.tag(byte_size=len(data))
+    return data
+
+
+def extractor_version(extractor: Extractor) -> str:
+    return str(getattr(extractor, "version", "0"))
+
+
+def extractor_options(extractor: Extractor) -> dict[str, str]:
+    """Return the output-affecting configuration of an extractor.
 
-    def extract_text(self, artifact: ArtifactRecord, storage: LocalStorage, magic_bytes: bytes) -> list[ExtractedContent] | FailureRecord:
-        """Return extracted content items or a failure record."""
+    Extractors with configuration expose it as an `options` mapping so that
+    differently configured runs get distinct derivation keys.
+    """
+    options = getattr(extractor, "options", None)
+    return {str(k): str(v) for k, v in options.items()} if options else {}
@@ -0,0 +1,46 @@
+"""Built-in extractors, declared without importing them.
+
+The extractor classes take their `capabilities` from these specs, and
+`pyproject.toml` registers them as `dbl_artifacts.extractors` entry points.
+"""
+from __future__ import annotations
+
+from ..detect import DOCX_FORMAT, EML_FORMAT, HTML_FORMAT, PDF_FORMAT, TEXT_FORMAT, ZIP_FORMAT
+from .base import Capabilities, ExtractorSpec, Rule
+
+TEXT = ExtractorSpec(
+    "text",
+    "dbl_artifacts.extractors.text:TextExtractor",
+    Capabilities((Rule.extension(TEXT_FORMAT, 90), Rule.media_prefix("text/", 80))),
+)
+PDF = ExtractorSpec(
+    "pdf",
+    "dbl_artifacts.extractors.pdf:PdfExtractor",
+    Capabilities((Rule.media_type(PDF_FORMAT, 100), Rule.extension(PDF_FORMAT, 90), Rule.magic(PDF_FORMAT, 95))),
+    dependencies=("fitz",),
+)
+DOCX = ExtractorSpec(
+    "docx",
+    "dbl_artifacts.extractors.docx:DocxExtractor",
+    Capabilities((Rule.media_type(DOCX_FORMAT, 100), Rule.extension(DOCX_FORMAT, 90), Rule.magic(DOCX_FORMAT, 50))),
+    dependencies=("lxml.etree",),
+)
+HTML = ExtractorSpec(
+    "html",
+    "dbl_artifacts.extractors.html:HtmlExtractor",
+    Capabilities((Rule.media_type(HTML_FORMAT, 100), Rule.extension(HTML_FORMAT, 80))),
+    dependencies=("lxml.html", "readability"),
+)
+EML = ExtractorSpec(
+    "eml",
+    "dbl_artifacts.extractors.eml:EmlExtractor",
+    Capabilities((Rule.media_type(EML_FORMAT, 100), Rule.extension(EML_FORMAT, 80))),
+)
+ARCHIVE = ExtractorSpec(
+    "archive",
+    "dbl_artifacts.extractors.archive:ArchiveExtractor",
+    Capabilities((Rule.media_type(ZIP_FORMAT, 100), Rule.extension(ZIP_FORMAT, 90), Rule.magic(ZIP_FORMAT, 40))),
+)
+
+# Registration order of the default registry.
+BUILTIN = (TEXT, PDF, DOCX, HTML, EML, ARCHIVE)
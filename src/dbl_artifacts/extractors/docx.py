@@ -1,40 +1,191 @@
-"""DOCX text extraction using python-docx."""
+"""DOCX text extraction using streaming lxml parsing, with python-docx as fallback."""
 from __future__ import annotations
 
-from io import BytesIO
+import re
+import zipfile
 from pathlib import Path
+from typing import BinaryIO, Iterator
 
-from ..detect import DOCX_EXTENSIONS, DOCX_MIME, ZIP_MAGIC
+from ..detect import ZIP_MIME
 from ..errors import FailureRecord, ReasonCode
 from ..models import ArtifactRecord
 from ..storage import LocalStorage
-from .base import ExtractedContent
+from .base import ExtractBudget, ExtractedContent, Reroute, encode_text, open_seekable
+from .builtin import DOCX
+
+DOCUMENT_PART = "word/document.xml"
+NOT_DOCX = "ZIP archive is not a DOCX document"
+# Secondary parts, extracted after the body in this order.
+EXTRA_PARTS = re.compile(r"word/(header|footer)(\d*)\.xml|word/(footnotes|endnotes)\.xml")
+ENGINES = ("auto", "fast", "python-docx")
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_P = f"{_W}p"
+_R = f"{_W}r"
+_HYPERLINK = f"{_W}hyperlink"
+_BR_TYPE = f"{_W}type"
+# Run content as python-docx's `Run.text` renders it; `w:br` depends on its type.
+_RUN_TEXT = {f"{_W}tab": "\t", f"{_W}cr": "\n", f"{_W}noBreakHyphen": "-", f"{_W}ptab": "\t"}
+_T = f"{_W}t"
+_BR = f"{_W}br"
 
 
 class DocxExtractor:
+    """DOCX extractor.
+
+    The default engine streams `word/document.xml`, then the header, footer,
+    footnote and endnote parts, through `lxml.etree.iterparse` straight from
+    the ZIP and clears each paragraph once its text is taken, so memory stays
+    flat. Paragraph text follows python-docx's `Paragraph.text` rules; body
+    paragraphs and table cells come out in document order, one non-empty
+    paragraph per line. For documents with body paragraphs only the output
+    equals the python-docx engine's. With `engine="auto"`, python-docx (body
+    paragraphs only) is used if the fast path fails. Under a `max_chars`
+    budget the fast path stops parsing once enough text is collected. A ZIP
+    without `word/document.xml` is rerouted as `application/zip`.
+    """
+
     name = "docx"
+    version = "2"
+    capabilities = DOCX.capabilities
+
+    def __init__(self, engine: str = "auto") -> None:
+        if engine not in ENGINES:
+            raise ValueError(f"unknown DOCX engine: {engine}")
+        self.engine = engine
+
+    @property
+    def options(self) -> dict[str, str]:
+        return {"engine": self.engine} if self.engine != "auto" else {}
 
     def supports(self, media_type: str, extension: str, magic_bytes: bytes) -> int:
-        if media_type == DOCX_MIME:
-            return 100
-        if extension in DOCX_EXTENSIONS:
-            return 90
-        if magic_bytes.startswith(ZIP_MAGIC):
-            return 50
-        return 0
-
-    def extract_text(self, artifact: ArtifactRecord, storage: LocalStorage, magic_bytes: bytes) -> list[ExtractedContent] | FailureRecord:
-        try:
-            from docx import Document  # type: ignore
-        except Exception:
-            return FailureRecord(ReasonCode.EXTRACT_DEPENDENCY_MISSING, "python-docx not installed", dependency="python-docx")
-
-        try:
-            data = storage.read_bytes(Path(artifact.storage_uri))
-            doc = Document(BytesIO(data))
-        except Exception as exc:
-            return FailureRecord(ReasonCode.EXTRACT_PARSE_ERROR, str(exc))
-
-        text = "\n".join(p.text for p in doc.paragraphs if p.text)
+        return self.capabilities.score(media_type, extension, magic_bytes)
+
+    def extract_text(
+        self, artifact: ArtifactRecord, storage: LocalStorage, magic_bytes: bytes, budget: ExtractBudget | None = None
+    ) -> list[ExtractedContent] | FailureRecord | Reroute:
+        if self.engine == "python-docx":
+            text = _python_docx_text(storage, artifact)
+        else:
+            text = _fast_text(storage, artifact, budget.max_chars if budget is not None else None)
+            if isinstance(text, FailureRecord) and self.engine == "auto":
+                text = _python_docx_text(storage, artifact)
+        if isinstance(text, (FailureRecord, Reroute)):
+            return text
         output_name = f"{artifact.original_filename}.extracted.txt"
-        return [ExtractedContent(content=text.encode("utf-8"), output_filename=output_name, media_type="text/plain")]
+        return [ExtractedContent(content=encode_text(text), output_filename=output_name, media_type="text/plain")]
+
+
+def _fast_text(
+    storage: LocalStorage, artifact: ArtifactRecord, max_chars: int | None = None
+) -> str | FailureRecord | Reroute:
+    try:
+        from lxml import etree  # type: ignore
+    except Exception:
+        return FailureRecord(ReasonCode.EXTRACT_DEPENDENCY_MISSING, "lxml not installed", dependency="lxml")
+
+    try:
+        with open_seekable(storage, Path(artifact.storage_uri)) as handle, zipfile.ZipFile(handle) as archive:
+            names = set(archive.namelist())
+            if DOCUMENT_PART not in names:
+                return Reroute(ZIP_MIME, NOT_DOCX)
+            lines: list[str] = []
+            # Length of the joined text plus one; stop once it exceeds the budget, so the cut is seen.
+            size = 0
+            for part in [DOCUMENT_PART, *_extra_parts(names)]:
+                with archive.open(part) as stream:
+                    for text in _paragraphs(etree, stream):
+                        if text:
+                            lines.append(text)
+                            size += len(text) + 1
+                        if max_chars is not None and size > max_chars + 1:
+                            break
+                if max_chars is not None and size > max_chars + 1:
+                    break
+    except Exception as exc:
+        return FailureRecord(ReasonCode.EXTRACT_PARSE_ERROR, str(exc))
+    return "\n".join(lines)
+
+
+def _extra_parts(names: set[str]) -> list[str]:
+    order = {"header": 0, "footer": 1, "footnotes": 2, "endnotes": 3}
+    parts = []
+    for name in names:
+        match = EXTRA_PARTS.fullmatch(name)
+        if match is not None:
+            kind = match.group(1) or match.group(3)
+            parts.append((order[kind], int(match.group(2) or 0), name))
+    return [name for *_, name in sorted(parts)]
+
+
+def _paragraphs(etree, stream: BinaryIO) -> Iterator[str]:
+    """Yield the text of every paragraph not nested in another (e.g. text boxes)."""
+    depth = 0
+    for event, element in etree.iterparse(stream, events=("start", "end"), tag=_P, resolve_entities=False):
+        if event == "start":
+            depth += 1
+            continue
+        depth -= 1
+        if depth:
+            continue
+        yield _paragraph_text(element)
+        element.clear(keep_tail=False)
+        parent = element.getparent()
+        if parent is not None:
+            while element.getprevious() is not None:
+                del parent[0]
+
+
+def _paragraph_text(paragraph) -> str:
+    parts: list[str] = []
+    for child in paragraph:
+        if child.tag == _R:
+            _run_text(child, parts)
+        elif child.tag == _HYPERLINK:
+            for run in child:
+                if run.tag == _R:
+                    _run_text(run, parts)
+    return "".join(parts)
+
+
+def _run_text(run, parts: list[str]) -> None:
+    for item in run:
+        tag = item.tag
+        if tag == _T:
+            parts.append(item.text or "")
+        elif tag == _BR:
+            if item.get(_BR_TYPE, "textWrapping") == "textWrapping":
+                parts.append("\n")
+        else:
+            text = _RUN_TEXT.get(tag)
+            if text is not None:
+                parts.append(text)
+
+
+def _python_docx_text(storage: LocalStorage, artifact: ArtifactRecord) -> str | FailureRecord | Reroute:
+    try:
+        from docx import Document  # type: ignore
+    except Exception:
+        return FailureRecord(ReasonCode.EXTRACT_DEPENDENCY_MISSING, "python-docx not installed", dependency="python-docx")
+
+    try:
+        with open_seekable(storage, Path(artifact.storage_uri)) as handle:
+            doc = Document(handle)
+    except Exception as exc:
+        if not _has_document_part(storage, artifact):
+            return Reroute(ZIP_MIME, NOT_DOCX)
+        return FailureRecord(ReasonCode.EXTRACT_PARSE_ERROR, str(exc))
+    return "\n".join(p.text for p in doc.paragraphs if p.text)
+
+
+def _has_document_part(storage: LocalStorage, artifact: ArtifactRecord) -> bool:
+    """Whether the blob is a ZIP with a `word/document.xml` part."""
+    try:
+        with open_seekable(storage, Path(artifact.storage_uri)) as handle:
+            with zipfile.ZipFile(handle) as archive:
+                archive.getinfo(DOCUMENT_PART)
+    except (KeyError, zipfile.BadZipFile):
+        return False
+    except Exception:
+        return True
+    return True
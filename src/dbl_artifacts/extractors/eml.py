@@ -1,47 +1,98 @@
 """EML extraction using Python stdlib email."""
 from __future__ import annotations
 
+import binascii
 from email import policy
-from email.parser import BytesParser
+from email.feedparser import BytesFeedParser
 from pathlib import Path
+from typing import Iterator
 
-from ..detect import EML_EXTENSIONS, EML_MIME
+from ..detect import EML_MIME
 from ..errors import FailureRecord, ReasonCode
 from ..models import ArtifactRecord
-from ..storage import LocalStorage
-from .base import ExtractedContent
+from ..storage import CHUNK_SIZE, LocalStorage
+from .base import ExtractBudget, ExtractedContent, encode_text
+from .builtin import EML
+
+_BASE64_ALPHABET = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/="
+_NOT_BASE64 = bytes(byte for byte in range(256) if byte not in _BASE64_ALPHABET)
 
 
 class EmlExtractor:
+    """EML extractor.
+
+    The blob is fed to the parser in `CHUNK_SIZE` pieces and the MIME tree
+    is walked once: the body is the first decodable `text/plain` part (else
+    the first `text/html` part, as text), and attachment payloads are
+    decoded chunk by chunk while they are stored. The parsed tree still
+    holds every part's encoded payload, so memory grows with the size of
+    the message; only the decoded attachments are never held whole.
+
+    With `recursive`, each attachment up to `max_attachment_bytes` is
+    extracted again through the registry, down to `max_depth` levels of
+    nesting. Attached messages (`message/rfc822`) are then kept whole as
+    `.eml` attachments instead of being flattened into the parent.
+
+    Under a budget only the body is produced, parsed from the first
+    `max_bytes_read` bytes of the message when that is set.
+    """
+
     name = "eml"
+    version = "1"
+    capabilities = EML.capabilities
 
-    def supports(self, media_type: str, extension: str, magic_bytes: bytes) -> int:
-        if media_type == EML_MIME:
-            return 100
-        if extension in EML_EXTENSIONS:
-            return 80
-        return 0
+    def __init__(self, recursive: bool = False, max_depth: int = 3, max_attachment_bytes: int = 64 * 1024 * 1024) -> None:
+        self.recursive = recursive
+        self.max_depth = max_depth
+        self.max_attachment_bytes = max_attachment_bytes
 
-    def extract_text(self, artifact: ArtifactRecord, storage: LocalStorage, magic_bytes: bytes) -> list[ExtractedContent] | FailureRecord:
-        try:
-            data = Path(artifact.storage_uri).read_bytes()
-        except Exception as exc:
-            return FailureRecord(ReasonCode.EXTRACT_PARSE_ERROR, str(exc))
+    @property
+    def options(self) -> dict[str, str]:
+        if not self.recursive:
+            return {}
+        return {"recursive": "1", "max_depth": str(self.max_depth), "max_attachment_bytes": str(self.max_attachment_bytes)}
 
+    def supports(self, media_type: str, extension: str, magic_bytes: bytes) -> int:
+        return self.capabilities.score(media_type, extension, magic_bytes)
+
+    def extract_text(
+        self, artifact: ArtifactRecord, storage: LocalStorage, magic_bytes: bytes, budget: ExtractBudget | None = None
+    ) -> list[ExtractedContent] | FailureRecord:
+        path = Path(artifact.storage_uri)
+        limit = budget.max_bytes_read if budget is not None else None
+        cut = limit is not None and artifact.byte_size > limit
         try:
-            msg = BytesParser(policy=policy.default).parsebytes(data)
+            parser = BytesFeedParser(policy=policy.default)
+            if cut:
+                parser.feed(storage.read_head(path, limit))
+            else:
+                with storage.open_stream(path) as handle:
+                    while chunk := handle.read(CHUNK_SIZE):
+                        parser.feed(chunk)
+            msg = parser.close()
         except Exception as exc:
             return FailureRecord(ReasonCode.EXTRACT_PARSE_ERROR, str(exc))
 
+        plain_parts = []
+        html_parts = []
+        attachments = []
+        for part in _walk(msg, keep_messages=self.recursive):
+            content_type = part.get_content_type()
+            if content_type == "text/plain":
+                plain_parts.append(part)
+            elif content_type == "text/html":
+                html_parts.append(part)
+            if part.get_content_disposition() == "attachment":
+                attachments.append(part)
+
+        body_text = _best_text_body(msg, plain_parts, html_parts)
+        if not body_text.strip():
+            return FailureRecord(ReasonCode.EXTRACT_EMPTY_CONTENT, "empty email body")
+
         subject = msg.get("subject", "")
         sender = msg.get("from", "")
         to = msg.get("to", "")
         date = msg.get("date", "")
-
-        body_text = _best_text_body(msg)
-        if not body_text.strip():
-            return FailureRecord(ReasonCode.EXTRACT_EMPTY_CONTENT, "empty email body")
-
         header = (
             f"Subject: {subject}\n"
             f"From: {sender}\n"
@@ -51,62 +102,136 @@ class EmlExtractor:
         outputs: list[ExtractedContent] = []
         output_name = f"{artifact.original_filename}.extracted.txt"
         outputs.append(
-            ExtractedContent(content=(header + body_text).encode("utf-8"), output_filename=output_name, media_type="text/plain")
+            ExtractedContent(
+                content=encode_text(header + body_text),
+                output_filename=output_name,
+                media_type="text/plain",
+                metadata={"truncated": "max_bytes_read"} if cut else None,
+            )
         )
+        if budget is not None and budget.limited:
+            return outputs
+
+        depth = int((artifact.metadata or {}).get("depth", "0")) + 1
+        for part in attachments:
+            attachment = self._attachment(part, artifact.artifact_id, depth)
+            if attachment is not None:
+                outputs.append(attachment)
+        return outputs
 
-        for attachment in _extract_attachments(msg, artifact.artifact_id):
-            outputs.append(attachment)
+    def _attachment(self, part, parent_id: str, depth: int) -> ExtractedContent | None:
+        if part.get_content_type() == EML_MIME and part.is_multipart():
+            if not self.recursive:
+                return None
+            filename = part.get_filename() or "attachment.eml"
+            chunks = _message_chunks(part)
+            estimate = None
+        else:
+            payload = part.get_payload()
+            if not isinstance(payload, str) or not payload.strip():
+                return None
+            filename = part.get_filename() or "attachment"
+            chunks = _payload_chunks(part)
+            estimate = len(payload) * 3 // 4 if _transfer_encoding(part) == "base64" else len(payload)
+        metadata = {
+            "source": "attachment",
+            "attachment_name": filename,
+            "parent_artifact_id": parent_id,
+        }
+        if self.recursive:
+            metadata["depth"] = str(depth)
+        return ExtractedContent(
+            content=b"",
+            output_filename=filename,
+            media_type=part.get_content_type() or "application/octet-stream",
+            metadata=metadata,
+            chunks=chunks,
+            expand=self.recursive
+            and depth <= self.max_depth
+            and (estimate is None or estimate <= self.max_attachment_bytes),
+        )
 
-        return outputs
 
+def _walk(part, keep_messages: bool) -> Iterator:
+    """Yield `part` and its subparts depth-first, like `Message.walk`.
 
-def _best_text_body(msg) -> str:
-    if msg.is_multipart():
-        for part in msg.walk():
-            if part.get_content_type() == "text/plain":
-                try:
-                    return part.get_content()
-                except Exception:
-                    continue
-        for part in msg.walk():
-            if part.get_content_type() == "text/html":
-                try:
-                    from lxml import html as lxml_html  # type: ignore
-                    tree = lxml_html.fromstring(part.get_content())
-                    return tree.text_content()
-                except Exception:
-                    continue
-        return ""
-    try:
-        return msg.get_content()
-    except Exception:
-        return ""
+    With `keep_messages`, attached messages are yielded but not entered.
+    """
+    yield part
+    if not part.is_multipart():
+        return
+    if keep_messages and part.get_content_type() == EML_MIME and part.get_content_disposition() == "attachment":
+        return
+    for subpart in part.get_payload():
+        yield from _walk(subpart, keep_messages)
 
 
-def _extract_attachments(msg, parent_id: str) -> list[ExtractedContent]:
-    attachments: list[ExtractedContent] = []
-    for part in msg.walk():
-        if part.get_content_disposition() != "attachment":
+def _best_text_body(msg, plain_parts: list, html_parts: list) -> str:
+    if not msg.is_multipart():
+        try:
+            return msg.get_content()
+        except Exception:
+            return ""
+    for part in plain_parts:
+        try:
+            return part.get_content()
+        except Exception:
             continue
-        filename = part.get_filename() or "attachment"
+    for part in html_parts:
         try:
-            payload = part.get_payload(decode=True)
+            from lxml import html as lxml_html  # type: ignore
+            tree = lxml_html.fromstring(part.get_content())
+            return tree.text_content()
         except Exception:
-            payload = None
-        if not payload:
             continue
-        media_type = part.get_content_type() or "application/octet-stream"
-        output_name = f"{filename}"
-        attachments.append(
-            ExtractedContent(
-                content=payload,
-                output_filename=output_name,
-                media_type=media_type,
-                metadata={
-                    "source": "attachment",
-                    "attachment_name": filename,
-                    "parent_artifact_id": parent_id,
-                },
-            )
-        )
-    return attachments
+    return ""
+
+
+def _transfer_encoding(part) -> str:
+    return str(part.get("content-transfer-encoding", "")).strip().lower()
+
+
+def _payload_chunks(part, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Decode an attachment payload incrementally.
+
+    Produces the same bytes as `part.get_payload(decode=True)` for well-formed
+    base64 and quoted-printable payloads without holding the decoded whole.
+    """
+    payload = part.get_payload()
+    encoding = _transfer_encoding(part)
+    if encoding == "base64":
+        carry = b""
+        for start in range(0, len(payload), chunk_size):
+            block = carry + payload[start : start + chunk_size].encode("ascii", "ignore").translate(None, _NOT_BASE64)
+            cut = len(block) - len(block) % 4
+            carry = block[cut:]
+            if cut:
+                yield binascii.a2b_base64(block[:cut])
+        if carry:
+            try:
+                yield binascii.a2b_base64(carry + b"=" * (-len(carry) % 4))
+            except binascii.Error:
+                pass
+    elif encoding == "quoted-printable":
+        start = 0
+        while start < len(payload):
+            # Split only after a newline so soft line breaks stay intact.
+            end = payload.find("\n", start + chunk_size)
+            end = len(payload) if end < 0 else end + 1
+            yield binascii.a2b_qp(_payload_bytes(payload[start:end]))
+            start = end
+    else:
+        data = part.get_payload(decode=True)
+        if data:
+            yield data
+
+
+def _payload_bytes(text: str) -> bytes:
+    try:
+        return text.encode("ascii", "surrogateescape")
+    except UnicodeError:
+        return text.encode("raw-unicode-escape")
+
+
+def _message_chunks(part) -> Iterator[bytes]:
+    yield part.get_payload(0).as_bytes(policy=policy.default)
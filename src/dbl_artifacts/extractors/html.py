@@ -1,54 +1,236 @@
-"""HTML extraction using readability-lxml."""
+"""HTML extraction using readability-lxml, or a single streaming lxml pass."""
 from __future__ import annotations
 
+import codecs
 from pathlib import Path
+from typing import BinaryIO, Iterable
 
-from ..detect import HTML_EXTENSIONS, HTML_MIME
 from ..errors import FailureRecord, ReasonCode
 from ..models import ArtifactRecord
-from ..storage import LocalStorage
-from .base import ExtractedContent
+from ..storage import CHUNK_SIZE, LocalStorage
+from .base import ExtractBudget, ExtractedContent, decode_text, encode_text
+from .builtin import HTML
+
+STRATEGIES = ("auto", "readability", "fast")
+# Elements whose text is never content.
+SKIP_TAGS = frozenset({"script", "style", "noscript", "template", "nav", "head", "svg"})
+BLOCK_TAGS = frozenset(
+    {
+        "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt", "figcaption", "figure",
+        "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "ol", "p", "pre",
+        "section", "table", "tr", "ul",
+    }
+)
+CELL_TAGS = frozenset({"td", "th"})
 
 
 class HtmlExtractor:
+    """HTML extractor.
+
+    `strategy="readability"` extracts the main article with readability-lxml.
+    `strategy="fast"` streams the page through one lxml pass that drops
+    script, style, nav and head content and keeps all remaining text, one
+    line per block element. `strategy="auto"` (the default) uses the fast
+    pass for pages over `max_readability_bytes`, parses everything else once,
+    and runs readability on that tree unless it has more than
+    `max_readability_nodes` elements. The title comes from the same tree.
+    Under a budget, `"auto"` also streams, and the fast pass stops reading
+    after `max_bytes_read` bytes or once `max_chars` characters are out.
+    """
+
     name = "html"
+    version = "2"
+    capabilities = HTML.capabilities
+
+    def __init__(
+        self,
+        strategy: str = "auto",
+        max_readability_bytes: int = 2 * 1024 * 1024,
+        max_readability_nodes: int = 20_000,
+    ) -> None:
+        if strategy not in STRATEGIES:
+            raise ValueError(f"unknown HTML strategy: {strategy}")
+        self.strategy = strategy
+        self.max_readability_bytes = max_readability_bytes
+        self.max_readability_nodes = max_readability_nodes
+
+    @property
+    def options(self) -> dict[str, str]:
+        if self.strategy != "auto":
+            return {"strategy": self.strategy}
+        return {
+            "strategy": "auto",
+            "max_readability_bytes": str(self.max_readability_bytes),
+            "max_readability_nodes": str(self.max_readability_nodes),
+        }
 
     def supports(self, media_type: str, extension: str, magic_bytes: bytes) -> int:
-        if media_type == HTML_MIME:
-            return 100
-        if extension in HTML_EXTENSIONS:
-            return 80
-        return 0
+        return self.capabilities.score(media_type, extension, magic_bytes)
 
-    def extract_text(self, artifact: ArtifactRecord, storage: LocalStorage, magic_bytes: bytes) -> list[ExtractedContent] | FailureRecord:
-        try:
-            from readability import Document  # type: ignore
-        except Exception:
-            return FailureRecord(ReasonCode.EXTRACT_DEPENDENCY_MISSING, "readability-lxml not installed", dependency="readability-lxml")
+    def extract_text(
+        self, artifact: ArtifactRecord, storage: LocalStorage, magic_bytes: bytes, budget: ExtractBudget | None = None
+    ) -> list[ExtractedContent] | FailureRecord:
         try:
-            from lxml import html as lxml_html  # type: ignore
+            from lxml import etree, html as lxml_html  # type: ignore
         except Exception:
             return FailureRecord(ReasonCode.EXTRACT_DEPENDENCY_MISSING, "lxml not installed", dependency="lxml")
 
-        try:
-            raw = Path(artifact.storage_uri).read_text(encoding="utf-8")
-        except UnicodeDecodeError:
+        path = Path(artifact.storage_uri)
+        budget = budget or ExtractBudget()
+        if (
+            self.strategy == "fast"
+            or (self.strategy == "auto" and (budget.limited or artifact.byte_size > self.max_readability_bytes))
+        ):
             try:
-                raw = Path(artifact.storage_uri).read_text(encoding="latin-1")
+                title, text = _stream_text(etree, storage, path, budget.max_bytes_read, budget.max_chars)
             except Exception as exc:
                 return FailureRecord(ReasonCode.EXTRACT_PARSE_ERROR, str(exc))
+            cut = budget.max_bytes_read is not None and artifact.byte_size > budget.max_bytes_read
+            return _output(artifact, title, text, {"truncated": "max_bytes_read"} if cut else None)
+
+        try:
+            with storage.view(path) as data:
+                raw = decode_text(data)
+            # Parsed exactly as readability parses its string input.
+            tree = lxml_html.document_fromstring(
+                raw.encode("utf-8", "replace"), parser=lxml_html.HTMLParser(encoding="utf-8")
+            )
         except Exception as exc:
             return FailureRecord(ReasonCode.EXTRACT_PARSE_ERROR, str(exc))
 
+        if self.strategy == "auto" and _count_elements(tree, self.max_readability_nodes) > self.max_readability_nodes:
+            title, text = _walk_text(etree.iterwalk(tree, events=("start", "end")), clear=False)
+            return _output(artifact, title, text)
+
+        try:
+            from readability import Document  # type: ignore
+        except Exception:
+            return FailureRecord(ReasonCode.EXTRACT_DEPENDENCY_MISSING, "readability-lxml not installed", dependency="readability-lxml")
         try:
-            doc = Document(raw)
+            doc = Document(tree)
             title = doc.short_title()
-            content = doc.summary()
-            tree = lxml_html.fromstring(content)
-            text = tree.text_content()
+            doc.summary()
+            # summary() leaves the cleaned article in `doc.html`; read its text rather than re-parse the markup.
+            text = doc.html.text_content()
         except Exception as exc:
             return FailureRecord(ReasonCode.EXTRACT_PARSE_ERROR, str(exc))
+        return _output(artifact, title, text)
+
+
+def _output(artifact: ArtifactRecord, title: str, text: str, metadata: dict[str, str] | None = None) -> list[ExtractedContent]:
+    header = f"Title: {title}\nSource: {artifact.original_filename}\n\n"
+    output_name = f"{artifact.original_filename}.extracted.txt"
+    return [
+        ExtractedContent(
+            content=encode_text(header + text), output_filename=output_name, media_type="text/plain", metadata=metadata
+        )
+    ]
+
+
+def _count_elements(tree, limit: int) -> int:
+    count = 0
+    for _ in tree.iter():
+        count += 1
+        if count > limit:
+            break
+    return count
+
+
+def _stream_text(
+    etree, storage: LocalStorage, path: Path, max_bytes: int | None = None, max_chars: int | None = None
+) -> tuple[str, str]:
+    """Run the fast pass over the blob as it is read, decoded like `decode_text`."""
+    try:
+        with storage.open_stream(path) as handle:
+            return _walk_text(_pull_events(etree, handle, "utf-8", max_bytes), clear=True, max_chars=max_chars)
+    except UnicodeDecodeError:
+        with storage.open_stream(path) as handle:
+            return _walk_text(_pull_events(etree, handle, "latin-1", max_bytes), clear=True, max_chars=max_chars)
+
+
+def _pull_events(etree, handle: BinaryIO, encoding: str, max_bytes: int | None = None) -> Iterable:
+    decoder = codecs.getincrementaldecoder(encoding)()
+    parser = etree.HTMLPullParser(events=("start", "end"))
+    remaining = max_bytes
+    while True:
+        want = CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining)
+        chunk = handle.read(want) if want else b""
+        if remaining is not None:
+            remaining -= len(chunk)
+        # A character cut by the byte budget is dropped instead of failing the decode.
+        parser.feed(decoder.decode(chunk, final=not chunk and bool(want)))
+        yield from parser.read_events()
+        if not chunk:
+            break
+    parser.close()
+    yield from parser.read_events()
+
+
+def _walk_text(events: Iterable, clear: bool, max_chars: int | None = None) -> tuple[str, str]:
+    """Collect title and visible text from start/end events in document order.
+
+    Text before an element is complete when it starts, and an element's
+    trailing content is complete when it ends, so pieces are taken at those
+    two points. With `clear`, finished elements are dropped from the tree.
+    With `max_chars`, the walk stops once the text is longer than that; the
+    check runs each time the raw pieces have doubled in length.
+    """
+    pieces: list[str] = []
+    title = ""
+    skipping = 0
+    collected = measured = 0
+    check_at = max_chars
+    for event, element in events:
+        if check_at is not None:
+            collected += sum(len(piece) for piece in pieces[measured:])
+            measured = len(pieces)
+            if collected > check_at:
+                if len(_collapse(pieces)) > max_chars:
+                    break
+                check_at = 2 * collected
+        tag = element.tag if isinstance(element.tag, str) else ""
+        if event == "start":
+            parent = element.getparent()
+            if parent is not None and not skipping:
+                _gap(parent, element, pieces)
+            if tag in SKIP_TAGS:
+                skipping += 1
+            elif tag in BLOCK_TAGS and not skipping:
+                pieces.append("\n")
+            continue
+        if tag == "title" and not title:
+            title = " ".join((element.text or "").split())
+        if not skipping:
+            _gap(element, None, pieces)
+            if tag in BLOCK_TAGS:
+                pieces.append("\n")
+            elif tag in CELL_TAGS:
+                pieces.append(" ")
+        if tag in SKIP_TAGS:
+            skipping -= 1
+        if clear:
+            element.clear(keep_tail=True)
+            parent = element.getparent()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
+    return title or "[no-title]", _collapse(pieces)
+
+
+def _collapse(pieces: list[str]) -> str:
+    lines = (" ".join(line.split()) for line in "".join(pieces).splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def _gap(parent, node, pieces: list[str]) -> None:
+    """Append the text of `parent` that directly precedes `node` (or its end).
 
-        header = f"Title: {title}\nSource: {artifact.original_filename}\n\n"
-        output_name = f"{artifact.original_filename}.extracted.txt"
-        return [ExtractedContent(content=(header + text).encode("utf-8"), output_filename=output_name, media_type="text/plain")]
+    Comments get no events, so their tails are collected here as well.
+    """
+    previous = node.getprevious() if node is not None else (parent[-1] if len(parent) else None)
+    texts = []
+    while previous is not None and not isinstance(previous.tag, str):
+        texts.append(previous.tail)
+        previous = previous.getprevious()
+    texts.append(previous.tail if previous is not None else parent.text)
+    pieces.extend(text for text in reversed(texts) if text)
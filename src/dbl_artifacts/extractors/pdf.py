@@ -1,48 +1,133 @@
 """PDF text extraction using PyMuPDF."""
 from __future__ import annotations
 
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
+from typing import Iterator
 
-from ..detect import PDF_EXTENSIONS, PDF_MAGIC, PDF_MIME
 from ..errors import FailureRecord, ReasonCode
 from ..models import ArtifactRecord
+from ..pool import bounded_map
 from ..storage import LocalStorage
-from .base import ExtractedContent
+from .base import ExtractBudget, ExtractedContent
+from .builtin import PDF
 
 
 class PdfExtractor:
+    """PDF extractor.
+
+    The document is opened by path (blobs held in segment files are read
+    into memory instead) and page text is streamed into the derived blob in
+    page order. With `workers > 1`, documents longer than
+    `pages_per_task` pages are split into page ranges extracted on a process
+    pool. `record_page_offsets` adds the byte offset at which each page
+    starts to the derived artifact's metadata. Under a budget, pages are
+    read in order and reading stops after `max_pages` pages or once
+    `max_chars` characters are out.
+    """
+
     name = "pdf"
+    version = "1"
+    capabilities = PDF.capabilities
+
+    def __init__(self, workers: int = 1, pages_per_task: int = 32, record_page_offsets: bool = False) -> None:
+        self.workers = workers
+        self.pages_per_task = pages_per_task
+        self.record_page_offsets = record_page_offsets
+
+    @property
+    def options(self) -> dict[str, str]:
+        return {"page_offsets": "1"} if self.record_page_offsets else {}
 
     def supports(self, media_type: str, extension: str, magic_bytes: bytes) -> int:
-        if media_type == PDF_MIME:
-            return 100
-        if extension in PDF_EXTENSIONS:
-            return 90
-        if magic_bytes.startswith(PDF_MAGIC):
-            return 95
-        return 0
-
-    def extract_text(self, artifact: ArtifactRecord, storage: LocalStorage, magic_bytes: bytes) -> list[ExtractedContent] | FailureRecord:
+        return self.capabilities.score(media_type, extension, magic_bytes)
+
+    def extract_text(
+        self, artifact: ArtifactRecord, storage: LocalStorage, magic_bytes: bytes, budget: ExtractBudget | None = None
+    ) -> list[ExtractedContent] | FailureRecord:
         try:
             import fitz  # type: ignore
         except Exception as exc:
             return FailureRecord(ReasonCode.EXTRACT_DEPENDENCY_MISSING, "pymupdf not installed", dependency="pymupdf")
 
+        path = storage.local_path(Path(artifact.storage_uri))
         try:
-            data = storage.read_bytes(Path(artifact.storage_uri))
-            doc = fitz.open(stream=data, filetype="pdf")
+            if path is not None:
+                doc = fitz.open(str(path), filetype="pdf")
+            else:
+                doc = fitz.open(stream=storage.read_bytes(Path(artifact.storage_uri)), filetype="pdf")
         except Exception as exc:
             return FailureRecord(ReasonCode.EXTRACT_PARSE_ERROR, str(exc))
 
         if doc.is_encrypted:
+            doc.close()
             return FailureRecord(ReasonCode.EXTRACT_PASSWORD_REQUIRED, "PDF is encrypted")
 
-        try:
-            text = "\n".join(page.get_text() for page in doc)
-        except Exception as exc:
-            return FailureRecord(ReasonCode.EXTRACT_PARSE_ERROR, str(exc))
-        finally:
+        page_count = doc.page_count
+        max_pages = budget.max_pages if budget is not None else None
+        if budget is not None and budget.limited:
+            # Pages are read one at a time so the budget can stop the reading.
+            pages = _document_pages(doc, max_pages)
+        elif path is not None and self.workers > 1 and page_count > self.pages_per_task:
             doc.close()
+            pages = self._parallel_pages(path, page_count)
+        else:
+            pages = _document_pages(doc)
 
+        metadata = {"page_count": str(page_count)} if self.record_page_offsets else None
+        if max_pages is not None and page_count > max_pages:
+            metadata = {**(metadata or {}), "truncated": "max_pages"}
         output_name = f"{artifact.original_filename}.extracted.txt"
-        return [ExtractedContent(content=text.encode("utf-8"), output_filename=output_name, media_type="text/plain")]
+        return [
+            ExtractedContent(
+                content=b"",
+                output_filename=output_name,
+                media_type="text/plain",
+                metadata=metadata,
+                chunks=_join_pages(pages, metadata if self.record_page_offsets else None),
+            )
+        ]
+
+    def _parallel_pages(self, path: Path, page_count: int) -> Iterator[str]:
+        ranges = [
+            (start, min(start + self.pages_per_task, page_count))
+            for start in range(0, page_count, self.pages_per_task)
+        ]
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            fn = partial(_page_range_text, str(path))
+            for _, future in bounded_map(executor, fn, ranges, max_in_flight=2 * self.workers):
+                yield from future.result()
+
+
+def _document_pages(doc, max_pages: int | None = None) -> Iterator[str]:
+    try:
+        for number in range(doc.page_count if max_pages is None else min(max_pages, doc.page_count)):
+            yield doc[number].get_text()
+    finally:
+        doc.close()
+
+
+def _page_range_text(path: str, page_range: tuple[int, int]) -> list[str]:
+    import fitz  # type: ignore
+
+    start, stop = page_range
+    with fitz.open(path, filetype="pdf") as doc:
+        return [doc[number].get_text() for number in range(start, stop)]
+
+
+def _join_pages(pages: Iterator[str], metadata: dict[str, str] | None) -> Iterator[bytes]:
+    """Encode pages exactly as `"\\n".join(pages).encode("utf-8")` would."""
+    offsets: list[str] = []
+    position = 0
+    for number, text in enumerate(pages):
+        chunk = text.encode("utf-8")
+        if number:
+            chunk = b"\n" + chunk
+            offsets.append(str(position + 1))
+        else:
+            offsets.append("0")
+        position += len(chunk)
+        yield chunk
+    if metadata is not None:
+        metadata["page_offsets"] = ",".join(offsets)
@@ -1,35 +1,90 @@
 """Plain text extractor."""
 from __future__ import annotations
 
+import codecs
+from io import IncrementalNewlineDecoder
 from pathlib import Path
 
-from ..detect import TEXT_EXTENSIONS
 from ..errors import FailureRecord, ReasonCode
 from ..models import ArtifactRecord
-from ..storage import LocalStorage
-from .base import ExtractedContent
+from ..storage import CHUNK_SIZE, LocalStorage
+from .base import ExtractBudget, ExtractedContent, decode_text, detect_encoding, encode_text, transcode_chunks
+from .builtin import TEXT
 
 
 class TextExtractor:
+    """Plain text extractor.
+
+    Files over one chunk are streamed: the encoding (UTF-8, else Latin-1) is
+    detected in one pass and the blob is transcoded to UTF-8 with universal
+    newlines chunk by chunk in a second, so memory does not grow with the
+    file size. Smaller files are decoded in memory. Under a budget only the
+    first `max_bytes_read` bytes, and no more than `max_chars` characters
+    can need, are read and decoded.
+    """
+
     name = "text"
+    version = "1"
+    capabilities = TEXT.capabilities
 
     def supports(self, media_type: str, extension: str, magic_bytes: bytes) -> int:
-        if extension in TEXT_EXTENSIONS:
-            return 90
-        if media_type.startswith("text/"):
-            return 80
-        return 0
+        return self.capabilities.score(media_type, extension, magic_bytes)
 
-    def extract_text(self, artifact: ArtifactRecord, storage: LocalStorage, magic_bytes: bytes) -> list[ExtractedContent] | FailureRecord:
-        try:
-            text = Path(artifact.storage_uri).read_text(encoding="utf-8")
-        except UnicodeDecodeError:
+    def extract_text(
+        self, artifact: ArtifactRecord, storage: LocalStorage, magic_bytes: bytes, budget: ExtractBudget | None = None
+    ) -> list[ExtractedContent] | FailureRecord:
+        path = Path(artifact.storage_uri)
+        output_name = f"{artifact.original_filename}.extracted.txt"
+        if budget is not None and budget.limited:
+            limit = _prefix_bytes(budget)
+            if limit is not None and limit < artifact.byte_size:
+                try:
+                    text = _decode_prefix(storage.read_head(path, limit))
+                except Exception as exc:
+                    return FailureRecord(ReasonCode.EXTRACT_PARSE_ERROR, str(exc))
+                cut_by = "max_bytes_read" if limit == budget.max_bytes_read else "max_chars"
+                return [
+                    ExtractedContent(
+                        content=encode_text(text),
+                        output_filename=output_name,
+                        media_type="text/plain",
+                        metadata={"truncated": cut_by},
+                    )
+                ]
+        if artifact.byte_size <= CHUNK_SIZE:
             try:
-                text = Path(artifact.storage_uri).read_text(encoding="latin-1")
+                with storage.view(path) as data:
+                    text = decode_text(data)
             except Exception as exc:
                 return FailureRecord(ReasonCode.EXTRACT_PARSE_ERROR, str(exc))
+            return [ExtractedContent(content=encode_text(text), output_filename=output_name, media_type="text/plain")]
+
+        try:
+            encoding = detect_encoding(storage, path)
         except Exception as exc:
             return FailureRecord(ReasonCode.EXTRACT_PARSE_ERROR, str(exc))
+        return [
+            ExtractedContent(
+                content=b"",
+                output_filename=output_name,
+                media_type="text/plain",
+                chunks=transcode_chunks(storage, path, encoding),
+            )
+        ]
 
-        output_name = f"{artifact.original_filename}.extracted.txt"
-        return [ExtractedContent(content=text.encode("utf-8"), output_filename=output_name, media_type="text/plain")]
+
+def _prefix_bytes(budget: ExtractBudget) -> int | None:
+    """Bytes enough for the budget: UTF-8 and Latin-1 use at most 4 bytes per character."""
+    limits = [budget.max_bytes_read]
+    if budget.max_chars is not None:
+        limits.append(4 * budget.max_chars + 4)
+    limits = [limit for limit in limits if limit is not None]
+    return min(limits) if limits else None
+
+
+def _decode_prefix(data: bytes) -> str:
+    """Decode the start of a blob like `decode_text`, tolerating a character cut at the end."""
+    try:
+        return IncrementalNewlineDecoder(codecs.getincrementaldecoder("utf-8")(), translate=True).decode(data)
+    except UnicodeDecodeError:
+        return IncrementalNewlineDecoder(codecs.getincrementaldecoder("latin-1")(), translate=True).decode(data)
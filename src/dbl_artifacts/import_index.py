@@ -0,0 +1,109 @@
+"""Persistent source fingerprint index for incremental imports."""
+from __future__ import annotations
+
+import json
+import os
+import random
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .db import Database, connect
+from .models import ArtifactRecord
+from .storage import LocalStorage
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    filename TEXT NOT NULL,
+    media_type TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    record TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+@dataclass(frozen=True)
+class Fingerprint:
+    path: str
+    size: int
+    mtime_ns: int
+    inode: int
+
+    @classmethod
+    def of(cls, path: str | Path) -> "Fingerprint":
+        absolute = os.path.abspath(path)
+        stat = os.stat(absolute)
+        return cls(absolute, stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+
+@dataclass(frozen=True)
+class ImportIndex:
+    """SQLite map from source fingerprints to previously imported records.
+
+    A source whose (absolute path, size, mtime_ns, inode) is unchanged, that
+    is imported under the same filename and media type, and whose blob is
+    still in storage, is returned from the index without being read. With
+    `verify_sample > 0`, that fraction of hits is re-imported anyway and the
+    index is corrected if the content turns out to differ.
+    """
+
+    path: Path
+    verify_sample: float = 0.0
+    rng: random.Random = field(default_factory=random.Random, compare=False, repr=False)
+
+    def _db(self) -> Database:
+        return connect(self.path, _SCHEMA)
+
+    def lookup(
+        self,
+        fingerprint: Fingerprint,
+        filename: str,
+        media_type: str | None,
+        storage: LocalStorage,
+    ) -> ArtifactRecord | None:
+        rows = self._db().execute(
+            "SELECT size, mtime_ns, inode, filename, media_type, record FROM sources WHERE path = ?",
+            (fingerprint.path,),
+        )
+        if not rows:
+            return None
+        size, mtime_ns, inode, stored_filename, stored_media, record = rows[0]
+        if (size, mtime_ns, inode) != (fingerprint.size, fingerprint.mtime_ns, fingerprint.inode):
+            return None
+        if stored_filename != filename or stored_media != (media_type or ""):
+            return None
+        artifact = ArtifactRecord.from_dict(json.loads(record))
+        if not storage.exists(Path(artifact.storage_uri)):
+            return None
+        return artifact
+
+    def should_verify(self) -> bool:
+        return self.verify_sample > 0 and self.rng.random() < self.verify_sample
+
+    def record(
+        self,
+        fingerprint: Fingerprint,
+        filename: str,
+        media_type: str | None,
+        artifact: ArtifactRecord,
+    ) -> None:
+        self._db().execute(
+            "INSERT OR REPLACE INTO sources (path, size, mtime_ns, inode, filename, media_type, sha256, record) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                fingerprint.path,
+                fingerprint.size,
+                fingerprint.mtime_ns,
+                fingerprint.inode,
+                filename,
+                media_type or "",
+                artifact.sha256_bytes,
+                json.dumps(artifact.to_dict(), sort_keys=True),
+            ),
+        )
+
+    def forget(self, path: str | Path) -> None:
+        self._db().execute("DELETE FROM sources WHERE path = ?", (os.path.abspath(path),))
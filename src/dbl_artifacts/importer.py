@@ -1,53 +1,118 @@
 """Artifact import logic."""
 from __future__ import annotations
 
+import threading
+from contextlib import ExitStack
 from pathlib import Path
+from typing import BinaryIO
 
 from .detect import detect_media_type, extension_from_filename, is_supported_import
+from .catalog import ArtifactCatalog
 from .errors import ArtifactError, FailureRecord, ReasonCode
-from .models import ArtifactRecord
+from .import_index import Fingerprint, ImportIndex
+from .models import JOB_IMPORT, ArtifactRecord
 from .storage import LocalStorage, sha256_bytes
+from .trace import STAGE_DETECT, STAGE_HASH, STAGE_READ, STAGE_STORE, span
+
+HEAD_SIZE = 512
+
+Source = bytes | str | Path | BinaryIO
 
 
 def _default_storage() -> LocalStorage:
     return LocalStorage(Path.cwd() / "data")
 
 
-def _read_source(source: bytes | str | Path) -> bytes:
-    if isinstance(source, bytes):
-        return source
-    path = Path(source)
-    return path.read_bytes()
+def _read_head(handle: BinaryIO, limit: int = HEAD_SIZE) -> bytes:
+    head = b""
+    while len(head) < limit:
+        chunk = handle.read(limit - len(head))
+        if not chunk:
+            break
+        head += chunk
+    return head
+
+
+def _check_supported(filename: str, media_type: str | None, head: bytes) -> str:
+    with span(STAGE_DETECT, filename=filename) as current:
+        ext = extension_from_filename(filename)
+        detected_media = detect_media_type(filename, media_type, head)
+        current.tag(media_type=detected_media)
+        if not is_supported_import(detected_media, ext, head):
+            raise ArtifactError(
+                ReasonCode.IMPORT_UNSUPPORTED_TYPE,
+                f"unsupported file type: {ext}",
+            )
+    return detected_media
 
 
 def import_artifact(
-    source: bytes | str | Path,
+    source: Source,
     filename: str,
     media_type: str | None = None,
     storage: LocalStorage | None = None,
+    index: ImportIndex | None = None,
+    catalog: ArtifactCatalog | None = None,
 ) -> ArtifactRecord:
     """Import a file into content-addressed storage.
 
+    Paths and binary file-like objects are streamed in chunks, so memory use
+    stays bounded regardless of source size; `bytes` are stored directly.
+    With an `index`, path sources whose fingerprint is unchanged since their
+    last import are returned without being read. With a `catalog`, the
+    record (or the failure, keyed by filename) is written to it.
+
     Raises ArtifactError on unsupported types or read failures.
     """
     store = storage or _default_storage()
     try:
-        data = _read_source(source)
-    except Exception as exc:
+        if isinstance(source, bytes):
+            artifact = _import_bytes(source, filename, media_type, store)
+        elif index is not None and isinstance(source, (str, Path)):
+            artifact = _import_indexed(Path(source), filename, media_type, store, index)
+        else:
+            artifact = _import_stream(source, filename, media_type, store)
+    except ArtifactError as exc:
+        if catalog is not None:
+            catalog.record_failure(filename, JOB_IMPORT, FailureRecord(exc.reason_code, exc.detail))
+        raise
+    if catalog is not None:
+        catalog.record_import(artifact)
+    return artifact
+
+
+def _import_indexed(
+    path: Path,
+    filename: str,
+    media_type: str | None,
+    store: LocalStorage,
+    index: ImportIndex,
+) -> ArtifactRecord:
+    try:
+        before = Fingerprint.of(path)
+    except OSError as exc:
         raise ArtifactError(ReasonCode.IMPORT_READ_ERROR, str(exc)) from exc
+    cached = index.lookup(before, filename, media_type, store)
+    if cached is not None and not index.should_verify():
+        return cached
+
+    artifact = _import_stream(path, filename, media_type, store)
+    try:
+        after = Fingerprint.of(path)
+    except OSError:
+        after = None
+    if after == before:
+        index.record(before, filename, media_type, artifact)
+    return artifact
 
-    head = data[:512]
-    ext = extension_from_filename(filename)
-    detected_media = detect_media_type(filename, media_type, head)
 
-    if not is_supported_import(detected_media, ext, head):
-        raise ArtifactError(
-            ReasonCode.IMPORT_UNSUPPORTED_TYPE,
-            f"unsupported file type: {ext}",
-        )
+def _import_bytes(data: bytes, filename: str, media_type: str | None, store: LocalStorage) -> ArtifactRecord:
+    detected_media = _check_supported(filename, media_type, data[:HEAD_SIZE])
 
-    digest = sha256_bytes(data)
-    path = store.store_bytes(data)
+    with span(STAGE_HASH, media_type=detected_media, byte_size=len(data)):
+        digest = sha256_bytes(data)
+    with span(STAGE_STORE, media_type=detected_media, byte_size=len(data)):
+        path = store.store_bytes(data)
 
     return ArtifactRecord(
         artifact_id=f"art-{digest}",
@@ -57,3 +122,44 @@ def import_artifact(
         sha256_bytes=digest,
         storage_uri=str(path),
     )
+
+
+def _import_stream(
+    source: str | Path | BinaryIO,
+    filename: str,
+    media_type: str | None,
+    store: LocalStorage,
+    cancel: threading.Event | None = None,
+) -> ArtifactRecord:
+    with ExitStack() as stack:
+        try:
+            with span(STAGE_READ, filename=filename):
+                if isinstance(source, (str, Path)):
+                    handle = stack.enter_context(Path(source).open("rb"))
+                else:
+                    handle = source
+                head = _read_head(handle)
+        except Exception as exc:
+            raise ArtifactError(ReasonCode.IMPORT_READ_ERROR, str(exc)) from exc
+
+        detected_media = _check_supported(filename, media_type, head)
+
+        try:
+            # Reading the remainder and hashing happen inside the store stage;
+            # the writer reports its hashing time as a separate hash event.
+            with span(STAGE_STORE, media_type=detected_media) as current:
+                blob = store.store_stream(handle, head=head, cancel=cancel)
+                current.tag(byte_size=blob.byte_size)
+        except ArtifactError:
+            raise
+        except Exception as exc:
+            raise ArtifactError(ReasonCode.IMPORT_READ_ERROR, str(exc)) from exc
+
+    return ArtifactRecord(
+        artifact_id=f"art-{blob.sha256_bytes}",
+        original_filename=filename,
+        media_type=detected_media,
+        byte_size=blob.byte_size,
+        sha256_bytes=blob.sha256_bytes,
+        storage_uri=str(blob.path),
+    )
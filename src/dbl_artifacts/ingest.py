@@ -0,0 +1,281 @@
+"""Incremental import and extraction of a directory tree."""
+from __future__ import annotations
+
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from typing import Callable, Iterator
+
+from .batch import _extract_one, _import_one, _run
+from .cache import UNCACHEABLE_REASONS, DerivationCache
+from .db import Database, connect
+from .errors import FailureRecord, ReasonCode
+from .models import ArtifactRecord, DerivationResult
+from .registry import ExtractorRegistry
+from .storage import LocalStorage
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+# (size, mtime_ns, inode) of a file as last ingested.
+Stamp = tuple[int, int, int]
+# Ingested files are written to the state in batches of this many.
+STATE_BATCH = 256
+
+
+@dataclass(frozen=True)
+class IngestReport:
+    """Outcome of one pass over a tree.
+
+    `ingested` includes `unsupported` files (not importable) and `failed`
+    ones (import or extraction failed); `bytes_read` counts imported sources.
+    """
+
+    seen: int = 0
+    ingested: int = 0
+    unchanged: int = 0
+    deferred: int = 0
+    unsupported: int = 0
+    failed: int = 0
+    removed: int = 0
+    bytes_read: int = 0
+    duration: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+    def to_dict(self) -> dict:
+        return {
+            "seen": self.seen,
+            "ingested": self.ingested,
+            "unchanged": self.unchanged,
+            "deferred": self.deferred,
+            "unsupported": self.unsupported,
+            "failed": self.failed,
+            "removed": self.removed,
+            "bytes_read": self.bytes_read,
+            "duration": self.duration,
+        }
+
+
+class _Rows:
+    """In-memory copy of the `files` table, filled on first use."""
+
+    def __init__(self) -> None:
+        self.stamps: dict[str, Stamp] | None = None
+
+
+@dataclass(frozen=True)
+class IngestState:
+    """SQLite record of files already ingested, keyed by absolute path.
+
+    The table is read once per instance and then kept in memory, with each
+    `update` applied to both, so repeated passes (as in watch mode) do not
+    re-read it. Changes made by other writers are not seen.
+    """
+
+    path: Path
+    _rows: _Rows = field(default_factory=_Rows, init=False, repr=False, compare=False)
+
+    def _db(self) -> Database:
+        return connect(self.path, _SCHEMA)
+
+    def load(self) -> dict[str, Stamp]:
+        rows = self._rows
+        if rows.stamps is None:
+            cursor = self._db().execute("SELECT path, size, mtime_ns, inode FROM files")
+            rows.stamps = {path: (size, mtime_ns, inode) for path, size, mtime_ns, inode in cursor}
+        return rows.stamps
+
+    def update(self, ingested: list[tuple[str, Stamp]], removed: list[str]) -> None:
+        with self._db().transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, inode) VALUES (?, ?, ?, ?)",
+                [(path, *stamp) for path, stamp in ingested],
+            )
+            conn.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in removed])
+        stamps = self._rows.stamps
+        if stamps is not None:
+            stamps.update(ingested)
+            for path in removed:
+                stamps.pop(path, None)
+
+
+def ingest(
+    root: Path,
+    storage: LocalStorage,
+    *,
+    state: IngestState | None = None,
+    manifest: Path | None = None,
+    registry: ExtractorRegistry | None = None,
+    cache: DerivationCache | None = None,
+    workers: int | None = None,
+    settle: float = 0.0,
+    progress: Callable[[IngestReport], None] | None = None,
+) -> IngestReport:
+    """Import and extract every new or changed file under `root`.
+
+    The tree is walked with `os.scandir` in name order, without following
+    symlinks and skipping the storage root. With `state`, files whose size,
+    mtime and inode match the last ingest are skipped, and files that
+    disappeared are forgotten; reuse one `IngestState` across passes to
+    keep its table in memory. Files modified less than `settle` seconds ago
+    are left for a later pass. Each file is imported and extracted in one
+    task on `workers` processes (inline when `workers == 1`). With
+    `manifest`, one JSON line per ingested or removed file is appended.
+    The state is updated every `STATE_BATCH` files, so an interrupted pass
+    keeps its progress. `progress` is called with the running totals after
+    each file.
+    """
+    started = time.monotonic()
+    known = state.load() if state is not None else {}
+    cutoff = time.time_ns() - int(settle * 1e9)
+    seen = unchanged = deferred = 0
+    pending: list[tuple[str, Stamp]] = []
+    present: set[str] = set()
+    for path, stat in _walk(Path(root).absolute(), storage.root.absolute()):
+        seen += 1
+        present.add(path)
+        stamp = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        if known.get(path) == stamp:
+            unchanged += 1
+        elif stat.st_mtime_ns > cutoff:
+            deferred += 1
+        else:
+            pending.append((path, stamp))
+    removed = sorted(path for path in known if path not in present)
+
+    ingested = unsupported = failed = bytes_read = 0
+    done: list[tuple[str, Stamp]] = []
+    with _Manifest(manifest) as out:
+        for path in removed:
+            out.write({"source": path, "removed": True})
+        if state is not None and removed:
+            state.update([], removed)
+        fn = partial(_ingest_one, storage=storage, registry=registry, cache=cache)
+        for index, (record, derivation) in _results(pending, fn, workers):
+            path, stamp = pending[index]
+            out.write(_manifest_line(path, record, derivation))
+            ingested += 1
+            if isinstance(record, FailureRecord) and record.reason_code == ReasonCode.IMPORT_UNSUPPORTED_TYPE:
+                unsupported += 1
+            elif isinstance(record, FailureRecord) or derivation.failure is not None:
+                failed += 1
+            if isinstance(record, ArtifactRecord):
+                bytes_read += record.byte_size
+            if _settled(record, derivation):
+                done.append((path, stamp))
+            if state is not None and len(done) >= STATE_BATCH:
+                state.update(done, [])
+                done.clear()
+            if progress is not None:
+                progress(_report(seen, ingested, unchanged, deferred, unsupported, failed, len(removed), bytes_read, started))
+    if state is not None and done:
+        state.update(done, [])
+    return _report(seen, ingested, unchanged, deferred, unsupported, failed, len(removed), bytes_read, started)
+
+
+def _report(seen, ingested, unchanged, deferred, unsupported, failed, removed, bytes_read, started) -> IngestReport:
+    return IngestReport(
+        seen=seen,
+        ingested=ingested,
+        unchanged=unchanged,
+        deferred=deferred,
+        unsupported=unsupported,
+        failed=failed,
+        removed=removed,
+        bytes_read=bytes_read,
+        duration=time.monotonic() - started,
+    )
+
+
+def _walk(root: Path, skip: Path) -> Iterator[tuple[str, os.stat_result]]:
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                ordered = sorted(entries, key=lambda entry: entry.name)
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            continue
+        subdirectories = []
+        for entry in ordered:
+            if entry.is_dir(follow_symlinks=False):
+                if Path(entry.path) != skip:
+                    subdirectories.append(Path(entry.path))
+            elif entry.is_file(follow_symlinks=False):
+                try:
+                    yield entry.path, entry.stat(follow_symlinks=False)
+                except FileNotFoundError:
+                    continue
+        stack.extend(reversed(subdirectories))
+
+
+def _results(pending: list[tuple[str, Stamp]], fn, workers: int | None) -> Iterator[tuple[int, tuple]]:
+    if not pending:
+        return iter(())
+    if workers == 1:
+        return ((index, fn(path)) for index, (path, _) in enumerate(pending))
+    return _run((path for path, _ in pending), fn, workers, None, True, None, _ingest_crash)
+
+
+def _ingest_one(
+    path: str,
+    storage: LocalStorage,
+    registry: ExtractorRegistry | None,
+    cache: DerivationCache | None,
+) -> tuple[ArtifactRecord | FailureRecord, DerivationResult | None]:
+    record = _import_one((path, os.path.basename(path), None), storage)
+    if isinstance(record, FailureRecord):
+        return record, None
+    return record, _extract_one(record, storage, registry, cache)
+
+
+def _ingest_crash(exc: Exception) -> tuple[FailureRecord, None]:
+    return FailureRecord(ReasonCode.IMPORT_READ_ERROR, f"worker failed: {exc}"), None
+
+
+def _settled(record: ArtifactRecord | FailureRecord, derivation: DerivationResult | None) -> bool:
+    """Whether the outcome is final for this content, so the file can be skipped next time."""
+    if isinstance(record, FailureRecord):
+        return record.reason_code != ReasonCode.IMPORT_READ_ERROR
+    return derivation.failure is None or derivation.failure.reason_code not in UNCACHEABLE_REASONS
+
+
+def _manifest_line(path: str, record: ArtifactRecord | FailureRecord, derivation: DerivationResult | None) -> dict:
+    if isinstance(record, FailureRecord):
+        return {"source": path, "failure": record.to_dict()}
+    return {"source": path, "artifact": record.to_dict(), "derivation": derivation.to_dict()}
+
+
+class _Manifest:
+    """Appends JSON lines to a file, flushed per line; a no-op without a path."""
+
+    def __init__(self, path: Path | None) -> None:
+        self.path = path
+        self.handle = None
+
+    def __enter__(self) -> _Manifest:
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.handle = self.path.open("a", encoding="utf-8")
+        return self
+
+    def write(self, line: dict) -> None:
+        if self.handle is not None:
+            self.handle.write(json.dumps(line, sort_keys=True) + "\n")
+            self.handle.flush()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self.handle is not None:
+            self.handle.close()
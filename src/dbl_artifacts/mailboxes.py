@@ -0,0 +1,214 @@
+"""Bulk import of mbox files and Maildir trees."""
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import replace
+from pathlib import Path
+from typing import Iterator
+
+from .catalog import ArtifactCatalog
+from .detect import EML_MIME
+from .errors import ArtifactError, ReasonCode
+from .import_index import ImportIndex
+from .importer import import_artifact
+from .models import ArtifactRecord
+from .storage import BlobWriter, LocalStorage
+
+MBOX_SEPARATOR = b"From "
+MAILDIR_SUBDIRS = ("new", "cur")
+
+
+def _default_storage() -> LocalStorage:
+    return LocalStorage(Path.cwd() / "data")
+
+
+def import_mbox(
+    path: str | Path,
+    storage: LocalStorage | None = None,
+    catalog: ArtifactCatalog | None = None,
+    *,
+    start_offset: int = 0,
+    checkpoint: Path | None = None,
+    checkpoint_every: int = 100,
+) -> Iterator[ArtifactRecord]:
+    """Import each message of an mbox file as an EML artifact.
+
+    The file is scanned line by line and every message is streamed into
+    storage as it is read, so memory use does not depend on message or file
+    size. Messages start at lines beginning with `From `. As with
+    `mailbox.mbox`, the separator line and the blank line ending a message
+    are dropped and `>From ` lines are left escaped. Records carry
+    `container`, `container_type`, `container_offset` (of the separator
+    line) and `envelope` metadata.
+
+    With `checkpoint`, the offset after the last imported message is saved to
+    that file every `checkpoint_every` messages and at the end, and a later
+    call resumes from it. Messages imported again after a crash deduplicate
+    in storage.
+    """
+    store = storage or _default_storage()
+    path = Path(path)
+    offset = start_offset
+    if checkpoint is not None:
+        offset = max(offset, _load_checkpoint(checkpoint, path))
+    try:
+        handle = path.open("rb")
+    except OSError as exc:
+        raise ArtifactError(ReasonCode.IMPORT_READ_ERROR, str(exc)) from exc
+    with handle:
+        if offset and not _at_separator(handle, offset):
+            offset = 0
+        handle.seek(offset)
+        position = offset
+        message: _MboxMessage | None = None
+        done = 0
+        try:
+            for line in handle:
+                if line.startswith(MBOX_SEPARATOR):
+                    if message is not None:
+                        artifact = message.commit(catalog)
+                        message = None
+                        done += 1
+                        if checkpoint is not None and done % checkpoint_every == 0:
+                            _save_checkpoint(checkpoint, path, position)
+                        yield artifact
+                    message = _MboxMessage(store, path, position, line)
+                elif message is not None:
+                    message.write(line)
+                position += len(line)
+            if message is not None:
+                artifact = message.commit(catalog)
+                message = None
+                if checkpoint is not None:
+                    _save_checkpoint(checkpoint, path, position)
+                yield artifact
+            elif checkpoint is not None:
+                _save_checkpoint(checkpoint, path, position)
+        except OSError as exc:
+            raise ArtifactError(ReasonCode.IMPORT_READ_ERROR, str(exc)) from exc
+        finally:
+            if message is not None:
+                message.abort()
+
+
+def import_maildir(
+    path: str | Path,
+    storage: LocalStorage | None = None,
+    catalog: ArtifactCatalog | None = None,
+    *,
+    index: ImportIndex | None = None,
+) -> Iterator[ArtifactRecord]:
+    """Import every message of a Maildir, including Maildir++ subfolders.
+
+    Messages are streamed from `new` and `cur` in sorted order. With an
+    `index`, unchanged message files are not read again. Messages moved or
+    deleted while the scan runs are skipped. Records carry `container`,
+    `container_type` and `container_path` (relative to the Maildir) metadata.
+    """
+    store = storage or _default_storage()
+    root = Path(path)
+    for message_path in _maildir_messages(root):
+        try:
+            artifact = import_artifact(
+                message_path, f"{message_path.name}.eml", media_type=EML_MIME, storage=store, index=index
+            )
+        except ArtifactError:
+            if not message_path.exists():
+                continue
+            raise
+        metadata = dict(artifact.metadata or {})
+        metadata.update(
+            container=str(root),
+            container_type="maildir",
+            container_path=message_path.relative_to(root).as_posix(),
+        )
+        artifact = replace(artifact, metadata=metadata)
+        if catalog is not None:
+            catalog.record_import(artifact)
+        yield artifact
+
+
+def _maildir_messages(root: Path) -> Iterator[Path]:
+    folders = [root]
+    try:
+        folders += sorted(entry for entry in root.iterdir() if entry.name.startswith(".") and entry.is_dir())
+    except OSError as exc:
+        raise ArtifactError(ReasonCode.IMPORT_READ_ERROR, str(exc)) from exc
+    for folder in folders:
+        for subdir in MAILDIR_SUBDIRS:
+            try:
+                with os.scandir(folder / subdir) as entries:
+                    names = sorted(entry.name for entry in entries if entry.is_file() and not entry.name.startswith("."))
+            except FileNotFoundError:
+                continue
+            for name in names:
+                yield folder / subdir / name
+
+
+class _MboxMessage:
+    """One mbox message being streamed into storage."""
+
+    def __init__(self, storage: LocalStorage, container: Path, offset: int, separator: bytes) -> None:
+        self._writer: BlobWriter = storage.writer()
+        self._container = container
+        self._offset = offset
+        self._envelope = separator[len(MBOX_SEPARATOR) :].rstrip(b"\r\n").decode("latin-1")
+        # A blank line is held back until we know it does not end the message.
+        self._blank = b""
+
+    def write(self, line: bytes) -> None:
+        if self._blank:
+            self._writer.write(self._blank)
+            self._blank = b""
+        if line in (b"\n", b"\r\n"):
+            self._blank = line
+        else:
+            self._writer.write(line)
+
+    def commit(self, catalog: ArtifactCatalog | None) -> ArtifactRecord:
+        blob = self._writer.commit()
+        artifact = ArtifactRecord(
+            artifact_id=f"art-{blob.sha256_bytes}",
+            original_filename=f"{self._container.name}-{self._offset}.eml",
+            media_type=EML_MIME,
+            byte_size=blob.byte_size,
+            sha256_bytes=blob.sha256_bytes,
+            storage_uri=str(blob.path),
+            metadata={
+                "container": str(self._container),
+                "container_type": "mbox",
+                "container_offset": str(self._offset),
+                "envelope": self._envelope,
+            },
+        )
+        if catalog is not None:
+            catalog.record_import(artifact)
+        return artifact
+
+    def abort(self) -> None:
+        self._writer.abort()
+
+
+def _at_separator(handle, offset: int) -> bool:
+    """Whether a resume offset is still valid: at a separator, or at the end."""
+    if offset == os.fstat(handle.fileno()).st_size:
+        return True
+    handle.seek(offset)
+    return handle.read(len(MBOX_SEPARATOR)) == MBOX_SEPARATOR
+
+
+def _load_checkpoint(checkpoint: Path, path: Path) -> int:
+    try:
+        state = json.loads(checkpoint.read_text())
+    except (OSError, ValueError):
+        return 0
+    if state.get("path") != str(path.resolve()):
+        return 0
+    return int(state.get("offset", 0))
+
+
+def _save_checkpoint(checkpoint: Path, path: Path, offset: int) -> None:
+    temp = checkpoint.with_name(checkpoint.name + ".tmp")
+    temp.write_text(json.dumps({"path": str(path.resolve()), "offset": offset}))
+    os.replace(temp, checkpoint)
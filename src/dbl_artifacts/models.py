@@ -1,7 +1,7 @@
 """Core models for dbl-artifacts."""
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 
 from .errors import FailureRecord
 
@@ -19,6 +19,13 @@ class ArtifactRecord:
     storage_uri: str
     metadata: dict[str, str] | None = None
 
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ArtifactRecord":
+        return cls(**data)
+
 
 @dataclass(frozen=True)
 class DerivationResult:
@@ -32,3 +39,20 @@ class DerivationResult:
     @classmethod
     def failed(cls, failure: FailureRecord) -> "DerivationResult":
         return cls(derived_artifacts=None, failure=failure)
+
+    def to_dict(self) -> dict:
+        return {
+            "derived_artifacts": (
+                None if self.derived_artifacts is None else [a.to_dict() for a in self.derived_artifacts]
+            ),
+            "failure": None if self.failure is None else self.failure.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DerivationResult":
+        artifacts = data.get("derived_artifacts")
+        failure = data.get("failure")
+        return cls(
+            derived_artifacts=None if artifacts is None else [ArtifactRecord.from_dict(a) for a in artifacts],
+            failure=None if failure is None else FailureRecord.from_dict(failure),
+        )
@@ -0,0 +1,152 @@
+"""Append-only segment files for small blobs."""
+from __future__ import annotations
+
+import mmap
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+from .db import Database, connect
+from .errors import ArtifactError, ReasonCode
+
+PACK_DIRNAME = "packs"
+SEGMENT_LIMIT = 256 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    sha256 BLOB PRIMARY KEY,
+    segment INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    encoded INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS segments (
+    segment INTEGER PRIMARY KEY,
+    size INTEGER NOT NULL
+);
+"""
+
+
+@dataclass(frozen=True)
+class PackEntry:
+    segment: Path
+    offset: int
+    length: int
+    encoded: bool = False
+
+
+@dataclass(frozen=True)
+class PackStore:
+    """Small objects appended to segment files under `root`.
+
+    The index maps sha256 -> (segment, offset, length). Appends run inside a
+    write transaction on the index, which serializes writers across
+    processes; a segment's committed size is recorded with each entry, so
+    bytes left behind by a crashed writer are overwritten by the next one.
+    """
+
+    root: Path
+    segment_limit: int = SEGMENT_LIMIT
+
+    def _db(self) -> Database:
+        return connect(self.root / "index.sqlite", _SCHEMA)
+
+    def _segment_path(self, segment: int) -> Path:
+        return self.root / f"pack-{segment:06d}.seg"
+
+    def lookup(self, sha256_hex: str) -> PackEntry | None:
+        rows = self._db().execute(
+            "SELECT segment, offset, length, encoded FROM objects WHERE sha256 = ?", (bytes.fromhex(sha256_hex),)
+        )
+        if not rows:
+            return None
+        segment, offset, length, encoded = rows[0]
+        return PackEntry(self._segment_path(segment), offset, length, bool(encoded))
+
+    def contains(self, sha256_hex: str) -> bool:
+        return self.lookup(sha256_hex) is not None
+
+    def append(self, sha256_hex: str, content: bytes, encoded: bool = False, fsync: bool = False) -> Path | None:
+        """Append an object; `encoded` marks a compressed payload with header.
+
+        Returns the segment written to, or None if the object was present.
+        With `fsync`, the segment is flushed to disk before the index entry
+        is committed.
+        """
+        key = bytes.fromhex(sha256_hex)
+        db = self._db()
+        try:
+            with db.transaction() as conn:
+                if conn.execute("SELECT 1 FROM objects WHERE sha256 = ?", (key,)).fetchone():
+                    return None
+                row = conn.execute("SELECT segment, size FROM segments ORDER BY segment DESC LIMIT 1").fetchone()
+                segment, size = row if row else (1, 0)
+                if size and size + len(content) > self.segment_limit:
+                    segment, size = segment + 1, 0
+                path = self._segment_path(segment)
+                with path.open("r+b" if path.exists() else "wb") as handle:
+                    handle.seek(size)
+                    handle.write(content)
+                    if fsync:
+                        handle.flush()
+                        os.fsync(handle.fileno())
+                conn.execute(
+                    "INSERT OR REPLACE INTO segments (segment, size) VALUES (?, ?)", (segment, size + len(content))
+                )
+                conn.execute(
+                    "INSERT INTO objects (sha256, segment, offset, length, encoded) VALUES (?, ?, ?, ?, ?)",
+                    (key, segment, size, len(content), int(encoded)),
+                )
+        except OSError as exc:
+            raise ArtifactError(ReasonCode.STORAGE_WRITE_ERROR, str(exc)) from exc
+        return path
+
+    def segments(self) -> list[tuple[Path, int]]:
+        """Return each segment file with its committed size."""
+        rows = self._db().execute("SELECT segment, size FROM segments ORDER BY segment")
+        return [(self._segment_path(segment), size) for segment, size in rows]
+
+    def entries(self, segment: Path) -> Iterator[tuple[str, PackEntry]]:
+        """Yield (sha256, entry) for the objects stored in `segment`, by offset."""
+        number = int(segment.stem.split("-")[1])
+        rows = self._db().execute(
+            "SELECT sha256, offset, length, encoded FROM objects WHERE segment = ? ORDER BY offset", (number,)
+        )
+        for key, offset, length, encoded in rows:
+            yield key.hex(), PackEntry(segment, offset, length, bool(encoded))
+
+    def read(self, sha256_hex: str, limit: int | None = None) -> bytes:
+        """Read an object's stored payload (still compressed if encoded)."""
+        entry = self._require(sha256_hex)
+        length = entry.length if limit is None else min(limit, entry.length)
+        with entry.segment.open("rb") as handle:
+            handle.seek(entry.offset)
+            return handle.read(length)
+
+    @contextmanager
+    def view(self, sha256_hex: str) -> Iterator[memoryview]:
+        entry = self._require(sha256_hex)
+        if entry.length == 0:
+            yield memoryview(b"")
+            return
+        with entry.segment.open("rb") as handle:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            view = memoryview(mapped)
+            part = view[entry.offset : entry.offset + entry.length]
+            try:
+                yield part
+            finally:
+                part.release()
+                view.release()
+                try:
+                    mapped.close()
+                except BufferError:
+                    pass
+
+    def _require(self, sha256_hex: str) -> PackEntry:
+        entry = self.lookup(sha256_hex)
+        if entry is None:
+            raise FileNotFoundError(f"object not found: {sha256_hex}")
+        return entry
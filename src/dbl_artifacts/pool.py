@@ -0,0 +1,65 @@
+"""Bounded fan-out over concurrent.futures executors."""
+from __future__ import annotations
+
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from typing import Callable, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def bounded_map(
+    executor: Executor,
+    fn: Callable[[T], R],
+    items: Iterable[T],
+    max_in_flight: int,
+    ordered: bool = True,
+) -> Iterator[tuple[int, Future[R]]]:
+    """Submit `fn(item)` for each item, keeping at most `max_in_flight` pending.
+
+    Yields `(index, future)` pairs for finished futures, in input order when
+    `ordered` is true and in completion order otherwise. Items are pulled
+    from `items` lazily, so unbounded iterables are fine. Pending futures are
+    cancelled if the consumer stops early.
+    """
+    if max_in_flight < 1:
+        raise ValueError("max_in_flight must be >= 1")
+    source = enumerate(items)
+    pending: dict[Future[R], int] = {}
+    queue: deque[Future[R]] = deque()
+
+    def submit_next() -> None:
+        for index, item in source:
+            future = executor.submit(fn, item)
+            pending[future] = index
+            if ordered:
+                queue.append(future)
+            return
+
+    try:
+        while len(pending) < max_in_flight:
+            before = len(pending)
+            submit_next()
+            if len(pending) == before:
+                break
+        while pending:
+            if ordered:
+                future = queue.popleft()
+                wait([future])
+                finished = [future]
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                finished = sorted(done, key=pending.__getitem__)
+            for future in finished:
+                index = pending.pop(future)
+                submit_next()
+                yield index, future
+    finally:
+        for future in pending:
+            future.cancel()
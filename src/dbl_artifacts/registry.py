@@ -1,39 +1,189 @@
-"""Extractor registry and selection."""
+"""Extractor registry, selection and discovery."""
 from __future__ import annotations
 
-from dataclasses import dataclass
+import functools
+import importlib
+import warnings
+from dataclasses import dataclass, field
+from itertools import product
 
-from .extractors.docx import DocxExtractor
-from .extractors.eml import EmlExtractor
-from .extractors.html import HtmlExtractor
-from .extractors.pdf import PdfExtractor
-from .extractors.text import TextExtractor
-from .extractors.base import Extractor
+from .detect import Magic, MagicTrie
+from .extractors.base import Capabilities, Extractor, ExtractorSpec
+from .extractors.builtin import BUILTIN
+
+# Entry point group under which distributions register extractors.
+ENTRY_POINT_GROUP = "dbl_artifacts.extractors"
+# Bound on cached (media type, extension, magic signature) decisions.
+MAX_DECISIONS = 4096
+
+# (extractor index, rule position, score)
+_Hit = tuple[int, int, int]
+# (score, extractor index) of a winner, or None.
+_Decision = tuple[int, int] | None
 
 
 @dataclass
 class ExtractorRegistry:
-    extractors: list[Extractor]
+    """Chooses the extractor with the highest score, ties broken by name.
+
+    Extractors with `capabilities` are compiled into hash lookups by media
+    type and extension plus a magic-prefix trie, and decisions are cached per
+    (media type, extension, matched magic prefixes). Magic hints (substrings
+    such as the DOCX part names) are only searched for when they can change
+    the decision. Extractors without
+    capabilities are asked through `supports` on every call. The table is
+    rebuilt when `extractors` changes.
+
+    `extractors` may also hold `ExtractorSpec`s; a spec is loaded the first
+    time it wins a selection, and `select` returns the loaded extractor.
+    """
+
+    extractors: list[Extractor | ExtractorSpec]
+    _dispatch: _Dispatch | None = field(default=None, init=False, repr=False, compare=False)
+
+    def select(self, media_type: str, extension: str, magic_bytes: bytes) -> Extractor | None:
+        dispatch = self._dispatch
+        if dispatch is None or dispatch.extractors != self.extractors:
+            dispatch = self._dispatch = _Dispatch(list(self.extractors))
+        return dispatch.select(media_type, extension, magic_bytes)
+
+
+class _Dispatch:
+    def __init__(self, extractors: list[Extractor | ExtractorSpec]) -> None:
+        self.extractors = extractors
+        self.loaded: list[Extractor | None] = [None if isinstance(e, ExtractorSpec) else e for e in extractors]
+        self.by_media: dict[str, list[_Hit]] = {}
+        self.by_extension: dict[str, list[_Hit]] = {}
+        self.media_prefixes: list[tuple[str, _Hit]] = []
+        self.magic: MagicTrie[_Hit] = MagicTrie()
+        self.dynamic: list[int] = []
+        # Per (media type, extension, trie node): the magics whose hints matter and
+        # a decision per hint outcome.
+        self.decisions: dict[tuple[str, str, int], tuple[tuple[Magic, ...], dict]] = {}
+        for index, extractor in enumerate(extractors):
+            capabilities = getattr(extractor, "capabilities", None)
+            if not isinstance(capabilities, Capabilities):
+                self.dynamic.append(index)
+                continue
+            for position, rule in enumerate(capabilities.rules):
+                hit = (index, position, rule.score)
+                if rule.kind == "media_type":
+                    for value in rule.values:
+                        self.by_media.setdefault(value, []).append(hit)
+                elif rule.kind == "extension":
+                    for value in rule.values:
+                        self.by_extension.setdefault(value, []).append(hit)
+                elif rule.kind == "media_prefix":
+                    self.media_prefixes.extend((value, hit) for value in rule.values)
+                else:
+                    for magic in rule.values:
+                        self.magic.add(magic, hit)
 
     def select(self, media_type: str, extension: str, magic_bytes: bytes) -> Extractor | None:
-        scored: list[tuple[int, str, Extractor]] = []
-        for extractor in self.extractors:
-            score = extractor.supports(media_type, extension, magic_bytes)
-            if score > 0:
-                scored.append((score, extractor.name, extractor))
-        if not scored:
+        node = self.magic.deepest(magic_bytes)
+        key = (media_type, extension, node.key)
+        entry = self.decisions.get(key)
+        if entry is None:
+            entry = self._compile(media_type, extension, node.matches)
+            if len(self.decisions) >= MAX_DECISIONS:
+                self.decisions.clear()
+            self.decisions[key] = entry
+        hinted, outcomes = entry
+        best = outcomes[tuple(magic.hinted(magic_bytes) for magic in hinted)] if hinted else outcomes[()]
+        if self.dynamic:
+            best = self._with_dynamic(best, media_type, extension, magic_bytes)
+        if best is None:
             return None
-        scored.sort(key=lambda item: (-item[0], item[1]))
-        return scored[0][2]
+        extractor = self.loaded[best[1]]
+        if extractor is None:
+            extractor = self.loaded[best[1]] = self.extractors[best[1]].load()
+        return extractor
+
+    def _compile(
+        self, media_type: str, extension: str, candidates: tuple[tuple[Magic, _Hit], ...]
+    ) -> tuple[tuple[Magic, ...], dict]:
+        """Decide for every outcome of the hint checks; keep only the checks that matter."""
+        hinted = [i for i, (magic, _) in enumerate(candidates) if magic.hint is not None]
+        outcomes = {}
+        for flags in product((False, True), repeat=len(hinted)):
+            dropped = {i for i, flag in zip(hinted, flags) if not flag}
+            signature = [hit for i, (_, hit) in enumerate(candidates) if i not in dropped]
+            outcomes[flags] = self._decide(media_type, extension, signature)
+        if len(set(outcomes.values())) == 1:
+            return (), {(): outcomes.popitem()[1]}
+        return tuple(candidates[i][0] for i in hinted), outcomes
+
+    def _decide(self, media_type: str, extension: str, signature: list[_Hit]) -> _Decision:
+        # An extractor scores by its first matching rule, as in `Capabilities.score`.
+        first: dict[int, tuple[int, int]] = {}
+        hits = [*self.by_media.get(media_type, ()), *self.by_extension.get(extension, ()), *signature]
+        hits.extend(hit for prefix, hit in self.media_prefixes if media_type.startswith(prefix))
+        for index, position, score in hits:
+            if index not in first or position < first[index][0]:
+                first[index] = (position, score)
+        return self._best((score, index) for index, (_, score) in first.items())
+
+    def _with_dynamic(self, best: _Decision, media_type: str, extension: str, magic_bytes: bytes) -> _Decision:
+        candidates = [best] if best is not None else []
+        for index in self.dynamic:
+            candidates.append((self.extractors[index].supports(media_type, extension, magic_bytes), index))
+        return self._best(candidates)
+
+    def _best(self, candidates) -> _Decision:
+        """Highest score, then name, then registration order."""
+        ranked = [(-score, self.extractors[index].name, index) for score, index in candidates if score > 0]
+        if not ranked:
+            return None
+        score, _, index = min(ranked)
+        return -score, index
 
 
 def default_registry() -> ExtractorRegistry:
-    return ExtractorRegistry(
-        extractors=[
-            TextExtractor(),
-            PdfExtractor(),
-            DocxExtractor(),
-            HtmlExtractor(),
-            EmlExtractor(),
-        ]
-    )
+    """A new registry over the built-in and entry-point extractors, loaded on first use."""
+    return ExtractorRegistry(extractors=list(_discover()))
+
+
+@functools.cache
+def _shared_registry() -> ExtractorRegistry:
+    """The process-wide default registry used when none is passed."""
+    return default_registry()
+
+
+@functools.cache
+def _discover() -> tuple[Extractor | ExtractorSpec, ...]:
+    """Built-in specs, replaced or extended by `ENTRY_POINT_GROUP` entry points.
+
+    An entry point names an `ExtractorSpec` (imported lazily), an extractor
+    class (instantiated with no arguments) or an instance. Entry points are
+    read in name order, and one that fails to load is skipped with a warning.
+    """
+    from importlib.metadata import entry_points
+
+    found: dict[str, Extractor | ExtractorSpec] = {spec.name: spec for spec in BUILTIN}
+    for entry in sorted(entry_points(group=ENTRY_POINT_GROUP), key=lambda entry: entry.name):
+        try:
+            value = entry.load()
+            if isinstance(value, type):
+                value = value()
+        except Exception as exc:
+            warnings.warn(f"skipping extractor entry point {entry.name!r}: {exc}", RuntimeWarning, stacklevel=2)
+            continue
+        found[value.name] = value
+    return tuple(found.values())
+
+
+def warmup(registry: ExtractorRegistry | None = None) -> None:
+    """Load every extractor of `registry` (default: the shared one) and import its dependencies.
+
+    For long-lived workers that prefer to pay import costs up front.
+    Missing optional dependencies are left for extraction to report.
+    """
+    for extractor in (registry or _shared_registry()).extractors:
+        if not isinstance(extractor, ExtractorSpec):
+            continue
+        extractor.load()
+        for module in extractor.dependencies:
+            try:
+                importlib.import_module(module)
+            except ImportError:
+                pass
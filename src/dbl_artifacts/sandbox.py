@@ -0,0 +1,369 @@
+"""Run extractors in pre-forked worker processes under time and memory limits."""
+from __future__ import annotations
+
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+import weakref
+from dataclasses import replace
+from multiprocessing.util import Finalize
+from typing import Iterator
+
+from .errors import ArtifactError, ExtractionFailed, FailureRecord, ReasonCode
+from .models import ArtifactRecord
+from .registry import ExtractorRegistry, default_registry
+from .storage import LocalStorage
+from .extractors.base import ExtractBudget, ExtractedContent, Extractor, ExtractorSpec, run_extractor
+
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_MEMORY_LIMIT = 2 * 1024 * 1024 * 1024
+DEFAULT_MAX_JOBS = 100
+# How long a worker whose pipe closed gets to exit before it is killed.
+EXIT_TIMEOUT = 5.0
+
+
+class ExtractorSandbox:
+    """Pool of reusable worker processes that run `Extractor.extract_text`.
+
+    `workers` processes are started up front. Each job gets `timeout`
+    seconds of wall-clock time; a worker that overruns is killed and the job
+    fails with `EXTRACT_TIMEOUT`. Workers run with `RLIMIT_AS` set to
+    `memory_limit` bytes of address space (POSIX only; None for no cap), and
+    a job that exhausts it, or whose worker is killed outright, fails with
+    `EXTRACT_RESOURCE_LIMIT`. Workers are replaced after `max_jobs` jobs and
+    whenever a limit was hit.
+
+    Streamed outputs stay streamed: their chunks are sent over the pipe as
+    the worker produces them, and the worker stays busy until they are read
+    or dropped. The timeout covers that reading too. Use `wrap()` to get a
+    registry whose extractors run here; a sandbox belongs to the process
+    that created it and cannot be pickled.
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        timeout: float | None = DEFAULT_TIMEOUT,
+        memory_limit: int | None = DEFAULT_MEMORY_LIMIT,
+        max_jobs: int = DEFAULT_MAX_JOBS,
+        mp_context=None,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        if max_jobs < 1:
+            raise ValueError("max_jobs must be >= 1")
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.max_jobs = max_jobs
+        self._context = mp_context or multiprocessing.get_context()
+        # None is the closed sentinel; each waiter that takes it puts it back for the next.
+        self._idle: queue.SimpleQueue[_Worker | None] = queue.SimpleQueue()
+        self._live: set[_Worker] = set()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._spawn_error: BaseException | None = None
+        for _ in range(workers):
+            self._idle.put(self._spawn())
+        self._finalizer = Finalize(self, _stop_all, args=(self._live,), exitpriority=15)
+
+    def run(
+        self,
+        extractor: Extractor | ExtractorSpec,
+        artifact: ArtifactRecord,
+        storage: LocalStorage,
+        magic_bytes: bytes,
+        budget: ExtractBudget | None = None,
+    ) -> list[ExtractedContent] | FailureRecord:
+        """Run `extractor.extract_text` in a worker, waiting for one to be free."""
+        if self._closed:
+            raise RuntimeError("sandbox is closed") from self._spawn_error
+        worker = self._idle.get()
+        if worker is None or self._closed:
+            self._idle.put(None)
+            raise RuntimeError("sandbox is closed") from self._spawn_error
+        deadline = time.monotonic() + self.timeout if self.timeout is not None else None
+        status, value = "limit", None
+        try:
+            status, value = self._call(worker, (extractor, artifact, storage, magic_bytes, budget), deadline)
+        finally:
+            if status != "stream":
+                self._release(worker, failed=status == "limit")
+        if status == "raise":
+            raise ArtifactError(*value)
+        if status == "stream":
+            return _Stream(_Lease(self, worker), deadline, value).items(value)
+        return value
+
+    def _call(self, worker: _Worker, job: tuple, deadline: float | None) -> tuple[str, object]:
+        worker.jobs += 1
+        try:
+            # A worker that died while idle fails here, on the send.
+            worker.conn.send(job)
+        except OSError:
+            return "limit", self._exit_failure(worker)
+        except Exception as exc:
+            # The job is pickled before anything is written, so the worker is still usable.
+            return "ok", FailureRecord(ReasonCode.EXTRACT_PARSE_ERROR, f"could not send job to sandbox worker: {exc}")
+        return self._receive(worker, deadline)
+
+    def _receive(self, worker: _Worker, deadline: float | None) -> tuple[str, object]:
+        try:
+            if not worker.conn.poll(None if deadline is None else max(0.0, deadline - time.monotonic())):
+                return "limit", FailureRecord(ReasonCode.EXTRACT_TIMEOUT, f"extraction exceeded {self.timeout:g}s")
+            return worker.conn.recv()
+        except (EOFError, OSError):
+            return "limit", self._exit_failure(worker)
+
+    def _exit_failure(self, worker: _Worker) -> FailureRecord:
+        worker.process.join(EXIT_TIMEOUT)
+        if worker.process.exitcode is None:
+            worker.process.kill()
+            worker.process.join()
+            return FailureRecord(ReasonCode.EXTRACT_PARSE_ERROR, "extraction worker closed its pipe but did not exit")
+        exitcode = worker.process.exitcode
+        if exitcode == -signal.SIGKILL:
+            return FailureRecord(ReasonCode.EXTRACT_RESOURCE_LIMIT, "extraction worker was killed")
+        return FailureRecord(ReasonCode.EXTRACT_PARSE_ERROR, f"extraction worker exited with code {exitcode}")
+
+    def _release(self, worker: _Worker, failed: bool) -> None:
+        """Return a worker to the idle queue, replacing it if it failed or is used up."""
+        if self._closed:
+            self._retire(worker, kill=True)
+            return
+        if failed or worker.jobs >= self.max_jobs:
+            self._retire(worker, kill=failed)
+            try:
+                worker = self._spawn()
+            except Exception as exc:
+                # A pool one worker short could leave callers waiting forever. The job's
+                # result is still returned; later calls see the closed sandbox.
+                self._spawn_error = exc
+                self.close()
+                return
+        self._idle.put(worker)
+
+    def wrap(self, registry: ExtractorRegistry | None = None) -> ExtractorRegistry:
+        """A registry with the same extractors as `registry` (default: a new default one), run here."""
+        extractors = (registry or default_registry()).extractors
+        return ExtractorRegistry(extractors=[SandboxedExtractor(self, extractor) for extractor in extractors])
+
+    def close(self) -> None:
+        """Stop all workers; jobs still running are killed and callers waiting for a worker get RuntimeError."""
+        self._closed = True
+        self._finalizer()
+        self._idle.put(None)
+
+    def __enter__(self) -> ExtractorSandbox:
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def __reduce__(self):
+        raise TypeError("ExtractorSandbox cannot be pickled; create one per process")
+
+    def _spawn(self) -> _Worker:
+        worker = _Worker(self._context, self.memory_limit)
+        with self._lock:
+            self._live.add(worker)
+        return worker
+
+    def _retire(self, worker: _Worker, kill: bool = False) -> int | None:
+        with self._lock:
+            self._live.discard(worker)
+        return worker.stop(kill)
+
+
+class SandboxedExtractor:
+    """An extractor whose `extract_text` runs in an `ExtractorSandbox`.
+
+    Name, version, options and capabilities are those of the wrapped
+    extractor, so results share its derivation cache entries. A wrapped
+    `ExtractorSpec` is only loaded here when its version or options are
+    read; extraction loads it in the worker.
+    """
+
+    def __init__(self, sandbox: ExtractorSandbox, extractor: Extractor | ExtractorSpec) -> None:
+        self.sandbox = sandbox
+        self.extractor = extractor
+        self.name = extractor.name
+        self.capabilities = getattr(extractor, "capabilities", None)
+
+    def _loaded(self) -> Extractor:
+        extractor = self.extractor
+        return extractor.load() if isinstance(extractor, ExtractorSpec) else extractor
+
+    @property
+    def version(self) -> str:
+        return str(getattr(self._loaded(), "version", "0"))
+
+    @property
+    def options(self) -> dict[str, str]:
+        return dict(getattr(self._loaded(), "options", None) or {})
+
+    @property
+    def expand_workers(self) -> int:
+        # Nested extractions go through the sandbox, which stays in this process.
+        return 1
+
+    def supports(self, media_type: str, extension: str, magic_bytes: bytes) -> int:
+        return self.extractor.supports(media_type, extension, magic_bytes)
+
+    def extract_text(
+        self, artifact: ArtifactRecord, storage: LocalStorage, magic_bytes: bytes, budget: ExtractBudget | None = None
+    ) -> list[ExtractedContent] | FailureRecord:
+        return self.sandbox.run(self.extractor, artifact, storage, magic_bytes, budget)
+
+
+class _Worker:
+    def __init__(self, context, memory_limit: int | None) -> None:
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child, memory_limit), name="dbl-artifacts-sandbox")
+        self.process.start()
+        child.close()
+        self.jobs = 0
+
+    def stop(self, kill: bool = False) -> int | None:
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except OSError:
+                self.process.kill()
+        self.process.join()
+        self.conn.close()
+        return self.process.exitcode
+
+
+def _stop_all(workers: set[_Worker]) -> None:
+    for worker in list(workers):
+        worker.stop(kill=True)
+    workers.clear()
+
+
+def _serve(conn, memory_limit: int | None) -> None:
+    """Worker loop: one reply per job, then exit if the memory limit was hit.
+
+    A job with streamed outputs is answered with "stream", then a "chunk"
+    message per chunk and an "end" message per streamed output.
+    """
+    if memory_limit is not None:
+        import resource
+
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        extractor, artifact, storage, magic_bytes, budget = job
+        try:
+            if isinstance(extractor, ExtractorSpec):
+                extractor = extractor.load()
+            result = run_extractor(extractor, artifact, storage, magic_bytes, budget)
+            if isinstance(result, list) and any(item.chunks is not None for item in result):
+                conn.send(("stream", [item if item.chunks is None else replace(item, chunks=()) for item in result]))
+                for item in result:
+                    if item.chunks is not None:
+                        for chunk in item.chunks:
+                            if chunk:
+                                conn.send(("chunk", bytes(chunk)))
+                        # Metadata may be completed while the chunks are read.
+                        conn.send(("end", item.metadata))
+                continue
+            reply = ("ok", result)
+        except MemoryError:
+            reply = ("limit", FailureRecord(ReasonCode.EXTRACT_RESOURCE_LIMIT, f"memory limit of {memory_limit} bytes exceeded"))
+        except ArtifactError as exc:
+            # ArtifactError does not survive pickling; it is rebuilt by the caller.
+            reply = ("raise", (exc.reason_code, exc.detail))
+        except Exception as exc:
+            reply = ("ok", FailureRecord(ReasonCode.EXTRACT_PARSE_ERROR, str(exc)))
+        conn.send(reply)
+        if reply[0] == "limit":
+            return
+
+
+class _Lease:
+    """A worker held by a stream until its outputs are read or dropped."""
+
+    def __init__(self, sandbox: ExtractorSandbox, worker: _Worker) -> None:
+        self.sandbox = sandbox
+        self.worker = worker
+        self.done = False
+
+    def release(self, failed: bool) -> None:
+        if not self.done:
+            self.done = True
+            self.sandbox._release(self.worker, failed)
+
+
+class _Stream:
+    """Outputs whose bodies are still coming from a worker, read in list order."""
+
+    def __init__(self, lease: _Lease, deadline: float | None, items: list[ExtractedContent]) -> None:
+        self.lease = lease
+        self.deadline = deadline
+        self.pending = [index for index, item in enumerate(items) if item.chunks is not None]
+
+    def items(self, items: list[ExtractedContent]) -> list[ExtractedContent]:
+        # Bodies hold the stream, not the other way round, so dropping them frees the worker at once.
+        return [
+            item if item.chunks is None else replace(item, chunks=_Body(self, index, item.metadata))
+            for index, item in enumerate(items)
+        ]
+
+    def chunks(self, index: int, metadata: dict[str, str] | None) -> Iterator[bytes]:
+        lease = self.lease
+        if lease.done or self.pending[0] != index:
+            lease.release(failed=True)
+            raise ExtractionFailed(FailureRecord(ReasonCode.EXTRACT_PARSE_ERROR, "sandboxed outputs must be read in order"))
+        finished = False
+        try:
+            while True:
+                status, value = lease.sandbox._receive(lease.worker, self.deadline)
+                if status == "chunk":
+                    yield value
+                elif status == "end":
+                    if metadata is not None and value:
+                        metadata.update(value)
+                    finished = True
+                    return
+                elif status == "raise":
+                    raise ArtifactError(*value)
+                else:
+                    raise ExtractionFailed(value)
+        finally:
+            if finished:
+                self.pending.pop(0)
+                if not self.pending:
+                    lease.release(failed=False)
+            else:
+                lease.release(failed=True)
+
+
+class _Body:
+    """One streamed output's chunks.
+
+    A body dropped before it is read to the end leaves the worker still
+    sending, so the worker is replaced rather than reused.
+    """
+
+    def __init__(self, stream: _Stream, index: int, metadata: dict[str, str] | None) -> None:
+        self._chunks = stream.chunks(index, metadata)
+        self._dropped = weakref.finalize(self, stream.lease.release, True)
+
+    def __iter__(self) -> _Body:
+        return self
+
+    def __next__(self) -> bytes:
+        try:
+            return next(self._chunks)
+        except StopIteration:
+            self._dropped.detach()
+            raise
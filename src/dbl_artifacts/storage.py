@@ -2,43 +2,507 @@
 from __future__ import annotations
 
 import hashlib
-from dataclasses import dataclass
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from io import BytesIO
 from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator
 
+from .compression import (
+    MIN_COMPRESS_SIZE,
+    Codec,
+    compress_blob,
+    decompress_blob,
+    encode_header,
+    get_codec,
+    is_precompressed,
+    open_decompressed,
+)
 from .errors import ArtifactError, ReasonCode
+from .packfile import PACK_DIRNAME, PackEntry, PackStore
+from .trace import STAGE_HASH, get_tracer, record
+
+CHUNK_SIZE = 1024 * 1024
+TEMP_DIRNAME = ".tmp"
+TEMP_PREFIX = "blob-"
+# Temp files older than this are left over from crashed writers.
+TEMP_MAX_AGE = 3600.0
+COMPRESSED_SUFFIX = ".dblz"
+FSYNC_MODES = ("never", "always", "batch")
+
+
+@dataclass(frozen=True)
+class StoredBlob:
+    path: Path
+    sha256_bytes: str
+    byte_size: int
+
+
+class _WriteState:
+    """Per-instance write bookkeeping; not shared with pickled copies."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.prepared = False
+        self.files: set[Path] = set()
+        self.dirs: set[Path] = set()
+
+    def __getstate__(self) -> dict:
+        return {}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__()
 
 
 @dataclass(frozen=True)
 class LocalStorage:
+    """Content-addressed blob store under `root`.
+
+    Blobs live at `root/ab/cd/<sha256>`. With `pack_threshold > 0`, blobs
+    smaller than the threshold are appended to segment files under
+    `root/packs` instead. With `compression` set to a codec name, blobs that
+    are not already compressed are stored compressed, with a header naming
+    the codec, at `<sha256>.dblz`. The content address is always the SHA-256
+    of the uncompressed bytes, storage URIs keep the `root/ab/cd/<sha256>`
+    form, and every read method resolves packed and compressed blobs
+    transparently.
+
+    Blobs are written to a temp file under `root/.tmp` and renamed into
+    place, so concurrent writers of the same content (threads or processes)
+    never expose a partial blob. `fsync` sets durability: `"never"` leaves
+    flushing to the OS, `"always"` syncs each blob and its directory before
+    the write returns, and `"batch"` syncs everything written since the last
+    sync once `fsync_batch` blobs are pending or `sync()` is called. Temp
+    files older than `temp_max_age` seconds are removed on the first write.
+    """
+
     root: Path
+    pack_threshold: int = 0
+    compression: str | None = None
+    fsync: str = "never"
+    fsync_batch: int = 256
+    temp_max_age: float = TEMP_MAX_AGE
+    _state: _WriteState = field(default_factory=_WriteState, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        if self.fsync not in FSYNC_MODES:
+            raise ValueError(f"unknown fsync mode: {self.fsync}")
 
     def ensure(self) -> None:
         self.root.mkdir(parents=True, exist_ok=True)
 
+    def _temp_dir(self) -> Path:
+        """Create the temp directory, clearing stale temp files the first time."""
+        temp_dir = self.root / TEMP_DIRNAME
+        if not self._state.prepared:
+            temp_dir.mkdir(parents=True, exist_ok=True)
+            self.cleanup_temp()
+            self._state.prepared = True
+        return temp_dir
+
+    def cleanup_temp(self, max_age: float | None = None) -> int:
+        """Remove temp files older than `max_age` seconds; returns how many.
+
+        Writers in other processes may be using younger temp files, so only
+        files past the age limit (default `temp_max_age`) are removed.
+        """
+        cutoff = time.time() - (self.temp_max_age if max_age is None else max_age)
+        removed = 0
+        try:
+            entries = list(os.scandir(self.root / TEMP_DIRNAME))
+        except FileNotFoundError:
+            return 0
+        for entry in entries:
+            try:
+                if entry.name.startswith(TEMP_PREFIX) and entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def _write_atomic(self, target: Path, data: bytes) -> None:
+        try:
+            fd, name = tempfile.mkstemp(dir=self._temp_dir(), prefix=TEMP_PREFIX)
+        except OSError as exc:
+            raise ArtifactError(ReasonCode.STORAGE_WRITE_ERROR, str(exc)) from exc
+        temp_path = Path(name)
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(data)
+                if self.fsync == "always":
+                    handle.flush()
+                    os.fsync(handle.fileno())
+            self._install(temp_path, target)
+        except OSError as exc:
+            temp_path.unlink(missing_ok=True)
+            raise ArtifactError(ReasonCode.STORAGE_WRITE_ERROR, str(exc)) from exc
+
+    def _install(self, temp_path: Path, target: Path) -> None:
+        """Rename a complete temp file into place and apply the fsync policy.
+
+        Writers of the same content race harmlessly: each rename replaces
+        the blob with identical bytes.
+        """
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(temp_path, target)
+        if self.fsync == "always":
+            _fsync_dir(target.parent)
+        elif self.fsync == "batch":
+            self._mark_pending(target, target.parent)
+
+    def _append_packed(self, packs: PackStore, digest: str, data: bytes, encoded: bool) -> None:
+        segment = packs.append(digest, data, encoded=encoded, fsync=self.fsync == "always")
+        if segment is not None and self.fsync == "batch":
+            self._mark_pending(segment)
+
+    def _mark_pending(self, path: Path, directory: Path | None = None) -> None:
+        state = self._state
+        with state.lock:
+            state.files.add(path)
+            if directory is not None:
+                state.dirs.add(directory)
+            full = len(state.files) >= self.fsync_batch
+        if full:
+            self.sync()
+
+    def sync(self) -> None:
+        """Flush blobs written since the last sync (and their directories) to disk."""
+        state = self._state
+        with state.lock:
+            files, state.files = state.files, set()
+            dirs, state.dirs = state.dirs, set()
+        try:
+            for path in files:
+                _fsync_file(path)
+            for path in dirs:
+                _fsync_dir(path)
+        except OSError as exc:
+            raise ArtifactError(ReasonCode.STORAGE_WRITE_ERROR, str(exc)) from exc
+
+    @property
+    def packs(self) -> PackStore | None:
+        return PackStore(self.root / PACK_DIRNAME) if self.pack_threshold > 0 else None
+
+    @property
+    def codec(self) -> Codec | None:
+        return get_codec(self.compression) if self.compression else None
+
+    def _packable(self, size: int) -> PackStore | None:
+        return self.packs if size < self.pack_threshold else None
+
     def _path_for_hash(self, sha256_hex: str) -> Path:
         prefix_a = sha256_hex[:2]
         prefix_b = sha256_hex[2:4]
         return self.root / prefix_a / prefix_b / sha256_hex
 
+    def _compressed_path(self, path: Path) -> Path:
+        return path.with_name(path.name + COMPRESSED_SUFFIX)
+
     def store_bytes(self, content: bytes) -> Path:
         self.ensure()
         digest = sha256_bytes(content)
         path = self._path_for_hash(digest)
-        path.parent.mkdir(parents=True, exist_ok=True)
-        if not path.exists():
-            try:
-                path.write_bytes(content)
-            except Exception as exc:
-                raise ArtifactError(ReasonCode.STORAGE_WRITE_ERROR, str(exc)) from exc
+        # Loose or packed, a blob already present is neither compressed nor written again.
+        if self.exists(path):
+            return path
+        codec = self.codec
+        encoded = compress_blob(codec, content) if codec is not None else None
+        packs = self._packable(len(content))
+        if packs is not None:
+            self._append_packed(packs, digest, content if encoded is None else encoded, encoded is not None)
+        elif encoded is None:
+            self._write_atomic(path, content)
+        else:
+            self._write_atomic(self._compressed_path(path), encoded)
         return path
 
+    def writer(self) -> BlobWriter:
+        """Open a writer that hashes while copying into a temp file."""
+        return BlobWriter(self)
+
+    def store_stream(
+        self,
+        stream: BinaryIO,
+        head: bytes = b"",
+        chunk_size: int = CHUNK_SIZE,
+        cancel: threading.Event | None = None,
+    ) -> StoredBlob:
+        """Store a binary stream in bounded memory.
+
+        `head` holds bytes already consumed from `stream` (e.g. for type
+        detection); they are written before the remainder of the stream.
+        Setting `cancel` stops the copy between chunks and discards the
+        temp file, so nothing is left behind in the store.
+        """
+        with self.writer() as writer:
+            if head:
+                writer.write(head)
+            while True:
+                if cancel is not None and cancel.is_set():
+                    raise InterruptedError("store cancelled")
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                writer.write(chunk)
+            return writer.commit()
+
+    def store_chunks(self, chunks: Iterable[bytes]) -> StoredBlob:
+        """Store an iterable of byte chunks, hashing as they are written."""
+        with self.writer() as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+            return writer.commit()
+
+    def _locate(self, path: Path) -> Path | PackEntry:
+        """Resolve a storage URI to a loose file or a pack entry.
+
+        Loose compressed blobs resolve to their `.dblz` path.
+        """
+        if path.exists():
+            return path
+        compressed = self._compressed_path(path)
+        if compressed.exists():
+            return compressed
+        packs = self.packs
+        entry = packs.lookup(path.name) if packs is not None else None
+        if entry is None:
+            raise FileNotFoundError(f"blob not found: {path}")
+        return entry
+
+    def exists(self, path: Path) -> bool:
+        try:
+            self._locate(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def local_path(self, path: Path) -> Path | None:
+        """Return a filesystem path holding exactly the blob's bytes, if any."""
+        return path if path.exists() else None
+
     def read_bytes(self, path: Path) -> bytes:
+        location = self._locate(path)
+        if isinstance(location, PackEntry):
+            payload = self.packs.read(path.name)
+            return decompress_blob(payload) if location.encoded else payload
+        if location != path:
+            return decompress_blob(location.read_bytes())
         return path.read_bytes()
 
     def read_head(self, path: Path, limit: int = 512) -> bytes:
-        with path.open("rb") as handle:
+        location = self._locate(path)
+        if isinstance(location, PackEntry) and not location.encoded:
+            return self.packs.read(path.name, limit)
+        with self.open_stream(path) as handle:
             return handle.read(limit)
 
+    def open_stream(self, path: Path) -> BinaryIO:
+        """Open a stored blob as a binary stream.
+
+        Raw loose and packed blobs are seekable; compressed blobs are
+        decompressed as they are read.
+        """
+        location = self._locate(path)
+        if isinstance(location, PackEntry):
+            payload = BytesIO(self.packs.read(path.name))
+            return open_decompressed(payload) if location.encoded else payload
+        if location != path:
+            return open_decompressed(location.open("rb"))
+        return path.open("rb")
+
+    @contextmanager
+    def view(self, path: Path) -> Iterator[memoryview]:
+        """Map a stored blob read-only and yield a zero-copy memoryview.
+
+        Compressed blobs are decompressed into memory first. The view is
+        released on exit; callers must not keep references to it (or slices
+        of it) past the `with` block.
+        """
+        location = self._locate(path)
+        if isinstance(location, PackEntry) and not location.encoded:
+            with self.packs.view(path.name) as view:
+                yield view
+            return
+        if location != path:
+            yield memoryview(self.read_bytes(path))
+            return
+        with path.open("rb") as handle:
+            if os.fstat(handle.fileno()).st_size == 0:
+                yield memoryview(b"")
+                return
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            view = memoryview(mapped)
+            try:
+                yield view
+            finally:
+                view.release()
+                try:
+                    mapped.close()
+                except BufferError:
+                    # A slice is still exported; the map closes when it is collected.
+                    pass
+
+
+class BlobWriter:
+    """Incremental blob writer.
+
+    Content is hashed while it is copied into a temp file inside the storage
+    root; `commit` renames it atomically into its content-addressed location.
+    When the store compresses, the first bytes decide whether the content is
+    already compressed (or too small to bother); otherwise it is compressed
+    on the fly, and stored raw after all if that did not make it smaller.
+    """
+
+    def __init__(self, storage: LocalStorage) -> None:
+        self._storage = storage
+        self._hash = hashlib.sha256()
+        self._size = 0
+        # Hashing time is only measured while a tracer is active.
+        self._hash_time = 0.0 if get_tracer() is not None else None
+        self._codec = storage.codec
+        self._compressor = None
+        self._pending = b"" if self._codec is not None else None
+        try:
+            fd, name = tempfile.mkstemp(dir=storage._temp_dir(), prefix=TEMP_PREFIX)
+        except OSError as exc:
+            raise ArtifactError(ReasonCode.STORAGE_WRITE_ERROR, str(exc)) from exc
+        self._temp_path = Path(name)
+        self._handle: BinaryIO | None = os.fdopen(fd, "wb")
+
+    def write(self, chunk: bytes) -> None:
+        if self._handle is None:
+            raise ValueError("writer is closed")
+        if self._hash_time is None:
+            self._hash.update(chunk)
+        else:
+            started = time.perf_counter()
+            self._hash.update(chunk)
+            self._hash_time += time.perf_counter() - started
+        self._size += len(chunk)
+        if self._pending is not None:
+            self._pending += chunk
+            if len(self._pending) < MIN_COMPRESS_SIZE:
+                return
+            chunk = self._start_encoding()
+        self._emit(chunk)
+
+    def _start_encoding(self) -> bytes:
+        pending, self._pending = self._pending, None
+        if not is_precompressed(pending):
+            self._compressor = self._codec.compressor()
+            self._emit_raw(encode_header(self._codec))
+        return pending
+
+    def _emit(self, chunk: bytes) -> None:
+        if self._compressor is not None:
+            chunk = self._compressor.compress(chunk)
+        self._emit_raw(chunk)
+
+    def _emit_raw(self, chunk: bytes) -> None:
+        try:
+            self._handle.write(chunk)
+        except OSError as exc:
+            raise ArtifactError(ReasonCode.STORAGE_WRITE_ERROR, str(exc)) from exc
+
+    def commit(self) -> StoredBlob:
+        if self._handle is None:
+            raise ValueError("writer is closed")
+        if self._pending is not None:
+            # Too small to be worth compressing.
+            self._emit_raw(self._pending)
+            self._pending = None
+        if self._compressor is not None:
+            self._emit_raw(self._compressor.flush())
+            if self._handle.tell() >= self._size:
+                self._decode()
+        if self._storage.fsync == "always":
+            try:
+                self._handle.flush()
+                os.fsync(self._handle.fileno())
+            except OSError as exc:
+                self.abort()
+                raise ArtifactError(ReasonCode.STORAGE_WRITE_ERROR, str(exc)) from exc
+        digest = self._hash.hexdigest()
+        if self._hash_time is not None:
+            record(STAGE_HASH, self._hash_time, byte_size=self._size)
+        path = self._storage._path_for_hash(digest)
+        encoded = self._compressor is not None
+        try:
+            self._handle.close()
+            self._handle = None
+            packs = self._storage._packable(self._size)
+            if self._storage.exists(path):
+                self._temp_path.unlink()
+            elif packs is not None:
+                self._storage._append_packed(packs, digest, self._temp_path.read_bytes(), encoded)
+                self._temp_path.unlink()
+            else:
+                target = self._storage._compressed_path(path) if encoded else path
+                self._storage._install(self._temp_path, target)
+        except OSError as exc:
+            self.abort()
+            raise ArtifactError(ReasonCode.STORAGE_WRITE_ERROR, str(exc)) from exc
+        return StoredBlob(path=path, sha256_bytes=digest, byte_size=self._size)
+
+    def _decode(self) -> None:
+        """Replace the temp file with the raw content; compressing it did not make it smaller."""
+        encoded_path = self._temp_path
+        self._handle.close()
+        try:
+            fd, name = tempfile.mkstemp(dir=self._storage._temp_dir(), prefix=TEMP_PREFIX)
+            self._temp_path = Path(name)
+            self._handle = os.fdopen(fd, "wb")
+            with open_decompressed(encoded_path.open("rb")) as source:
+                shutil.copyfileobj(source, self._handle, CHUNK_SIZE)
+            encoded_path.unlink()
+        except OSError as exc:
+            encoded_path.unlink(missing_ok=True)
+            self.abort()
+            raise ArtifactError(ReasonCode.STORAGE_WRITE_ERROR, str(exc)) from exc
+        self._compressor = None
+
+    def abort(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+        self._temp_path.unlink(missing_ok=True)
+
+    def __enter__(self) -> BlobWriter:
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self._handle is not None:
+            self.abort()
+
+
+def _fsync_file(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_dir(path: Path) -> None:
+    """Persist a rename; not every platform can open or sync directories."""
+    try:
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
 
 def sha256_bytes(data: bytes) -> str:
     return hashlib.sha256(data).hexdigest()
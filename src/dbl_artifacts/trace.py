@@ -0,0 +1,195 @@
+"""Per-stage timing and tracing hooks."""
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Callable, Iterator, Mapping
+
+STAGE_READ = "read"
+STAGE_DETECT = "detect"
+STAGE_SELECT = "select"
+STAGE_PARSE = "parse"
+STAGE_ENCODE = "encode"
+STAGE_HASH = "hash"
+STAGE_STORE = "store"
+
+
+@dataclass(frozen=True)
+class SpanEvent:
+    """A finished stage. `duration` is in seconds and includes nested spans."""
+
+    stage: str
+    duration: float
+    tags: Mapping[str, Any]
+    error: str | None = None
+
+
+Tracer = Callable[[SpanEvent], None]
+
+_tracer: ContextVar[Tracer | None] = ContextVar("dbl_artifacts_tracer", default=None)
+_tags: ContextVar[Mapping[str, Any]] = ContextVar("dbl_artifacts_trace_tags", default=MappingProxyType({}))
+
+
+def get_tracer() -> Tracer | None:
+    return _tracer.get()
+
+
+@contextmanager
+def tracing(tracer: Tracer) -> Iterator[Tracer]:
+    """Send span events raised in this context (thread / task) to `tracer`.
+
+    Context variables do not cross process boundaries, so work done in
+    `import_many` / `extract_many` worker processes is not traced.
+    """
+    token = _tracer.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _tracer.reset(token)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> _NoopSpan:
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+    def tag(self, **tags: Any) -> None:
+        return None
+
+    def exclude(self, seconds: float) -> None:
+        return None
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("_tracer", "_stage", "_tags", "_start", "_token", "_excluded")
+
+    def __init__(self, tracer: Tracer, stage: str, tags: dict[str, Any]) -> None:
+        self._tracer = tracer
+        self._stage = stage
+        self._tags = {**_tags.get(), **tags}
+        self._excluded = 0.0
+
+    def tag(self, **tags: Any) -> None:
+        """Add tags known only once the stage has run (e.g. byte size)."""
+        self._tags.update(tags)
+
+    def exclude(self, seconds: float) -> None:
+        """Leave time spent on another stage inside this span out of its duration."""
+        self._excluded += seconds
+
+    def __enter__(self) -> _Span:
+        self._token = _tags.set(MappingProxyType(dict(self._tags)))
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        duration = time.perf_counter() - self._start - self._excluded
+        _tags.reset(self._token)
+        error = exc_type.__name__ if exc_type is not None else None
+        self._tracer(SpanEvent(self._stage, duration, MappingProxyType(self._tags), error))
+
+
+def span(stage: str, **tags: Any) -> _Span | _NoopSpan:
+    """Time a stage. Nested spans inherit the tags of enclosing ones.
+
+    Without an active tracer this returns a shared no-op span.
+    """
+    tracer = _tracer.get()
+    if tracer is None:
+        return _NOOP
+    return _Span(tracer, stage, tags)
+
+
+def record(stage: str, duration: float, **tags: Any) -> None:
+    """Emit an event for a stage timed by the caller."""
+    tracer = _tracer.get()
+    if tracer is not None:
+        tracer(SpanEvent(stage, duration, MappingProxyType({**_tags.get(), **tags})))
+
+
+# Histogram bucket upper bounds: 1µs doubling up to ~36 minutes.
+BUCKET_BOUNDS = tuple(1e-6 * 2**i for i in range(32))
+
+
+@dataclass
+class Histogram:
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    bytes: int = 0
+    buckets: list[int] | None = None
+
+    def add(self, duration: float, byte_size: int = 0) -> None:
+        if self.buckets is None:
+            self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS, duration)] += 1
+        self.count += 1
+        self.total += duration
+        self.bytes += byte_size
+        self.max = max(self.max, duration)
+
+    def quantile(self, fraction: float) -> float:
+        """Upper bound of the bucket holding the `fraction` quantile."""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, hits in enumerate(self.buckets):
+            seen += hits
+            if seen >= rank and hits:
+                return min(BUCKET_BOUNDS[index], self.max) if index < len(BUCKET_BOUNDS) else self.max
+        return self.max
+
+
+class StageTimings:
+    """Tracer that aggregates span events into per-stage histograms.
+
+    Events are grouped by stage plus the values of the `by` tags, e.g.
+    `StageTimings(by=("extractor",))` keeps parse time per extractor.
+    """
+
+    def __init__(self, by: tuple[str, ...] = ()) -> None:
+        self.by = by
+        self._lock = threading.Lock()
+        self._histograms: dict[tuple, Histogram] = {}
+        self.errors = 0
+
+    def __call__(self, event: SpanEvent) -> None:
+        key = (event.stage, *(event.tags.get(name) for name in self.by))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.add(event.duration, int(event.tags.get("byte_size") or 0))
+            if event.error is not None:
+                self.errors += 1
+
+    def histograms(self) -> dict[tuple, Histogram]:
+        with self._lock:
+            return dict(self._histograms)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Return count, total, p50, p99 and max seconds per key."""
+        out = {}
+        for key, histogram in sorted(self.histograms().items(), key=lambda item: tuple(map(str, item[0]))):
+            out["/".join(str(part) for part in key)] = {
+                "count": histogram.count,
+                "total": histogram.total,
+                "bytes": histogram.bytes,
+                "p50": histogram.quantile(0.5),
+                "p99": histogram.quantile(0.99),
+                "max": histogram.max,
+            }
+        return out
@@ -0,0 +1,55 @@
+import asyncio
+import threading
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+
+from dbl_artifacts import AsyncPipeline, LocalStorage
+
+
+class SlowStream(BytesIO):
+    def __init__(self, data: bytes) -> None:
+        super().__init__(data)
+        self.started = threading.Event()
+
+    def read(self, size: int = -1) -> bytes:
+        self.started.set()
+        threading.Event().wait(0.01)
+        return super().read(min(size, 16) if size and size > 0 else 16)
+
+
+def test_async_import_and_extract(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store")
+
+    async def run():
+        async with AsyncPipeline(storage, limits={"text": 1}) as pipeline:
+            records = await asyncio.gather(
+                *(pipeline.import_artifact(f"note {i}".encode(), f"note{i}.txt") for i in range(4))
+            )
+            return await asyncio.gather(*(pipeline.extract_text(record) for record in records))
+
+    results = asyncio.run(run())
+
+    texts = [Path(r.derived_artifacts[0].storage_uri).read_text(encoding="utf-8") for r in results]
+    assert texts == [f"note {i}" for i in range(4)]
+
+
+def test_cancelled_import_leaves_no_blobs(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store")
+    stream = SlowStream(b"x" * 100_000)
+
+    async def run():
+        async with AsyncPipeline(storage) as pipeline:
+            task = asyncio.create_task(pipeline.import_artifact(stream, "big.txt"))
+            while not stream.started.is_set():
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+    asyncio.run(run())
+
+    files = [p for p in storage.root.rglob("*") if p.is_file()]
+    assert files == []
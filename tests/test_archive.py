@@ -0,0 +1,132 @@
+import gc
+import warnings
+import zipfile
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+
+from dbl_artifacts import LocalStorage, ReasonCode, extract_text, import_artifact
+from dbl_artifacts.detect import DOCX_MIME, ZIP_MIME, detect_media_type
+from dbl_artifacts.extractors.archive import ArchiveExtractor
+from dbl_artifacts.extractors.base import Reroute
+from dbl_artifacts.registry import ExtractorRegistry, default_registry
+
+
+def _zip(members: dict[str, bytes]) -> bytes:
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def _docx(text: str) -> bytes:
+    try:
+        from docx import Document  # type: ignore
+    except Exception:
+        pytest.skip("python-docx not installed")
+    document = Document()
+    document.add_paragraph(text)
+    buffer = BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def _registry(**options) -> ExtractorRegistry:
+    extractors = [e for e in default_registry().extractors if e.name != "archive"]
+    return ExtractorRegistry(extractors=extractors + [ArchiveExtractor(**options)])
+
+
+def _texts(result, storage: LocalStorage) -> dict[str, bytes]:
+    return {
+        record.original_filename: storage.read_bytes(Path(record.storage_uri))
+        for record in result.derived_artifacts
+        if record.original_filename.endswith(".extracted.txt")
+    }
+
+
+def test_zip_members_are_stored_and_extracted(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store")
+    inner = _zip({"deep.txt": b"deep text"})
+    data = _zip({"docs/a.txt": b"alpha", "docs/b.docx": _docx("bravo"), "inner.zip": inner, "same.txt": b"alpha"})
+    assert detect_media_type("bundle.bin", None, data[:512]) == ZIP_MIME
+    assert detect_media_type("doc.bin", None, _docx("x")[:512]) == DOCX_MIME
+
+    artifact = import_artifact(data, "bundle.zip", storage=storage)
+    result = extract_text(artifact, storage=storage)
+
+    assert result.failure is None
+    texts = _texts(result, storage)
+    assert texts["bundle.zip.extracted.txt"] == b"docs/a.txt\ndocs/b.docx\ninner.zip\nsame.txt\n"
+    assert texts["docs/a.txt.extracted.txt"] == b"alpha"
+    assert texts["docs/b.docx.extracted.txt"] == b"bravo"
+    assert texts["deep.txt.extracted.txt"] == b"deep text"
+    # same.txt has the content of docs/a.txt: stored as a member, extracted once.
+    assert "same.txt.extracted.txt" not in texts
+    member = next(r for r in result.derived_artifacts if r.original_filename == "inner.zip")
+    assert member.metadata["parent_artifact_id"] == artifact.artifact_id
+    assert member.metadata["member_name"] == "inner.zip"
+
+    parallel = extract_text(artifact, storage=storage, registry=_registry(workers=2))
+    assert parallel == result
+
+
+def test_docx_named_zip_and_zip_bombs(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store")
+    disguised = import_artifact(_docx("hidden docx"), "really.zip", storage=storage)
+    result = extract_text(disguised, storage=storage)
+    assert _texts(result, storage) == {"really.zip.extracted.txt": b"hidden docx"}
+
+    bomb = import_artifact(_zip({"zeros.bin": bytes(8 * 1024 * 1024)}), "bomb.zip", storage=storage)
+    result = extract_text(bomb, storage=storage)
+    assert result.failure.reason_code == ReasonCode.EXTRACT_RESOURCE_LIMIT
+
+    many = import_artifact(_zip({f"{n}.txt": b"x" for n in range(5)}), "many.zip", storage=storage)
+    result = extract_text(many, storage=storage, registry=_registry(max_members=4))
+    assert result.failure.reason_code == ReasonCode.EXTRACT_RESOURCE_LIMIT
+
+
+def test_many_small_highly_compressed_members_are_refused(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store")
+    # Each member is far below the per-member ratio threshold; together they expand about 300x.
+    data = _zip({f"{n}.txt": bytes(4096) for n in range(1000)})
+    assert all(info.file_size > 100 * info.compress_size for info in zipfile.ZipFile(BytesIO(data)).infolist())
+
+    result = extract_text(import_artifact(data, "small-bombs.zip", storage=storage), storage=storage)
+
+    assert result.failure.reason_code == ReasonCode.EXTRACT_RESOURCE_LIMIT
+    assert "together" in result.failure.detail
+
+
+def test_zips_that_only_resemble_docx_go_to_the_archive_extractor(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store")
+    vault = _zip({"password/notes.txt": b"not a word document", "word/readme.txt": b"hi"})
+    xlsx = _zip({"[Content_Types].xml": b"<Types/>", "_rels/.rels": b"<Relationships/>", "xl/workbook.xml": b"<w/>"})
+    assert detect_media_type("vault.bin", None, vault[:512]) == ZIP_MIME
+    assert detect_media_type("book.xlsx", None, xlsx[:512]) == ZIP_MIME
+    assert detect_media_type("doc.zip", None, _docx("x")[:512]) == ZIP_MIME
+
+    bundle = extract_text(import_artifact(vault, "bundle.zip", storage=storage), storage=storage)
+    # Declared as DOCX, but without word/document.xml: handed to the archive extractor.
+    declared = import_artifact(xlsx, "book.xlsx", media_type=DOCX_MIME, storage=storage)
+    book = extract_text(declared, storage=storage)
+
+    assert _texts(bundle, storage)["bundle.zip.extracted.txt"] == b"password/notes.txt\nword/readme.txt\n"
+    assert _texts(book, storage)["book.xlsx.extracted.txt"] == b"[Content_Types].xml\n_rels/.rels\nxl/workbook.xml\n"
+
+
+def test_docx_is_rerouted_and_unread_members_release_the_archive(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store")
+    docx = import_artifact(_docx("hidden docx"), "really.zip", storage=storage)
+    bundle = import_artifact(_zip({"a.txt": b"alpha", "b.txt": b"beta"}), "bundle.zip", storage=storage)
+
+    assert ArchiveExtractor().extract_text(docx, storage, b"") == Reroute(DOCX_MIME, "archive is a DOCX package")
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", ResourceWarning)
+        outputs = ArchiveExtractor().extract_text(bundle, storage, b"")
+        assert next(iter(outputs[1].chunks)) == b"alpha"
+        del outputs
+        gc.collect()
+
+    assert [warning for warning in caught if issubclass(warning.category, ResourceWarning)] == []
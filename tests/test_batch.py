@@ -0,0 +1,30 @@
+from pathlib import Path
+
+from dbl_artifacts import ArtifactRecord, FailureRecord, LocalStorage, ReasonCode, extract_many, import_many
+
+
+def test_import_and_extract_many(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store")
+    paths = []
+    for i in range(6):
+        path = tmp_path / f"note{i}.txt"
+        path.write_text(f"note {i}", encoding="utf-8")
+        paths.append(path)
+    sources = [*paths, (b"\x00binary", "blob.bin")]
+
+    imported = list(import_many(sources, storage=storage, max_workers=2, max_in_flight=3))
+
+    assert [index for index, _ in imported] == list(range(7))
+    assert all(isinstance(record, ArtifactRecord) for _, record in imported[:6])
+    failure = imported[6][1]
+    assert isinstance(failure, FailureRecord)
+    assert failure.reason_code == ReasonCode.IMPORT_UNSUPPORTED_TYPE
+
+    artifacts = [record for _, record in imported[:6]]
+    derived = dict(extract_many(artifacts, storage=storage, max_workers=2, ordered=False))
+
+    assert sorted(derived) == list(range(6))
+    for index, result in derived.items():
+        assert result.failure is None
+        text = Path(result.derived_artifacts[0].storage_uri).read_text(encoding="utf-8")
+        assert text == f"note {index}"
@@ -0,0 +1,81 @@
+import gc
+import warnings
+import zipfile
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+
+from dbl_artifacts import DerivationCache, ExtractBudget, ExtractorRegistry, LocalStorage, extract_text, import_artifact
+from dbl_artifacts.extractors.html import HtmlExtractor
+from dbl_artifacts.extractors.pdf import PdfExtractor
+
+
+def _text(storage: LocalStorage, result) -> str:
+    assert result.failure is None
+    return storage.read_bytes(Path(result.derived_artifacts[0].storage_uri)).decode("utf-8")
+
+
+def test_budgeted_text_is_truncated_and_cached_apart(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store")
+    cache = DerivationCache(tmp_path / "cache.sqlite")
+    artifact = import_artifact("é".join(["word"] * 100_000).encode("utf-8"), "long.txt", storage=storage)
+
+    preview = extract_text(artifact, storage, cache=cache, budget=ExtractBudget(max_chars=50))
+    head = extract_text(artifact, storage, cache=cache, budget=ExtractBudget(max_bytes_read=7))
+    full = extract_text(artifact, storage, cache=cache)
+    small = import_artifact(b"short", "short.txt", storage=storage)
+    untouched = extract_text(small, storage, budget=ExtractBudget(max_chars=10))
+
+    assert _text(storage, preview) == _text(storage, full)[:50]
+    assert preview.derived_artifacts[0].metadata == {"truncated": "max_chars"}
+    assert _text(storage, head) == "wordéw"
+    assert head.derived_artifacts[0].metadata == {"truncated": "max_bytes_read"}
+    assert _text(storage, full).endswith("é".join(["word"] * 100_000))
+    assert not full.derived_artifacts[0].metadata
+    assert _text(storage, untouched).endswith("short")
+    assert not untouched.derived_artifacts[0].metadata
+    with pytest.raises(ValueError):
+        ExtractBudget(max_chars=-1)
+
+
+def test_pdf_and_html_stop_early(tmp_path: Path) -> None:
+    fitz = pytest.importorskip("fitz")
+    pytest.importorskip("lxml")
+    storage = LocalStorage(tmp_path / "store")
+    doc = fitz.open()
+    for number in range(5):
+        doc.new_page().insert_text((72, 72), f"Page {number}")
+    pdf = import_artifact(doc.tobytes(), "five.pdf", storage=storage)
+    page = b"<html><title>T</title><body>" + b"<p>paragraph</p>" * 100_000 + b"</body></html>"
+    html = import_artifact(page, "page.html", storage=storage)
+    registry = ExtractorRegistry([PdfExtractor(), HtmlExtractor()])
+
+    pages = extract_text(pdf, storage, registry, budget=ExtractBudget(max_pages=2))
+    chars = extract_text(html, storage, registry, budget=ExtractBudget(max_chars=50))
+    read = extract_text(html, storage, registry, budget=ExtractBudget(max_bytes_read=100))
+
+    assert "Page 1" in _text(storage, pages) and "Page 2" not in _text(storage, pages)
+    assert pages.derived_artifacts[0].metadata == {"truncated": "max_pages"}
+    assert _text(storage, chars) == ("Title: T\nSource: page.html\n\n" + "paragraph\n" * 5)[:50]
+    assert chars.derived_artifacts[0].metadata == {"truncated": "max_chars"}
+    assert _text(storage, read).split("\n\n", 1)[1].split("\n") == ["paragraph"] * 4 + ["parag"]
+    assert read.derived_artifacts[0].metadata == {"truncated": "max_bytes_read"}
+
+
+def test_budgeted_archive_lists_members_and_closes_the_archive(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store")
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("a.txt", "alpha")
+        archive.writestr("b.txt", "beta")
+    artifact = import_artifact(buffer.getvalue(), "bundle.zip", storage=storage)
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", ResourceWarning)
+        result = extract_text(artifact, storage, budget=ExtractBudget(max_chars=3))
+        gc.collect()
+
+    assert [item.original_filename for item in result.derived_artifacts] == ["bundle.zip.extracted.txt"]
+    assert _text(storage, result) == "a.t"
+    assert [warning for warning in caught if issubclass(warning.category, ResourceWarning)] == []
@@ -0,0 +1,99 @@
+from pathlib import Path
+
+import pytest
+
+from dbl_artifacts import DerivationCache, LocalStorage, ReasonCode, extract_text, import_artifact
+from dbl_artifacts.extractors.base import Reroute
+from dbl_artifacts.extractors.text import TextExtractor
+from dbl_artifacts.registry import ExtractorRegistry
+
+
+class CountingExtractor(TextExtractor):
+    def __init__(self, version: str = "1") -> None:
+        self.version = version
+        self.calls = 0
+
+    def extract_text(self, artifact, storage, magic_bytes):
+        self.calls += 1
+        return super().extract_text(artifact, storage, magic_bytes)
+
+
+class HandOff:
+    name = "handoff"
+    version = "1"
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def supports(self, media_type: str, extension: str, magic_bytes: bytes) -> int:
+        return 10
+
+    def extract_text(self, artifact, storage, magic_bytes):
+        self.calls += 1
+        return Reroute("text/x-handed", "handed on")
+
+
+class HandedTo(CountingExtractor):
+    name = "handed"
+    capabilities = None
+
+    def supports(self, media_type: str, extension: str, magic_bytes: bytes) -> int:
+        return 20 if media_type == "text/x-handed" else 0
+
+
+def test_cache_hit_skips_source(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store")
+    cache = DerivationCache(tmp_path / "cache.sqlite")
+    extractor = CountingExtractor()
+    registry = ExtractorRegistry(extractors=[extractor])
+    artifact = import_artifact(b"hello\r\ncache", "note.txt", storage=storage)
+
+    first = extract_text(artifact, storage=storage, registry=registry, cache=cache)
+    Path(artifact.storage_uri).unlink()
+    second = extract_text(artifact, storage=storage, registry=registry, cache=cache)
+
+    assert extractor.calls == 1
+    assert second == first
+
+
+def test_cache_invalidated_by_version(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store")
+    cache = DerivationCache(tmp_path / "cache.sqlite")
+    artifact = import_artifact(b"hello cache", "note.txt", storage=storage)
+
+    extract_text(artifact, storage=storage, registry=ExtractorRegistry([CountingExtractor("1")]), cache=cache)
+    upgraded = CountingExtractor("2")
+    extract_text(artifact, storage=storage, registry=ExtractorRegistry([upgraded]), cache=cache)
+
+    assert upgraded.calls == 1
+
+
+def test_rerouted_results_are_keyed_by_their_producer(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store")
+    cache = DerivationCache(tmp_path / "cache.sqlite")
+    artifact = import_artifact(b"handed text", "note.txt", storage=storage)
+    handoff, target = HandOff(), HandedTo("1")
+
+    first = extract_text(artifact, storage=storage, registry=ExtractorRegistry([handoff, target]), cache=cache)
+    again = extract_text(artifact, storage=storage, registry=ExtractorRegistry([handoff, target]), cache=cache)
+    upgraded = HandedTo("2")
+    extract_text(artifact, storage=storage, registry=ExtractorRegistry([handoff, upgraded]), cache=cache)
+
+    assert first.failure is None and again == first
+    assert (handoff.calls, target.calls, upgraded.calls) == (2, 1, 1)
+
+
+def test_cache_stores_failures(tmp_path: Path) -> None:
+    pytest.importorskip("fitz")
+
+    storage = LocalStorage(tmp_path / "store")
+    cache = DerivationCache(tmp_path / "cache.sqlite")
+    artifact = import_artifact(b"%PDF-1.4 not really a pdf", "broken.pdf", storage=storage)
+
+    first = extract_text(artifact, storage=storage, cache=cache)
+    Path(artifact.storage_uri).unlink()
+    second = extract_text(artifact, storage=storage, cache=cache)
+
+    assert first.failure is not None
+    assert first.failure.reason_code == ReasonCode.EXTRACT_PARSE_ERROR
+    assert second == first
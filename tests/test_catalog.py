@@ -0,0 +1,44 @@
+from email.message import EmailMessage
+from pathlib import Path
+
+import pytest
+
+from dbl_artifacts import ArtifactCatalog, ArtifactError, LocalStorage, ReasonCode, extract_text, import_artifact
+from dbl_artifacts.models import JOB_EXTRACT_TEXT, JOB_IMPORT
+
+
+def test_catalog_records_lineage_and_lookups(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store")
+    catalog = ArtifactCatalog(tmp_path / "catalog.sqlite")
+    msg = EmailMessage()
+    msg["Subject"] = "Test"
+    msg.set_content("Plain body")
+    msg.add_attachment(b"att content", maintype="text", subtype="plain", filename="note.txt")
+
+    with catalog.batch():
+        artifact = import_artifact(msg.as_bytes(), "message.eml", storage=storage, catalog=catalog)
+        result = extract_text(artifact, storage=storage, catalog=catalog)
+
+    assert catalog.get(artifact.artifact_id) == [artifact]
+    assert catalog.has_sha256(artifact.sha256_bytes)
+    assert catalog.find_by_media_type("message/rfc822") == [artifact]
+    children = catalog.children(artifact.artifact_id)
+    assert sorted(c.original_filename for c in children) == ["message.eml.extracted.txt", "note.txt"]
+    attachment = catalog.find_by_filename("note.txt")[0]
+    assert attachment in result.derived_artifacts
+    assert catalog.parents(attachment.artifact_id) == [artifact.artifact_id]
+
+
+def test_catalog_records_failures(tmp_path: Path) -> None:
+    pytest.importorskip("fitz")
+
+    storage = LocalStorage(tmp_path / "store")
+    catalog = ArtifactCatalog(tmp_path / "catalog.sqlite")
+
+    with pytest.raises(ArtifactError):
+        import_artifact(b"\x00\x01", "blob.bin", storage=storage, catalog=catalog)
+    broken = import_artifact(b"%PDF-1.4 truncated", "broken.pdf", storage=storage, catalog=catalog)
+    extract_text(broken, storage=storage, catalog=catalog)
+
+    assert catalog.failures("blob.bin")[JOB_IMPORT].reason_code == ReasonCode.IMPORT_UNSUPPORTED_TYPE
+    assert catalog.failures(broken.artifact_id)[JOB_EXTRACT_TEXT].reason_code == ReasonCode.EXTRACT_PARSE_ERROR
@@ -0,0 +1,82 @@
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+
+from dbl_artifacts import LocalStorage, extract_text, import_artifact
+from dbl_artifacts.compression import encode_header, get_codec
+from dbl_artifacts.extractors.docx import DocxExtractor
+from dbl_artifacts.registry import ExtractorRegistry
+
+
+def _document():
+    try:
+        from docx import Document  # type: ignore
+    except Exception:
+        pytest.skip("python-docx not installed")
+    return Document()
+
+
+def _save(document) -> bytes:
+    buffer = BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def _extract(data: bytes, engine: str, tmp_path: Path, compression: str | None = None) -> bytes:
+    storage = LocalStorage(tmp_path / "store", compression=compression)
+    artifact = import_artifact(data, "doc.docx", storage=storage)
+    if compression is not None:
+        # ZIPs are never compressed on import; store this one compressed to force a non-seekable read.
+        blob = Path(artifact.storage_uri)
+        codec = get_codec(compression)
+        compressor = codec.compressor()
+        blob.with_name(blob.name + ".dblz").write_bytes(encode_header(codec) + compressor.compress(data) + compressor.flush())
+        blob.unlink()
+    registry = ExtractorRegistry(extractors=[DocxExtractor(engine=engine)])
+    result = extract_text(artifact, storage=storage, registry=registry)
+    assert result.failure is None
+    return storage.read_bytes(Path(result.derived_artifacts[0].storage_uri))
+
+
+def test_fast_engine_matches_python_docx_on_paragraphs(tmp_path: Path) -> None:
+    document = _document()
+    document.add_paragraph("First paragraph\twith a tab")
+    document.add_paragraph("")
+    run = document.add_paragraph("Line one").add_run()
+    run.add_break()
+    run.add_text("line two")
+    from docx.enum.text import WD_BREAK  # type: ignore
+
+    run.add_break(WD_BREAK.PAGE)
+    run.add_text("after page break")
+    document.add_paragraph("Ünïcode — text & <markup>")
+    data = _save(document)
+
+    assert _extract(data, "fast", tmp_path) == _extract(data, "python-docx", tmp_path)
+
+
+def test_fast_engine_includes_tables_and_headers(tmp_path: Path) -> None:
+    document = _document()
+    document.sections[0].header.paragraphs[0].text = "Header text"
+    document.sections[0].footer.paragraphs[0].text = "Footer text"
+    document.add_paragraph("Before table")
+    table = document.add_table(rows=1, cols=2)
+    table.cell(0, 0).text = "cell A"
+    table.cell(0, 1).text = "cell B"
+    document.add_paragraph("After table")
+
+    text = _extract(_save(document), "fast", tmp_path)
+
+    assert text == b"Before table\ncell A\ncell B\nAfter table\nHeader text\nFooter text"
+
+
+def test_python_docx_engine_reads_compressed_blobs(tmp_path: Path) -> None:
+    document = _document()
+    document.add_paragraph("Stored compressed")
+    data = _save(document)
+
+    text = _extract(data, "python-docx", tmp_path, compression="zlib")
+
+    assert text == _extract(data, "python-docx", tmp_path / "plain")
+    assert text.endswith(b"Stored compressed")
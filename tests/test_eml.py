@@ -0,0 +1,77 @@
+from email.message import EmailMessage
+from pathlib import Path
+
+import pytest
+
+from dbl_artifacts import LocalStorage, extract_text, import_artifact
+from dbl_artifacts.extractors.eml import EmlExtractor, _payload_chunks
+from dbl_artifacts.registry import ExtractorRegistry, default_registry
+
+
+def _message(subject: str, body: str) -> EmailMessage:
+    msg = EmailMessage()
+    msg["Subject"] = subject
+    msg["From"] = "alice@example.com"
+    msg.set_content(body)
+    return msg
+
+
+def test_streamed_payload_matches_decode() -> None:
+    msg = _message("Payloads", "body")
+    binary = bytes(range(256)) * 50
+    msg.add_attachment(binary, maintype="application", subtype="octet-stream", filename="blob.bin")
+    msg.add_attachment("café = " * 400, subtype="plain", cte="quoted-printable", filename="qp.txt")
+    for part in msg.iter_attachments():
+        assert b"".join(_payload_chunks(part, chunk_size=100)) == part.get_payload(decode=True)
+
+
+def test_recursive_mode_expands_attachments(tmp_path: Path) -> None:
+    try:
+        import fitz  # type: ignore
+    except Exception:
+        pytest.skip("pymupdf not installed")
+
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "Text inside the attached PDF")
+    pdf_bytes = doc.tobytes()
+    doc.close()
+
+    inner = _message("Inner", "Inner body")
+    inner.add_attachment(b"shared attachment", maintype="text", subtype="plain", filename="shared.txt")
+    outer = _message("Outer", "Outer body")
+    outer.add_attachment(pdf_bytes, maintype="application", subtype="pdf", filename="report.pdf")
+    outer.add_attachment(b"shared attachment", maintype="text", subtype="plain", filename="shared.txt")
+    outer.add_attachment(inner)
+
+    storage = LocalStorage(tmp_path / "store")
+    artifact = import_artifact(outer.as_bytes(), "outer.eml", storage=storage)
+    flat = extract_text(artifact, storage=storage)
+    assert sorted(a.original_filename for a in flat.derived_artifacts) == [
+        "outer.eml.extracted.txt",
+        "report.pdf",
+        "shared.txt",
+        "shared.txt",
+    ]
+
+    extractors = [e for e in default_registry().extractors if e.name != "eml"] + [EmlExtractor(recursive=True)]
+    result = extract_text(artifact, storage=storage, registry=ExtractorRegistry(extractors=extractors))
+    by_name = {}
+    for record in result.derived_artifacts:
+        by_name.setdefault(record.original_filename, []).append(record)
+
+    pdf = by_name["report.pdf"][0]
+    pdf_text = by_name["report.pdf.extracted.txt"][0]
+    assert pdf_text.metadata["parent_artifact_id"] == pdf.artifact_id
+    assert "attached PDF" in storage.read_bytes(Path(pdf_text.storage_uri)).decode()
+
+    nested = by_name["attachment.eml"][0]
+    assert nested.metadata["depth"] == "1"
+    inner_text = by_name["attachment.eml.extracted.txt"][0]
+    assert b"Inner body" in storage.read_bytes(Path(inner_text.storage_uri))
+    # The inner copy of shared.txt is stored, but identical content is expanded once.
+    assert len(by_name["shared.txt"]) == 2
+    assert len(by_name["shared.txt.extracted.txt"]) == 1
+
+    shallow = [e for e in extractors if e.name != "eml"] + [EmlExtractor(recursive=True, max_depth=0)]
+    result = extract_text(artifact, storage=storage, registry=ExtractorRegistry(extractors=shallow))
+    assert not any(r.original_filename.endswith(".pdf.extracted.txt") for r in result.derived_artifacts)
@@ -0,0 +1,43 @@
+from pathlib import Path
+
+import pytest
+
+from dbl_artifacts import LocalStorage, extract_text, import_artifact
+from dbl_artifacts.extractors.html import HtmlExtractor
+from dbl_artifacts.registry import ExtractorRegistry
+
+PAGE = (
+    b"<html><head><title> Sample  page </title><style>p{}</style><script>var x = 1;</script></head>"
+    b"<body><nav><a href='/'>Home</a></nav><h1>Heading</h1>"
+    b"<p>First <b>bold</b><!-- note --> words</p>tail text"
+    b"<table><tr><td>a</td><td>b</td></tr></table></body></html>"
+)
+
+
+def _extract(data: bytes, extractor: HtmlExtractor, tmp_path: Path) -> str:
+    storage = LocalStorage(tmp_path / "store")
+    artifact = import_artifact(data, "page.html", storage=storage)
+    result = extract_text(artifact, storage=storage, registry=ExtractorRegistry(extractors=[extractor]))
+    assert result.failure is None
+    return storage.read_bytes(Path(result.derived_artifacts[0].storage_uri)).decode("utf-8")
+
+
+def test_fast_strategy_keeps_visible_text_in_order(tmp_path: Path) -> None:
+    pytest.importorskip("lxml")
+
+    text = _extract(PAGE, HtmlExtractor(strategy="fast"), tmp_path)
+
+    assert text == "Title: Sample page\nSource: page.html\n\nHeading\nFirst bold words\ntail text\na b"
+
+
+def test_auto_switches_to_fast_above_node_limit(tmp_path: Path) -> None:
+    pytest.importorskip("lxml")
+    pytest.importorskip("readability")
+
+    fast = _extract(PAGE, HtmlExtractor(strategy="fast"), tmp_path / "fast")
+    auto = _extract(PAGE, HtmlExtractor(max_readability_nodes=5), tmp_path / "auto")
+    readability = _extract(PAGE, HtmlExtractor(strategy="readability"), tmp_path / "readability")
+
+    assert auto == fast
+    assert "var x" not in readability and readability.startswith("Title: Sample page\n")
+    assert readability == _extract(PAGE, HtmlExtractor(), tmp_path / "default")
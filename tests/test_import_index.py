@@ -0,0 +1,49 @@
+import os
+from pathlib import Path
+
+from dbl_artifacts import ImportIndex, LocalStorage, import_artifact
+from dbl_artifacts import importer
+
+
+def test_unchanged_source_is_not_read(tmp_path: Path, monkeypatch) -> None:
+    storage = LocalStorage(tmp_path / "store")
+    index = ImportIndex(tmp_path / "index.sqlite")
+    source = tmp_path / "note.txt"
+    source.write_text("first", encoding="utf-8")
+
+    first = import_artifact(source, "note.txt", storage=storage, index=index)
+    calls = []
+    original = importer._import_stream
+
+    def counting_import(*args, **kwargs):
+        calls.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(importer, "_import_stream", counting_import)
+    again = import_artifact(source, "note.txt", storage=storage, index=index)
+
+    assert again == first
+    assert calls == []
+
+    source.write_text("second", encoding="utf-8")
+    os.utime(source, ns=(1, 1))
+    changed = import_artifact(source, "note.txt", storage=storage, index=index)
+
+    assert len(calls) == 1
+    assert changed.sha256_bytes != first.sha256_bytes
+
+
+def test_paranoid_mode_reverifies_hits(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store")
+    index = ImportIndex(tmp_path / "index.sqlite", verify_sample=1.0)
+    source = tmp_path / "note.txt"
+    source.write_text("first", encoding="utf-8")
+    import_artifact(source, "note.txt", storage=storage, index=index)
+    stat = source.stat()
+
+    # Same size and mtime, different content: only a re-hash notices.
+    source.write_text("fir5t", encoding="utf-8")
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    verified = import_artifact(source, "note.txt", storage=storage, index=index)
+
+    assert storage.read_bytes(Path(verified.storage_uri)) == b"fir5t"
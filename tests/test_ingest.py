@@ -0,0 +1,86 @@
+import json
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from dbl_artifacts import LocalStorage
+from dbl_artifacts.cli import main
+from dbl_artifacts.ingest import IngestState, ingest
+
+
+def _write(path: Path, data: bytes, age: float = 60.0) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+
+
+def test_ingest_cli_processes_only_new_and_changed_files(tmp_path: Path, capsys) -> None:
+    pytest.importorskip("lxml")
+
+    tree = tmp_path / "tree"
+    _write(tree / "a.txt", b"alpha")
+    _write(tree / "b.md", b"# beta")
+    _write(tree / "c.bin", b"\x00\x01")
+    _write(tree / "sub" / "d.html", b"<html><title>D</title><body><p>delta</p></body></html>")
+    args = ["ingest", str(tree), "--store", str(tree / "data"), "--workers", "1", "--quiet", "--json"]
+
+    assert main(args) == 0
+    first = json.loads(capsys.readouterr().out)
+    _write(tree / "a.txt", b"alpha, edited")
+    (tree / "b.md").unlink()
+    _write(tree / "e.txt", b"epsilon")
+    assert main(args) == 0
+    second = json.loads(capsys.readouterr().out)
+
+    assert (first["seen"], first["ingested"], first["unsupported"], first["failed"]) == (4, 4, 1, 0)
+    assert (second["ingested"], second["unchanged"], second["removed"]) == (2, 2, 1)
+    lines = [json.loads(line) for line in (tree / "data" / "manifest.jsonl").read_text().splitlines()]
+    assert [Path(line["source"]).name for line in lines] == ["a.txt", "b.md", "c.bin", "d.html", "b.md", "a.txt", "e.txt"]
+    assert lines[2]["failure"]["reason_code"] == "IMPORT_UNSUPPORTED_TYPE"
+    assert lines[4] == {"removed": True, "source": str(tree / "b.md")}
+    assert lines[5]["derivation"]["derived_artifacts"][0]["original_filename"] == "a.txt.extracted.txt"
+
+
+def test_ingest_defers_files_that_are_still_changing(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store")
+    state = IngestState(tmp_path / "state.sqlite")
+    _write(tmp_path / "tree" / "fresh.txt", b"still being written", age=0)
+
+    waiting = ingest(tmp_path / "tree", storage, state=state, workers=1, settle=30)
+    _write(tmp_path / "tree" / "fresh.txt", b"done writing")
+    settled = ingest(tmp_path / "tree", storage, state=state, workers=1, settle=30)
+    again = ingest(tmp_path / "tree", storage, state=state, workers=1, settle=30)
+
+    assert (waiting.deferred, waiting.ingested) == (1, 0)
+    assert (settled.deferred, settled.ingested, settled.bytes_read) == (0, 1, len(b"done writing"))
+    assert (again.unchanged, again.ingested) == (1, 0)
+
+
+def test_watch_keeps_state_in_memory_and_settles_for_one_interval(tmp_path: Path, monkeypatch) -> None:
+    tree = tmp_path / "tree"
+    _write(tree / "old.txt", b"old")
+    reads = []
+    load = IngestState.load
+    monkeypatch.setattr(IngestState, "load", lambda self: reads.append(self._rows.stamps is None) or load(self))
+    polls = []
+
+    def sleep(seconds: float) -> None:
+        manifest = (tree / "data" / "manifest.jsonl").read_text()
+        polls.append("fresh.txt" in manifest)
+        if len(polls) == 1:
+            _write(tree / "fresh.txt", b"just written", age=0)
+        elif len(polls) == 2:
+            # Unchanged for longer than --interval by the next poll.
+            _write(tree / "fresh.txt", b"just written", age=seconds + 1)
+        else:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr("dbl_artifacts.cli.time.sleep", sleep)
+    args = ["ingest", str(tree), "--store", str(tree / "data"), "--workers", "1", "--quiet", "--json"]
+    assert main(args + ["--watch", "--interval", "30"]) == 0
+
+    assert polls == [False, False, True]
+    assert reads == [True, False, False]
@@ -0,0 +1,57 @@
+import mailbox
+from email.message import EmailMessage
+from pathlib import Path
+
+from dbl_artifacts import LocalStorage, extract_text, import_maildir, import_mbox
+
+
+def _message(number: int) -> EmailMessage:
+    msg = EmailMessage()
+    msg["Subject"] = f"Message {number}"
+    msg["From"] = "alice@example.com"
+    msg.set_content(f"Body {number}\n\nFrom here on, a line that needs escaping.\n")
+    return msg
+
+
+def test_mbox_matches_stdlib_split_and_resumes(tmp_path: Path) -> None:
+    path = tmp_path / "archive.mbox"
+    box = mailbox.mbox(path)
+    for number in range(3):
+        box.add(_message(number))
+    box.close()
+    reference = mailbox.mbox(path)
+    expected = [reference.get_bytes(key) for key in reference.keys()]
+
+    storage = LocalStorage(tmp_path / "store")
+    checkpoint = tmp_path / "archive.checkpoint"
+    messages = import_mbox(path, storage=storage, checkpoint=checkpoint, checkpoint_every=1)
+    first = next(messages)
+    second = next(messages)
+    messages.close()  # simulate a crash after two messages
+
+    rest = list(import_mbox(path, storage=storage, checkpoint=checkpoint))
+    records = [first, second, *rest]
+    assert len(rest) == 1
+    assert [storage.read_bytes(Path(r.storage_uri)) for r in records] == expected
+    assert first.metadata["container_offset"] == "0"
+    assert int(rest[0].metadata["container_offset"]) > int(second.metadata["container_offset"])
+    with path.open("rb") as handle:
+        handle.seek(int(rest[0].metadata["container_offset"]))
+        assert handle.read(5) == b"From "
+    assert list(import_mbox(path, storage=storage, checkpoint=checkpoint)) == []
+
+    result = extract_text(rest[0], storage=storage)
+    assert b"Body 2" in storage.read_bytes(Path(result.derived_artifacts[0].storage_uri))
+
+
+def test_maildir_walks_folders(tmp_path: Path) -> None:
+    box = mailbox.Maildir(tmp_path / "Mail")
+    box.add(_message(0))
+    box.add_folder("Archive").add(_message(1))
+    storage = LocalStorage(tmp_path / "store")
+
+    records = list(import_maildir(tmp_path / "Mail", storage=storage))
+
+    assert len(records) == 2
+    assert {r.media_type for r in records} == {"message/rfc822"}
+    assert sorted(r.metadata["container_path"].split("/")[0] for r in records) == [".Archive", "new"]
@@ -0,0 +1,38 @@
+from pathlib import Path
+
+import pytest
+
+from dbl_artifacts import ExtractorRegistry, LocalStorage, extract_text, import_artifact
+from dbl_artifacts.extractors.pdf import PdfExtractor
+
+
+def _make_pdf(path: Path, pages: int) -> list[str]:
+    fitz = pytest.importorskip("fitz")
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {number} café")
+    doc.save(path)
+    doc.close()
+    with fitz.open(path) as reopened:
+        return [page.get_text() for page in reopened]
+
+
+def test_parallel_pdf_matches_serial_output(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store")
+    pdf_path = tmp_path / "long.pdf"
+    texts = _make_pdf(pdf_path, 9)
+    artifact = import_artifact(pdf_path, "long.pdf", storage=storage)
+
+    parallel = ExtractorRegistry([PdfExtractor(workers=2, pages_per_task=2, record_page_offsets=True)])
+    result = extract_text(artifact, storage=storage, registry=parallel)
+
+    assert result.failure is None
+    derived = result.derived_artifacts[0]
+    data = Path(derived.storage_uri).read_bytes()
+    assert data == "\n".join(texts).encode("utf-8")
+    offsets = [int(value) for value in derived.metadata["page_offsets"].split(",")]
+    assert derived.metadata["page_count"] == "9"
+    assert len(offsets) == 9
+    for offset, text in zip(offsets, texts):
+        assert data[offset:].startswith(text.encode("utf-8"))
@@ -19,6 +19,22 @@ def test_txt_import_and_extract(tmp_path: Path) -> None:
     assert result.derived_artifacts[0].original_filename.endswith(".extracted.txt")
 
 
+@pytest.mark.parametrize("tail", [b"", b"caf\xe9\r\n"])
+def test_large_txt_streams_same_output(tmp_path: Path, tail: bytes) -> None:
+    from dbl_artifacts.extractors.base import decode_text, encode_text
+    from dbl_artifacts.storage import CHUNK_SIZE
+
+    storage = LocalStorage(tmp_path / "store")
+    # A CRLF pair straddles the chunk boundary; Latin-1 bytes show up only at the end.
+    data = b"x" * (CHUNK_SIZE - 1) + b"\r\n" + "\u20ac\r".encode("utf-8") * 1000 + tail
+
+    artifact = import_artifact(data, "big.txt", storage=storage)
+    result = extract_text(artifact, storage=storage)
+
+    assert result.failure is None
+    assert storage.read_bytes(Path(result.derived_artifacts[0].storage_uri)) == encode_text(decode_text(data))
+
+
 def test_pdf_import_and_extract(tmp_path: Path) -> None:
     try:
         import fitz  # type: ignore
@@ -0,0 +1,90 @@
+import os
+import subprocess
+import sys
+import zipfile
+from io import BytesIO
+from itertools import product
+
+from dbl_artifacts.detect import DOCX_MIME, detect_media_type
+from dbl_artifacts.registry import ExtractorRegistry, default_registry
+
+def _zip_head(*names: str) -> bytes:
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name in names:
+            archive.writestr(name, b"<x/>")
+    return buffer.getvalue()[:512]
+
+
+EXTENSIONS = ["", ".txt", ".pdf", ".docx", ".zip", ".html", ".eml", ".bin"]
+HEADS = [b"", b"%PDF-1.7", b"PK\x03\x04", _zip_head("[Content_Types].xml", "word/document.xml"), b"plain"]
+MEDIA_TYPES = ["", "text/plain", "text/csv", "application/pdf", "application/zip", DOCX_MIME, "message/rfc822"]
+
+
+class PlainSupports:
+    """An extractor without declared capabilities."""
+
+    name = "aaa"
+    version = "1"
+
+    def supports(self, media_type: str, extension: str, magic_bytes: bytes) -> int:
+        return 95 if extension == ".pdf" else 0
+
+
+def _reference(extractors, media_type: str, extension: str, head: bytes):
+    scored = [(e.supports(media_type, extension, head), e.name, e) for e in extractors]
+    scored = [item for item in scored if item[0] > 0]
+    return min(scored, key=lambda item: (-item[0], item[1]))[2] if scored else None
+
+
+def test_compiled_selection_matches_supports_scores() -> None:
+    registry = default_registry()
+    mixed = ExtractorRegistry(extractors=[*default_registry().extractors, PlainSupports()])
+
+    for reg, _ in product((registry, mixed), range(2)):
+        for media_type, extension, head in product(MEDIA_TYPES, EXTENSIONS, HEADS):
+            selected = reg.select(media_type, extension, head)
+            expected = _reference(reg.extractors, media_type, extension, head)
+            assert getattr(selected, "name", None) == getattr(expected, "name", None)
+
+
+def test_registry_recompiles_when_extractors_change() -> None:
+    registry = default_registry()
+    assert registry.select("application/pdf", ".pdf", b"%PDF").name == "pdf"
+
+    registry.extractors.append(PlainSupports())
+
+    assert registry.select("", ".pdf", b"%PDF").name == "aaa"
+    assert detect_media_type("report.docx", None, b"") == DOCX_MIME
+    assert detect_media_type("bundle", None, HEADS[3]) == DOCX_MIME
+    assert detect_media_type("bundle", None, HEADS[2]) == "application/zip"
+
+
+# Modules a short-lived process must not pay for before an extractor needs them.
+IMPORT_BUDGET_EXCLUDES = (
+    "dbl_artifacts.extractors.pdf", "dbl_artifacts.extractors.docx", "dbl_artifacts.extractors.html",
+    "dbl_artifacts.extractors.eml", "dbl_artifacts.extractors.archive", "fitz", "docx", "lxml", "readability",
+    "asyncio", "multiprocessing",
+)
+# Not even storage is needed until something is imported from the package.
+BARE_IMPORT_EXCLUDES = (
+    "dbl_artifacts.registry", "dbl_artifacts.extract", "dbl_artifacts.storage", "sqlite3", "concurrent.futures",
+)
+IMPORT_PROBE = f"""
+import sys
+import dbl_artifacts
+bare = sorted(name for name in sys.modules if name.startswith({BARE_IMPORT_EXCLUDES!r}))
+from dbl_artifacts import default_registry, extract_text
+assert default_registry().select("text/plain", ".txt", b"hello").name == "text"
+print(repr((bare, sorted(sys.modules))))
+"""
+
+
+def test_import_budget_defers_extractor_modules() -> None:
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    output = subprocess.run([sys.executable, "-c", IMPORT_PROBE], capture_output=True, text=True, check=True, env=env).stdout
+    bare, loaded = eval(output)
+
+    assert bare == []
+    assert "dbl_artifacts.extractors.text" in loaded
+    assert [name for name in loaded if name.split(".")[0] in IMPORT_BUDGET_EXCLUDES or name in IMPORT_BUDGET_EXCLUDES] == []
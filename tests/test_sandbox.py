@@ -0,0 +1,167 @@
+import os
+import signal
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from dbl_artifacts import DerivationCache, ExtractorRegistry, LocalStorage, ReasonCode, extract_text, import_artifact
+from dbl_artifacts.extractors.base import ExtractedContent
+from dbl_artifacts.sandbox import ExtractorSandbox
+
+
+class Behaving:
+    """Reports the worker's pid, or misbehaves as the artifact's filename asks."""
+
+    name = "behaving"
+    version = "1"
+
+    def supports(self, media_type: str, extension: str, magic_bytes: bytes) -> int:
+        return 100
+
+    def extract_text(self, artifact, storage, magic_bytes):
+        if artifact.original_filename == "hang.txt":
+            time.sleep(60)
+        if artifact.original_filename == "hog.txt":
+            hog = bytearray(8 * 1024 * 1024 * 1024)
+            return [ExtractedContent(content=bytes(hog[:1]), output_filename="hog.out", media_type="text/plain")]
+        if artifact.original_filename in ("stream.txt", "stall.txt"):
+            metadata = {}
+            stall = artifact.original_filename == "stall.txt"
+            return [ExtractedContent(b"", "stream.txt", "text/plain", metadata, chunks=_stream(metadata, stall))]
+        return [ExtractedContent(content=str(os.getpid()).encode(), output_filename="pid.txt", media_type="text/plain")]
+
+
+def _stream(metadata, stall):
+    for number in range(3):
+        yield f"{number}:{os.getpid()}\n".encode()
+        if stall:
+            time.sleep(60)
+    metadata["chunks"] = "3"
+
+
+def test_timeout_kills_job_and_workers_are_recycled(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store")
+    normal = import_artifact(b"normal", "normal.txt", storage=storage)
+    hang = import_artifact(b"hang", "hang.txt", storage=storage)
+
+    with ExtractorSandbox(workers=1, timeout=0.5, max_jobs=2) as sandbox:
+        pids = [sandbox.run(Behaving(), normal, storage, b"")[0].content for _ in range(3)]
+        started = time.monotonic()
+        failure = sandbox.run(Behaving(), hang, storage, b"")
+        assert time.monotonic() - started < 10
+        after = sandbox.run(Behaving(), normal, storage, b"")
+
+    assert pids[0] == pids[1] != pids[2]
+    assert failure.reason_code == ReasonCode.EXTRACT_TIMEOUT
+    assert after[0].content not in pids
+
+
+def test_memory_limit_maps_to_resource_limit_and_is_retried(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store")
+    cache = DerivationCache(tmp_path / "cache.sqlite")
+    hog = import_artifact(b"hog", "hog.txt", storage=storage)
+    text = import_artifact(b"plain text\n", "notes.txt", storage=storage)
+
+    with ExtractorSandbox(memory_limit=2 * 1024 * 1024 * 1024) as sandbox:
+        failure = extract_text(hog, storage, sandbox.wrap(ExtractorRegistry([Behaving()])), cache=cache).failure
+        result = extract_text(text, storage, sandbox.wrap())
+
+    assert failure.reason_code == ReasonCode.EXTRACT_RESOURCE_LIMIT
+    # The cap belongs to the sandbox, so a run with a larger one must not hit the cache.
+    assert cache.get(hog.sha256_bytes, "behaving", "1", {}) is None
+    assert result.failure is None
+    assert storage.read_bytes(Path(result.derived_artifacts[0].storage_uri)).endswith(b"plain text\n")
+
+
+def test_worker_that_died_while_idle_is_replaced(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store")
+    normal = import_artifact(b"normal", "normal.txt", storage=storage)
+
+    with ExtractorSandbox(workers=1) as sandbox:
+        pid = int(sandbox.run(Behaving(), normal, storage, b"")[0].content)
+        os.kill(pid, signal.SIGKILL)
+        deadline = time.monotonic() + 10
+        while "State:\tZ" not in Path(f"/proc/{pid}/status").read_text() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        failure = sandbox.run(Behaving(), normal, storage, b"")
+        after = sandbox.run(Behaving(), normal, storage, b"")
+
+    assert failure.reason_code == ReasonCode.EXTRACT_RESOURCE_LIMIT
+    assert int(after[0].content) != pid
+
+
+def test_close_wakes_callers_waiting_for_a_worker(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store")
+    hang = import_artifact(b"hang", "hang.txt", storage=storage)
+    normal = import_artifact(b"normal", "normal.txt", storage=storage)
+    sandbox = ExtractorSandbox(workers=1, timeout=None)
+    outcomes = {}
+
+    def call(name, artifact):
+        try:
+            outcomes[name] = sandbox.run(Behaving(), artifact, storage, b"")
+        except RuntimeError as exc:
+            outcomes[name] = exc
+
+    threads = [threading.Thread(target=call, args=("hang", hang)), threading.Thread(target=call, args=("waiting", normal))]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.5)
+    sandbox.close()
+    for thread in threads:
+        thread.join(10)
+
+    assert not any(thread.is_alive() for thread in threads)
+    assert outcomes["hang"].reason_code == ReasonCode.EXTRACT_RESOURCE_LIMIT
+    assert str(outcomes["waiting"]) == "sandbox is closed"
+    with pytest.raises(RuntimeError, match="sandbox is closed"):
+        sandbox.run(Behaving(), normal, storage, b"")
+
+
+def test_unpicklable_job_fails_and_respawn_failure_closes_later(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store")
+    normal = import_artifact(b"normal", "normal.txt", storage=storage)
+    unpicklable = Behaving()
+    unpicklable.hook = lambda: None
+
+    with ExtractorSandbox(workers=1, max_jobs=1) as sandbox:
+        failure = extract_text(normal, storage, sandbox.wrap(ExtractorRegistry([unpicklable]))).failure
+
+        def broken_spawn():
+            raise OSError("no more processes")
+
+        sandbox._spawn = broken_spawn
+        # The worker is used up and cannot be replaced; the finished job still returns its result.
+        result = sandbox.run(Behaving(), normal, storage, b"")
+        with pytest.raises(RuntimeError, match="sandbox is closed"):
+            sandbox.run(Behaving(), normal, storage, b"")
+
+    assert failure.reason_code == ReasonCode.EXTRACT_PARSE_ERROR
+    assert "could not send job" in failure.detail
+    assert int(result[0].content) > 0
+
+
+def test_streamed_outputs_arrive_chunk_by_chunk(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store")
+    stream = import_artifact(b"stream", "stream.txt", storage=storage)
+    stall = import_artifact(b"stall", "stall.txt", storage=storage)
+    normal = import_artifact(b"normal", "normal.txt", storage=storage)
+
+    with ExtractorSandbox(workers=1, timeout=2) as sandbox:
+        [item] = sandbox.run(Behaving(), stream, storage, b"")
+        assert item.metadata == {}
+        chunks = list(item.chunks)
+        pid = sandbox.run(Behaving(), normal, storage, b"")[0].content
+        sandbox.run(Behaving(), stream, storage, b"")  # dropped unread
+        after_drop = sandbox.run(Behaving(), normal, storage, b"")[0].content
+        started = time.monotonic()
+        failure = extract_text(stall, storage, sandbox.wrap(ExtractorRegistry([Behaving()]))).failure
+        assert time.monotonic() - started < 10
+
+    assert [chunk.split(b":")[0] for chunk in chunks] == [b"0", b"1", b"2"]
+    assert item.metadata == {"chunks": "3"}
+    assert chunks[0].split(b":")[1].strip() == pid
+    assert after_drop != pid
+    assert failure.reason_code == ReasonCode.EXTRACT_TIMEOUT
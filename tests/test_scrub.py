@@ -0,0 +1,51 @@
+from pathlib import Path
+
+from dbl_artifacts import LocalStorage, ScrubState, scrub
+from dbl_artifacts.cli import main
+from dbl_artifacts.storage import TEMP_DIRNAME
+
+
+def _relative(storage: LocalStorage, path: Path) -> str:
+    return path.relative_to(storage.root).as_posix()
+
+
+def test_scrub_reports_corrupt_truncated_and_orphaned(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store", pack_threshold=64, compression="zlib")
+    good = storage.store_bytes(b"good content " * 100)
+    corrupt = storage.store_bytes(b"will be flipped " * 100)
+    truncated = storage.store_bytes(b"will be cut short " * 1000)
+    packed = storage.store_bytes(b"tiny")
+    (storage.root / TEMP_DIRNAME / "stray").write_bytes(b"")
+
+    assert scrub(storage, workers=1).ok
+    stray = corrupt.parent / "not-a-blob"
+    stray.write_bytes(b"x")
+    corrupt_file = storage._compressed_path(corrupt)
+    data = bytearray(corrupt_file.read_bytes())
+    data[-12] ^= 0xFF
+    corrupt_file.write_bytes(bytes(data))
+    truncated_file = storage._compressed_path(truncated)
+    truncated_file.write_bytes(truncated_file.read_bytes()[:-20])
+
+    report = scrub(storage, workers=2)
+
+    assert report.corrupt == (_relative(storage, corrupt_file),)
+    assert report.truncated == (_relative(storage, truncated_file),)
+    assert report.orphaned == (_relative(storage, stray),)
+    assert report.checked == 4 and storage.exists(good) and storage.exists(packed)
+
+
+def test_scrub_state_skips_unchanged_blobs(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store")
+    first = storage.store_bytes(b"first")
+    state = ScrubState(tmp_path / "scrub.sqlite")
+
+    assert scrub(storage, state=state, workers=1).checked == 1
+    second = storage.store_bytes(b"second")
+    report = scrub(storage, state=state, workers=1)
+    assert (report.checked, report.skipped) == (1, 1)
+
+    second.write_bytes(b"tampered")
+    assert main(["scrub", str(storage.root), "--state", str(tmp_path / "scrub.sqlite"), "--workers", "1"]) == 1
+    assert scrub(storage, state=ScrubState(state.path, max_age=0), workers=1).corrupt == (_relative(storage, second),)
+    assert first.exists()
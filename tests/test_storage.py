@@ -0,0 +1,214 @@
+import hashlib
+import multiprocessing
+import os
+import random
+import time
+import tracemalloc
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+
+from dbl_artifacts import ArtifactError, LocalStorage, ReasonCode, import_artifact
+from dbl_artifacts.compression import encode_header, get_codec, open_decompressed
+from dbl_artifacts.storage import TEMP_DIRNAME
+
+
+def test_store_stream_hashes_in_chunks(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store")
+    data = b"0123456789" * 1000
+
+    blob = storage.store_stream(BytesIO(data[5:]), head=data[:5], chunk_size=7)
+
+    assert blob.sha256_bytes == hashlib.sha256(data).hexdigest()
+    assert blob.byte_size == len(data)
+    assert blob.path == storage._path_for_hash(blob.sha256_bytes)
+    assert blob.path.read_bytes() == data
+    assert list((storage.root / TEMP_DIRNAME).iterdir()) == []
+
+
+def test_streaming_import_matches_bytes_import(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store")
+    data = b"%PDF-1.4\n" + b"x" * 4096
+    source = tmp_path / "doc.bin"
+    source.write_bytes(data)
+
+    from_path = import_artifact(source, "doc.bin", storage=storage)
+    from_handle = import_artifact(BytesIO(data), "doc.bin", storage=storage)
+    from_bytes = import_artifact(data, "doc.bin", storage=storage)
+
+    assert from_path == from_handle == from_bytes
+    assert from_path.media_type == "application/pdf"
+
+
+def test_streaming_import_rejects_before_writing(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store")
+
+    with pytest.raises(ArtifactError) as info:
+        import_artifact(BytesIO(b"\x00\x01binary"), "blob.bin", storage=storage)
+
+    assert info.value.reason_code == ReasonCode.IMPORT_UNSUPPORTED_TYPE
+    assert not storage.root.exists()
+
+
+def test_view_is_read_only_and_zero_copy(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store")
+    path = storage.store_bytes(b"mapped content")
+    empty = storage.store_bytes(b"")
+
+    with storage.view(path) as view:
+        assert view.readonly
+        assert bytes(view[:6]) == b"mapped"
+    with storage.view(empty) as view:
+        assert len(view) == 0
+
+
+def test_small_blobs_are_packed_behind_stable_uris(tmp_path: Path, monkeypatch) -> None:
+    storage = LocalStorage(tmp_path / "store", pack_threshold=64)
+    small = storage.store_bytes(b"small object")
+    streamed = storage.store_chunks([b"another ", b"small one"]).path
+    large = storage.store_bytes(b"L" * 100)
+
+    assert small == storage._path_for_hash(hashlib.sha256(b"small object").hexdigest())
+    assert not small.exists() and not streamed.exists()
+    assert large.exists()
+    assert storage.exists(small)
+    assert storage.read_bytes(small) == b"small object"
+    assert storage.read_head(streamed, 7) == b"another"
+    with storage.open_stream(streamed) as handle:
+        assert handle.read() == b"another small one"
+    with storage.view(small) as view:
+        assert bytes(view) == b"small object"
+    # A packed duplicate is found before it is compressed or appended again.
+    monkeypatch.setattr(LocalStorage, "_append_packed", lambda *args: pytest.fail("duplicate appended"))
+    assert storage.store_bytes(b"small object") == small
+    fanout = {p.name for p in storage.root.iterdir()} - {".tmp", "packs"}
+    assert fanout == {large.parent.parent.name}
+
+
+def test_packed_text_extracts(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store", pack_threshold=4096)
+    artifact = import_artifact(b"packed text", "note.txt", storage=storage)
+
+    from dbl_artifacts import extract_text
+
+    result = extract_text(artifact, storage=storage)
+
+    assert result.failure is None
+    assert storage.read_bytes(Path(result.derived_artifacts[0].storage_uri)) == b"packed text"
+
+
+@pytest.mark.parametrize("codec", ["zlib", "lzma"])
+def test_compressed_blobs_keep_content_address(tmp_path: Path, codec: str) -> None:
+    storage = LocalStorage(tmp_path / "store", compression=codec)
+    text = b"line of highly repetitive text\n" * 2000
+    digest = hashlib.sha256(text).hexdigest()
+
+    stored = storage.store_bytes(text)
+    streamed = storage.store_chunks([text[:10], text[10:]])
+
+    assert stored == streamed.path == storage._path_for_hash(digest)
+    assert streamed.sha256_bytes == digest
+    compressed = stored.with_name(stored.name + ".dblz")
+    assert not stored.exists() and compressed.stat().st_size < len(text) // 5
+    assert storage.read_bytes(stored) == text
+    assert storage.read_head(stored, 4) == b"line"
+    with storage.open_stream(stored) as handle:
+        assert handle.read() == text
+    with storage.view(stored) as view:
+        assert bytes(view) == text
+
+
+@pytest.mark.parametrize("codec", ["zlib", "lzma"])
+def test_decompression_is_bounded_by_the_read(codec: str) -> None:
+    data = bytes(32 * 1024 * 1024)
+    compressor = get_codec(codec).compressor()
+    payload = encode_header(get_codec(codec)) + compressor.compress(data) + compressor.flush()
+
+    tracemalloc.start()
+    try:
+        with open_decompressed(BytesIO(payload)) as stream:
+            head = stream.read(4096)
+            peak = tracemalloc.get_traced_memory()[1]
+            rest = stream.read()
+    finally:
+        tracemalloc.stop()
+
+    assert head + rest == data
+    # Well under the blob's size; lzma's own dictionary takes 8 MiB.
+    assert peak < len(data) // 2
+
+
+def test_compression_skips_precompressed_and_small(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store", compression="zlib", pack_threshold=1024)
+    pdf = b"%PDF-1.7\n" + b"0" * 5000
+    small = b"tiny but repetitive " * 10
+
+    pdf_path = storage.store_chunks([pdf]).path
+    packed = storage.store_bytes(b"q" * 600)
+
+    assert pdf_path.read_bytes() == pdf
+    assert storage.local_path(pdf_path) == pdf_path
+    assert storage.read_bytes(storage.store_bytes(small)) == small
+    assert storage.packs.lookup(packed.name).encoded
+    assert storage.read_bytes(packed) == b"q" * 600
+
+    # Compressing random bytes only adds the header and codec overhead: they are kept raw.
+    noise = random.Random(0).randbytes(4096)
+    streamed = storage.store_chunks([noise[:300], noise[300:]]).path
+    assert streamed.read_bytes() == noise
+    assert not streamed.with_name(streamed.name + ".dblz").exists()
+    more = random.Random(1).randbytes(4096)
+    assert storage.store_bytes(more).read_bytes() == more
+
+
+def _stress_content(number: int) -> bytes:
+    return hashlib.sha256(str(number).encode()).digest() * (2048 + 512 * number)
+
+
+def _stress_worker(root: str, seed: int) -> int:
+    storage = LocalStorage(Path(root), fsync="batch", fsync_batch=8)
+    rng = random.Random(seed)
+    bad = 0
+    for number in rng.sample(range(24), 24):
+        data = _stress_content(number)
+        if rng.random() < 0.5:
+            path = storage.store_bytes(data)
+        else:
+            path = storage.store_stream(BytesIO(data), chunk_size=4096).path
+        bad += storage.read_bytes(path) != data
+    storage.sync()
+    return bad
+
+
+def test_concurrent_processes_never_expose_partial_blobs(tmp_path: Path) -> None:
+    root = tmp_path / "store"
+    context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn")
+
+    with context.Pool(8) as pool:
+        results = pool.starmap(_stress_worker, [(str(root), seed) for seed in range(16)])
+
+    assert results == [0] * 16
+    storage = LocalStorage(root)
+    for number in range(24):
+        data = _stress_content(number)
+        assert storage.read_bytes(storage._path_for_hash(hashlib.sha256(data).hexdigest())) == data
+    assert list((root / TEMP_DIRNAME).iterdir()) == []
+
+
+def test_stale_temp_files_are_removed_on_first_write(tmp_path: Path) -> None:
+    root = tmp_path / "store"
+    (root / TEMP_DIRNAME).mkdir(parents=True)
+    stale = root / TEMP_DIRNAME / "blob-stale"
+    fresh = root / TEMP_DIRNAME / "blob-fresh"
+    stale.write_bytes(b"partial")
+    fresh.write_bytes(b"in progress")
+    old = time.time() - 7200
+    os.utime(stale, (old, old))
+
+    LocalStorage(root, fsync="always").store_bytes(b"content")
+
+    assert not stale.exists()
+    assert fresh.exists()
+    with pytest.raises(ValueError):
+        LocalStorage(root, fsync="sometimes")
@@ -0,0 +1,75 @@
+import time
+from pathlib import Path
+
+from dbl_artifacts import ExtractorRegistry, LocalStorage, StageTimings, extract_text, import_artifact, tracing
+from dbl_artifacts.extractors.base import ExtractedContent
+from dbl_artifacts.trace import get_tracer, span
+
+
+def test_stages_are_traced_with_tags(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store")
+    source = tmp_path / "note.txt"
+    source.write_bytes(b"hello tracing\n" * 100)
+    events = []
+    timings = StageTimings(by=("extractor",))
+
+    def tracer(event):
+        events.append(event)
+        timings(event)
+
+    with tracing(tracer):
+        artifact = import_artifact(source, "note.txt", storage=storage)
+        extract_text(artifact, storage=storage)
+    assert get_tracer() is None
+
+    stages = {event.stage for event in events}
+    assert stages == {"read", "detect", "select", "parse", "encode", "hash", "store"}
+    parse = next(event for event in events if event.stage == "parse")
+    assert parse.tags["extractor"] == "text"
+    assert parse.tags["media_type"] == "text/plain"
+    assert parse.tags["byte_size"] == 1400
+    # Nested spans inherit the tags of the enclosing parse span.
+    encode = next(event for event in events if event.stage == "encode")
+    assert encode.tags["extractor"] == "text"
+
+    summary = timings.summary()
+    assert summary["parse/text"]["count"] == 1
+    assert summary["hash/None"]["bytes"] == 1400
+
+
+def test_span_is_noop_without_tracer() -> None:
+    with span("parse", extractor="x") as current:
+        current.tag(byte_size=1)
+    assert get_tracer() is None
+
+
+class SlowStream:
+    """Does all of its parsing while the output chunks are pulled."""
+
+    name = "slow"
+    version = "1"
+
+    def supports(self, media_type: str, extension: str, magic_bytes: bytes) -> int:
+        return 100
+
+    def extract_text(self, artifact, storage, magic_bytes):
+        def chunks():
+            for _ in range(4):
+                time.sleep(0.05)
+                yield b"parsed\n"
+
+        return [ExtractedContent(content=b"", output_filename="out.txt", media_type="text/plain", chunks=chunks())]
+
+
+def test_streamed_parsing_is_timed_as_parse_not_store(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "store")
+    artifact = import_artifact(b"source", "source.txt", storage=storage)
+    events = []
+
+    with tracing(events.append):
+        result = extract_text(artifact, storage, ExtractorRegistry([SlowStream()]))
+
+    assert result.failure is None
+    durations = {event.stage: event.duration for event in events if event.tags.get("extractor") == "slow"}
+    assert durations["parse"] >= 0.2
+    assert durations["store"] < 0.1